@@ -0,0 +1,69 @@
+import asyncio
+
+from bleak.backends.device import BLEDevice
+
+from utecio.bench import emulated_fleet
+from utecio.ble.adapters import UtecBleAdapterBalancer
+
+
+def device(address: str, adapter: str) -> BLEDevice:
+    return BLEDevice(address, "Lock", {"path": f"/org/bluez/{adapter}"})
+
+
+def test_strongest_adapter_wins_and_load_counts():
+    balancer = UtecBleAdapterBalancer(["hci0", "hci1"], sticky_margin=0)
+    for address in ("A", "B"):
+        balancer.report(address, "hci0", -50, device(address, "hci0"))
+        balancer.report(address, "hci1", -55, device(address, "hci1"))
+    assert balancer.select("A") == "hci0"
+    balancer.acquire("hci0")
+    # -50 - 10 for the held connection loses to -55
+    assert balancer.select("B") == "hci1"
+    balancer.release("hci0")
+    assert balancer.load == {"hci0": 0, "hci1": 0}
+
+
+def test_previous_adapter_is_sticky():
+    balancer = UtecBleAdapterBalancer()
+    balancer.report("A", "hci0", -60, device("A", "hci0"))
+    assert balancer.select("A") == "hci0"
+    balancer.report("A", "hci1", -57, device("A", "hci1"))
+    assert balancer.select("A") == "hci0"
+    balancer.report("A", "hci1", -40, device("A", "hci1"))
+    assert balancer.select("A") == "hci1"
+
+
+def test_no_choice_without_sightings():
+    balancer = UtecBleAdapterBalancer(["hci0", "hci1"], window=10)
+    assert balancer.select("A") is None
+    balancer.report("A", "hci1", -50)
+    assert balancer.select("A") is None
+    balancer.report("A", "hci1", -50, device("A", "hci1"))
+    balancer._sightings["A"]["hci1"].seen -= 60
+    assert balancer.select("A") is None
+
+
+def test_connections_use_the_selected_adapter():
+    async def main():
+        bluetooth, locks = emulated_fleet(3)
+        balancer = UtecBleAdapterBalancer(["hci0", "hci1"])
+        lookups = []
+
+        async def lookup(address):
+            lookups.append(address)
+            return await bluetooth.async_bledevice_callback(address)
+
+        for lock, adapter in zip(locks, ("hci0", "hci1")):
+            emulator = bluetooth.devices[lock.mac_uuid]
+            balancer.report(lock.mac_uuid, adapter, -50, emulator.ble_device)
+        for lock in locks:
+            lock.adapters = balancer
+            lock.async_bledevice_callback = lookup
+        await asyncio.gather(*(lock.async_update_status() for lock in locks))
+
+        assert [lock.adapter for lock in locks] == ["hci0", "hci1", None]
+        # only the lock no adapter reported goes through the default lookup
+        assert lookups == [locks[2].mac_uuid]
+        assert balancer.load == {"hci0": 0, "hci1": 0}
+
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import subprocess
+import sys
+
+from utecio.api import UtecClient, json_loads
+
+
+def api_device(uuid: str) -> dict:
+    return {
+        "name": "Front Door",
+        "uuid": uuid,
+        "model": "U-Bolt-WiFi",
+        "user": {"uid": 7, "password": 6 << 28 | 123456, "nickname": "x"},
+        "params": {"extend_ble": "", "serialnumber": "SN1", "timezone": "UTC"},
+        "firmware": "1.2.3",
+    }
+
+
+ROOMS = {1: ["AA:00:00:00:00:01", "AA:00:00:00:00:02"], 2: ["AA:00:00:00:00:03"]}
+
+
+def cloud_client(compact: bool = True) -> tuple[UtecClient, list[int]]:
+    client = UtecClient("user@example.com", "secret")
+    client.compact = compact
+    listed = []
+
+    async def connect():
+        pass
+
+    async def post(url, headers, data):
+        body = json.loads(data["data"])
+        if url.endswith("/address"):
+            return {"error": None, "data": [{"id": 10}]}
+        if url.endswith("/room"):
+            return {"error": None, "data": [{"id": room} for room in ROOMS]}
+        listed.append(body["room_id"])
+        return {
+            "error": None,
+            "data": [api_device(uuid) for uuid in ROOMS[body["room_id"]]],
+        }
+
+    client.connect = connect
+    client._post = post
+    return client, listed
+
+
+def test_json_loads_matches_the_standard_library():
+    body = json.dumps({"error": None, "data": [api_device("AA:00:00:00:00:01")]})
+    assert json_loads(body.encode()) == json.loads(body)
+
+
+def test_json_falls_back_without_orjson():
+    code = (
+        "import sys, json; sys.modules['orjson'] = None; "
+        "import utecio.api; assert utecio.api.json_loads is json.loads"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_sync_keeps_compact_entries():
+    client, _ = cloud_client()
+    asyncio.run(client.sync_devices())
+    assert [device["uuid"] for device in client.devices] == [
+        uuid for uuids in ROOMS.values() for uuid in uuids
+    ]
+    assert "firmware" not in client.devices[0]
+    assert "nickname" not in client.devices[0]["user"]
+
+    client, _ = cloud_client(compact=False)
+    asyncio.run(client.sync_devices())
+    assert client.devices[0]["firmware"] == "1.2.3"
+
+
+def test_stream_yields_locks_room_by_room():
+    async def main():
+        client, listed = cloud_client()
+        seen = []
+        async for lock in client.stream_ble_devices():
+            # the next room is only listed once this one is consumed
+            seen.append((lock.mac_uuid, list(listed)))
+        return client, seen
+
+    client, seen = asyncio.run(main())
+    assert seen == [
+        ("AA:00:00:00:00:01", [1]),
+        ("AA:00:00:00:00:02", [1]),
+        ("AA:00:00:00:00:03", [1, 2]),
+    ]
+    assert client.devices == []
@@ -0,0 +1,47 @@
+import asyncio
+
+from utecio.bench import emulated_fleet
+from utecio.enums import BLECommandCode, DeviceLockWorkMode
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_batch_uses_one_connection():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        async with lock.batch() as batch:
+            batch.set_autolock(30)
+            batch.set_workmode(DeviceLockWorkMode.PASSAGE)
+            batch.unlock()
+        assert [result.success for result in batch.results] == [True, True, True]
+        assert emulator.autolock_time == 30
+        assert emulator.lock_mode == DeviceLockWorkMode.PASSAGE.value
+        assert BLECommandCode.UNLOCK in emulator.commands
+        assert emulator.connections == 1
+
+    run(main())
+
+
+def test_unsupported_operation_is_reported():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1, device_model="UL1-BT")
+        async with lock.batch() as batch:
+            batch.set_autolock(30)
+            batch.lock()
+        autolock, bolt = batch.results
+        assert autolock.error and not autolock.success
+        assert bolt.success
+
+    run(main())
+
+
+def test_errors_are_reported_per_operation():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1, latency=1.0)
+        results = await lock.batch(timeout=0.1).unlock().lock().commit()
+        assert all(result.error and not result.success for result in results)
+
+    run(main())
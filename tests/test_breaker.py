@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from utecio.bench import emulated_fleet
+from utecio.ble.breaker import UtecBleCircuitBreaker
+from utecio.ble.device import (
+    UtecBleCircuitOpenError,
+    UtecBleNotFoundError,
+    UtecBleTimeoutError,
+)
+from utecio.enums import BleCircuitState
+
+
+def test_opens_after_threshold():
+    breaker = UtecBleCircuitBreaker(failure_threshold=2, base_backoff=60)
+    breaker.record_failure()
+    assert breaker.state == BleCircuitState.CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == BleCircuitState.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_in > 0
+
+
+def test_single_probe_when_half_open():
+    breaker = UtecBleCircuitBreaker(base_backoff=60)
+    breaker.record_failure()
+    breaker.record_seen()
+    assert breaker.allow()
+    assert breaker.state == BleCircuitState.HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_probe_success_closes():
+    breaker = UtecBleCircuitBreaker(base_backoff=60)
+    breaker.record_failure()
+    breaker.record_seen()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == BleCircuitState.CLOSED
+    assert breaker.failures == breaker.trips == 0
+
+
+def test_probe_failure_doubles_backoff():
+    breaker = UtecBleCircuitBreaker(base_backoff=10, jitter=0)
+    breaker.record_failure()
+    first = breaker.retry_in
+    breaker.record_seen()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == BleCircuitState.OPEN
+    assert 10 < breaker.retry_in <= 20 and first <= 10
+
+
+def test_release_allows_next_probe():
+    breaker = UtecBleCircuitBreaker(base_backoff=60)
+    breaker.record_failure()
+    breaker.record_seen()
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == BleCircuitState.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_unreachable_lock_opens_circuit():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        emulator = bluetooth.devices.pop(lock.mac_uuid)
+        with pytest.raises(UtecBleNotFoundError):
+            await lock.async_update_status()
+        assert lock.breaker.state == BleCircuitState.OPEN
+        bluetooth.add_lock(emulator)
+        with pytest.raises(UtecBleCircuitOpenError):
+            await lock.async_update_status()
+        assert emulator.connections == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_connect_leaves_circuit_closed():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1, connect_latency=1.0)
+        with pytest.raises(UtecBleTimeoutError):
+            await lock.async_unlock(timeout=0.1)
+        assert lock.breaker.state == BleCircuitState.CLOSED
+        bluetooth.devices[lock.mac_uuid].connect_latency = 0
+        await lock.async_update_status()
+
+    asyncio.run(main())
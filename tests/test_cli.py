@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from utecio import cli
+from utecio.api import UtecClient
+
+
+@pytest.fixture
+def config_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("UTECIO_EMAIL", "user@example.com")
+    monkeypatch.setenv("UTECIO_PASSWORD", "secret")
+    monkeypatch.setenv("UTECIO_INVENTORY", str(tmp_path / "inventory.json"))
+    (tmp_path / "config.json").write_text("{}")
+    return ["--config", str(tmp_path / "config.json")]
+
+
+def output(capsys):
+    return json.loads(capsys.readouterr().out)
+
+
+def test_bench_emulated(capsys):
+    assert cli.main(["bench", "--emulated", "2", "--iterations", "2"]) == 0
+    report = output(capsys)
+    assert report["locks"] == 2
+    assert report["errors"] == 0
+
+
+def test_bench_arbitrated_scan(capsys):
+    argv = ["bench", "--emulated", "2", "--iterations", "1", "--scan", "arbitrated"]
+    assert cli.main(argv) == 0
+    assert output(capsys)["scan"]
+
+
+def test_lock_needs_a_selection(capsys, config_env):
+    assert cli.main([*config_env, "unlock"]) == 2
+    assert "error" in json.loads(capsys.readouterr().err)
+
+
+def test_sync_leaves_out_credentials(capsys, config_env, monkeypatch):
+    async def sync_devices(self):
+        self.devices = [
+            {
+                "name": "Front Door",
+                "uuid": "AA:00:00:00:00:01",
+                "model": "U-Bolt-WiFi",
+                "user": {"uid": 7, "password": 6 << 28 | 123456},
+                "params": {"extend_ble": "", "serialnumber": "SN1"},
+            }
+        ]
+
+    monkeypatch.setattr(UtecClient, "sync_devices", sync_devices)
+    assert cli.main([*config_env, "sync"]) == 0
+    [device] = output(capsys)
+    assert device["uuid"] == "AA:00:00:00:00:01"
+    assert "user" not in device
+
+
+def test_missing_credentials(config_env, monkeypatch):
+    monkeypatch.delenv("UTECIO_PASSWORD")
+    assert cli.main([*config_env, "sync"]) == 2
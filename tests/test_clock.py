@@ -0,0 +1,65 @@
+import asyncio
+import datetime
+
+import pytest
+
+from utecio.bench import emulated_fleet
+from utecio.ble.lock import UtecBleLock
+from utecio.const import CLOCK_DRIFT_BASELINE_DEF, CLOCK_DRIFT_MAX_PPM
+from utecio.enums import BLECommandCode
+
+
+def sync(clock_offset: float):
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        emulator.clock_offset = datetime.timedelta(seconds=clock_offset)
+        await lock.async_sync_time()
+        return lock, emulator
+
+    return asyncio.run(main())
+
+
+def test_small_offset_is_only_cached():
+    lock, emulator = sync(10)
+    assert BLECommandCode.WRITE_TIME not in emulator.commands
+    assert lock.device_time_offset.total_seconds() == pytest.approx(10, abs=1.5)
+    estimate = lock.device_time() - datetime.datetime.now()
+    assert estimate.total_seconds() == pytest.approx(10, abs=1.5)
+
+
+def test_offset_past_threshold_is_corrected():
+    lock, emulator = sync(120)
+    assert emulator.commands[-1] == BLECommandCode.WRITE_TIME
+    assert abs(emulator.clock_offset.total_seconds()) < 1.5
+    assert lock.device_time_offset == datetime.timedelta()
+
+
+def drift_device() -> UtecBleLock:
+    return UtecBleLock("1", "123456", "AA:00:00:00:00:01", "Front Door")
+
+
+def test_drift_waits_for_a_long_baseline():
+    lock = drift_device()
+    lock._update_drift(0.0, 0.0)
+    lock._update_drift(5.0, 60.0)
+    assert lock.clock_drift == 0.0
+
+
+def test_drift_ignores_rounding():
+    lock = drift_device()
+    lock._update_drift(0.0, 0.0)
+    lock._update_drift(1.0, CLOCK_DRIFT_BASELINE_DEF)
+    assert lock.clock_drift == 0.0
+    assert lock._drift_baseline == (0.0, 0.0)
+
+
+def test_drift_rate_is_measured_and_clamped():
+    lock = drift_device()
+    hours = CLOCK_DRIFT_BASELINE_DEF
+    lock._update_drift(0.0, 0.0)
+    lock._update_drift(2.0, hours)
+    assert lock.clock_drift == pytest.approx(2.0 / hours)
+
+    lock._update_drift(1000.0, 2 * hours)
+    assert lock.clock_drift == CLOCK_DRIFT_MAX_PPM / 1e6
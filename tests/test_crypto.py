@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import pytest
+
+from utecio.bench import UtecLoopLagMonitor, emulated_fleet
+from utecio.ble.crypto import (
+    UtecBleCryptoExecutor,
+    ecc_generate,
+    ecc_shared_key,
+    encrypt_frame,
+)
+from utecio.enums import DeviceKeyUUID
+
+
+def test_ecc_agreement():
+    secret_a, ax, ay = ecc_generate()
+    secret_b, bx, by = ecc_generate()
+    assert ecc_shared_key(secret_a, bx, by) == ecc_shared_key(secret_b, ax, ay)
+
+
+def test_encrypt_frame_pads_to_blocks():
+    assert len(encrypt_frame(bytes(16), b"\x7f\x02\x00\x20\x20")) == 16
+    assert len(encrypt_frame(bytes(16), bytes(17))) == 32
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        UtecBleCryptoExecutor("gpu")
+
+
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+def test_key_exchange_in_each_mode(mode):
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1, DeviceKeyUUID.ECC)
+        lock.crypto = UtecBleCryptoExecutor(mode, max_workers=1)
+        try:
+            await lock.async_update_status()
+        finally:
+            lock.crypto.shutdown()
+        assert lock.battery == bluetooth.devices[lock.mac_uuid].battery
+
+    asyncio.run(main())
+
+
+def test_loop_lag_monitor_sees_blocking():
+    async def main():
+        async with UtecLoopLagMonitor(interval=0.01) as monitor:
+            await asyncio.sleep(0.03)
+            time.sleep(0.1)
+            await asyncio.sleep(0.03)
+        return monitor.summary()
+
+    summary = asyncio.run(main())
+    assert summary["max"] >= 50
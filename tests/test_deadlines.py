@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+import pytest
+
+from utecio.bench import emulated_fleet
+from utecio.ble.device import UtecBleDeviceError, UtecBleRequest, UtecBleTimeoutError
+from utecio.enums import BLECommandCode
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_operation_deadline():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1, latency=1.0)
+        started = time.monotonic()
+        with pytest.raises(UtecBleTimeoutError):
+            await lock.async_unlock(timeout=0.2)
+        assert time.monotonic() - started < 0.5
+        assert not lock.is_busy
+
+    run(main())
+
+
+def test_command_timeout():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        bluetooth.devices[lock.mac_uuid].drop_rate = 1.0
+        lock.add_request(UtecBleRequest(BLECommandCode.GET_BATTERY, timeout=0.1))
+        with pytest.raises(UtecBleTimeoutError):
+            await lock.send_requests()
+
+    run(main())
+
+
+def test_disconnect_fails_pending_command():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1, latency=0.5)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        task = asyncio.create_task(lock.async_update_status())
+        while not lock._pending:
+            await asyncio.sleep(0.01)
+        started = time.monotonic()
+        emulator.drop_connections()
+        with pytest.raises(UtecBleDeviceError):
+            await task
+        assert time.monotonic() - started < 0.2
+
+    run(main())
+
+
+def test_reboot_does_not_wait_for_an_answer():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        started = time.monotonic()
+        assert await lock.async_reboot() is not False
+        assert time.monotonic() - started < 1
+        assert emulator.commands[-1] == BLECommandCode.REBOOT
+        assert not emulator.clients
+
+    run(main())
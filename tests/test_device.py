@@ -0,0 +1,35 @@
+from utecio.ble.lock import UtecBleLock
+
+
+def api_device(uuid: str, model: str = "U-Bolt-WiFi", **params) -> dict:
+    return {
+        "name": f"Lock {uuid[-2:]}",
+        "uuid": uuid,
+        "model": model,
+        "user": {"uid": 7, "password": 6 << 28 | 123456},
+        "params": {"extend_ble": "", "serialnumber": "SN1", **params},
+    }
+
+
+def test_from_json():
+    lock = UtecBleLock.from_json(api_device("AA:00:00:00:00:01", extend_ble="AA:00"))
+    assert lock.mac_uuid == "AA:00:00:00:00:01"
+    assert lock.uid == "7"
+    assert lock.password == "123456"
+    assert lock.wurx_uuid == "AA:00"
+    assert lock.sn == "SN1"
+
+
+def test_from_json_list_filters_before_construction():
+    devices = [
+        api_device("AA:00:00:00:00:01"),
+        api_device("AA:00:00:00:00:02", model="Latch-5-F"),
+        api_device("AA:00:00:00:00:03", model="Unknown"),
+        # filtered out entries are never parsed
+        {"model": "Unknown"},
+    ]
+    locks = UtecBleLock.from_json_list(devices, capabilities=("bluetooth",))
+    assert [lock.mac_uuid for lock in locks] == ["AA:00:00:00:00:01", "AA:00:00:00:00:02"]
+
+    locks = UtecBleLock.from_json_list(devices[:3], models=["Latch-5-F"])
+    assert [lock.model for lock in locks] == ["Latch-5-F"]
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from utecio.bench import emulated_fleet, run_benchmark
+from utecio.enums import DeviceKeyUUID
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.mark.parametrize("key_mechanism", list(DeviceKeyUUID))
+def test_status(key_mechanism):
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1, key_mechanism)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        emulator.battery = 2
+        emulator.autolock_time = 45
+        await lock.async_update_status()
+        assert lock.battery == 2
+        assert lock.autolock_time == 45
+        assert lock.lock_status == emulator.lock_status
+        assert lock.bolt_status == emulator.bolt_status
+        assert emulator.connections == 1
+
+    run(main())
+
+
+def test_unlock_and_lock():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        await lock.async_unlock()
+        assert emulator.bolt_status == lock.bolt_status == 0
+        await lock.async_lock()
+        assert emulator.bolt_status == lock.bolt_status == 1
+
+    run(main())
+
+
+def test_benchmark_report():
+    async def main():
+        bluetooth, locks = emulated_fleet(3, latency=0.001)
+        return await run_benchmark(locks, "status", iterations=2)
+
+    report = run(main())
+    assert report["errors"] == 0
+    assert report["latency_ms"]["count"] == 6
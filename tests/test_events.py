@@ -0,0 +1,66 @@
+import asyncio
+
+from utecio.bench import emulated_fleet
+from utecio.ble.events import DOOR_CLOSED, DOOR_OPEN, UtecBleEvent
+from utecio.enums import BleResponseCode
+
+
+async def wait_until(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_listen_reports_pushed_events():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        events: list[UtecBleEvent] = []
+        remove = lock.add_event_callback(events.append)
+
+        listener = asyncio.create_task(lock.async_listen())
+        await wait_until(lambda: lock.listening)
+        emulator.set_door(DOOR_OPEN)
+        await wait_until(lambda: lock.door_status == DOOR_OPEN)
+        emulator.operate_manually(locked=False)
+        await wait_until(lambda: len(events) == 2)
+        lock.stop_listening()
+        await listener
+        remove()
+        return lock, emulator, events
+
+    lock, emulator, events = asyncio.run(main())
+    assert [event.kind for event in events] == ["door", "lock"]
+    assert events[0].command == BleResponseCode.DOORSENSOR
+    assert events[0].as_dict()["data"] == "01"
+    assert lock.lock_status == emulator.lock_status
+    assert lock.bolt_status == emulator.bolt_status
+    assert not lock.listening
+    assert not emulator.clients
+
+
+def test_listen_ends_after_duration():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await lock.async_listen(0.2)
+        return lock, loop.time() - started
+
+    lock, elapsed = asyncio.run(main())
+    assert 0.2 <= elapsed < 2
+    assert lock.door_status == DOOR_CLOSED
+
+
+def test_listen_ends_on_disconnect():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        listener = asyncio.create_task(lock.async_listen())
+        await wait_until(lambda: lock.listening)
+        emulator.drop_connections()
+        await asyncio.wait_for(listener, 2)
+        return lock
+
+    assert not asyncio.run(main()).listening
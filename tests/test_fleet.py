@@ -0,0 +1,72 @@
+import asyncio
+import os
+import signal
+
+import pytest
+
+from utecio.bench import emulated_locks
+from utecio.fleet import UtecFleetError, UtecFleetRunner, shard_by_hash
+
+DEVICES = [
+    {"uuid": f"EE:00:00:00:00:{i:02X}", "name": f"L{i}", "model": "U-Bolt-WiFi"}
+    for i in range(8)
+]
+
+
+def fleet(**options) -> UtecFleetRunner:
+    return UtecFleetRunner(DEVICES, shards=2, factory=emulated_locks, **options)
+
+
+def test_assignment_is_stable():
+    runner = fleet()
+    assert len(runner.assignment) == len(DEVICES)
+    for device in DEVICES:
+        assert runner.assignment[device["uuid"]] == shard_by_hash(device, 2)
+    assert set(runner.assignment.values()) == {0, 1}
+
+
+def test_commands_and_events():
+    async def main():
+        async with fleet() as runner:
+            events = []
+
+            async def listen():
+                async for event in runner.events():
+                    events.append(event)
+
+            listener = asyncio.create_task(listen())
+            await asyncio.sleep(0)
+            states = await asyncio.gather(
+                *(runner.command(device["uuid"], "unlock") for device in DEVICES)
+            )
+            with pytest.raises(UtecFleetError):
+                await runner.command(DEVICES[0]["uuid"], "bogus")
+            with pytest.raises(UtecFleetError):
+                await runner.command("EE:00:00:00:FF:FF", "status")
+        await listener
+        return states, events
+
+    states, events = asyncio.run(main())
+    assert len(states) == len(DEVICES)
+    assert all(state["lock_status"] is not None for state in states)
+    addresses = {event["address"] for event in events if event["type"] != "exit"}
+    assert addresses == {device["uuid"] for device in DEVICES}
+
+
+def test_dead_shard_fails_its_commands():
+    async def main():
+        async with fleet() as runner:
+            victim = next(a for a, shard in runner.assignment.items() if shard == 0)
+            other = next(a for a, shard in runner.assignment.items() if shard == 1)
+            process = runner._processes[0]
+            os.kill(process.pid, signal.SIGSTOP)
+            pending = asyncio.create_task(runner.command(victim, "status"))
+            await asyncio.sleep(0.2)
+            process.kill()
+            with pytest.raises(UtecFleetError):
+                await asyncio.wait_for(pending, 10)
+            with pytest.raises(UtecFleetError):
+                await runner.command(victim, "status")
+            return await runner.command(other, "status")
+
+    assert asyncio.run(main())["lock_status"] is not None
@@ -0,0 +1,47 @@
+import asyncio
+
+from utecio.bench import emulated_fleet
+from utecio.ble.device import UtecBleFrameCache, UtecBleRequest
+from utecio.enums import BLECommandCode, DeviceKeyUUID
+
+
+def test_key_change_invalidates():
+    cache = UtecBleFrameCache()
+    assert cache.get(b"k1", b"plain") is None
+    cache.put(b"plain", b"cipher")
+    assert cache.get(b"k1", b"plain") == b"cipher"
+    assert cache.get(b"k2", b"plain") is None
+    assert cache.frames == {}
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_only_constant_commands_are_cached():
+    UtecBleRequest(BLECommandCode.GET_BATTERY)
+    UtecBleRequest(BLECommandCode.WRITE_TIME, data=b"\x01\x02\x03\x04")
+    commands = {command for command, _ in UtecBleRequest._packages}
+    assert BLECommandCode.GET_BATTERY.value in commands
+    assert BLECommandCode.WRITE_TIME.value not in commands
+
+
+def status_twice(key_mechanism: DeviceKeyUUID) -> tuple[UtecBleFrameCache, int]:
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1, key_mechanism)
+        await lock.async_update_status()
+        first_misses = lock.frame_cache.misses
+        await lock.async_update_status()
+        assert lock.battery == bluetooth.devices[lock.mac_uuid].battery
+        return lock.frame_cache, first_misses
+
+    return asyncio.run(main())
+
+
+def test_static_key_reuses_frames_across_sessions():
+    cache, first_misses = status_twice(DeviceKeyUUID.STATIC)
+    assert cache.misses == first_misses
+    assert cache.hits > 0
+
+
+def test_session_key_change_rebuilds_frames():
+    cache, first_misses = status_twice(DeviceKeyUUID.ECC)
+    assert cache.misses > first_misses
+    assert cache.hits == 0
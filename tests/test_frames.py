@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from utecio.bench import emulated_fleet
+from utecio.ble.frames import UtecBleFrameReader
+from utecio.util import crc8
+
+
+def frame(code: int, data: bytes = b"") -> bytes:
+    body = bytes([code]) + data
+    return b"\x7f" + (len(body) + 1).to_bytes(2, "little") + body + bytes([crc8(body)])
+
+
+def test_single_frame():
+    reader = UtecBleFrameReader()
+    assert reader.feed(frame(0x81, b"\x00\x01")) == [frame(0x81, b"\x00\x01")]
+    assert len(reader) == 0
+
+
+def test_frames_split_and_combined():
+    first, second = frame(0x81, bytes(20)), frame(0x82, b"\x00")
+    stream = first + second
+    reader = UtecBleFrameReader()
+    frames = []
+    for i in range(0, len(stream), 16):
+        frames += reader.feed(stream[i : i + 16])
+    assert frames == [first, second]
+
+
+def test_resync_after_garbage_and_padding():
+    good = frame(0x81, b"\x00\x02")
+    reader = UtecBleFrameReader()
+    assert reader.feed(b"\x00\x12\x34" + good + bytes(5)) == [good]
+    assert reader.dropped == 8
+
+
+def test_resync_after_corrupt_frame():
+    bad = bytearray(frame(0x81, b"\x00\x7f\x03"))
+    bad[-1] ^= 0xFF
+    good = frame(0x82, b"\x00")
+    reader = UtecBleFrameReader()
+    assert reader.feed(bytes(bad) + good) == [good]
+    assert reader.dropped == len(bad)
+
+
+def test_oversized_data_starts_over():
+    reader = UtecBleFrameReader(capacity=32)
+    reader.feed(b"\x7f\xff")
+    good = frame(0x81, b"\x00")
+    assert reader.feed(bytes(40) + good) == [good]
+
+
+@pytest.mark.parametrize("notification_size", [16, 256])
+def test_notification_sizes_end_to_end(notification_size):
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1, notification_size=notification_size)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        emulator.battery = 1
+        await lock.async_update_status()
+        assert lock.battery == 1
+
+    asyncio.run(main())
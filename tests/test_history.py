@@ -0,0 +1,91 @@
+import asyncio
+import datetime
+import time
+
+import pytest
+
+from utecio.bench import emulated_fleet
+from utecio.ble.device import UtecBleDeviceError, UtecBleError
+from utecio.ble.history import HISTORY_RECORD, UtecBleHistory, UtecBleHistoryRequest
+from utecio.ble.lock import UtecBleLock
+from utecio.enums import BLECommandCode
+from utecio.util import date_to_4bytes
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_decode_columns():
+    when = int.from_bytes(date_to_4bytes(datetime.datetime(2024, 5, 1, 8, 30)), "big")
+    data = HISTORY_RECORD.pack(10, when, 3, 1, 2)
+    data += HISTORY_RECORD.pack(11, when, 4, 0, 1)
+    # a trailing partial record is ignored
+    history = UtecBleHistory.decode(data + b"\x00")
+    assert list(history.index) == [10, 11]
+    assert list(history.user_id) == [3, 4]
+    assert history.cursor == 12
+    assert history.datetimes[0] == datetime.datetime(2024, 5, 1, 8, 30)
+
+
+def test_history_paging():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        emulator.add_history(100)
+        emulator.records_per_frame = 16
+        chunks = [chunk async for chunk in lock.async_history(count=40)]
+        assert sum(len(chunk) for chunk in chunks) == 100
+        assert max(len(chunk) for chunk in chunks) == 16
+        assert emulator.commands.count(BLECommandCode.READ_HISTORY) == 3
+        assert emulator.connections == 1
+        assert lock.history_cursor == 100
+
+        emulator.add_history(5)
+        history = await lock.async_read_history()
+        assert list(history.index) == [100, 101, 102, 103, 104]
+
+    run(main())
+
+
+def test_refused_read_raises():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        emulator.add_history(10)
+        emulator.refused.add(BLECommandCode.READ_HISTORY.value)
+        with pytest.raises(UtecBleDeviceError):
+            await lock.async_read_history()
+        assert lock.history_cursor == 0
+
+    run(main())
+
+
+def test_unconfirmed_on_real_locks():
+    async def main():
+        lock = UtecBleLock("1", "123456", "AA:00:00:00:00:01", "Front Door")
+        with pytest.raises(UtecBleError):
+            await lock.async_read_history()
+        assert not lock._requests
+
+    run(main())
+
+
+def test_timeout_applies_per_notification():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(
+            1, notification_interval=0.05, notification_size=64
+        )
+        emulator = bluetooth.devices[lock.mac_uuid]
+        emulator.add_history(64)
+        emulator.records_per_frame = 4
+        request = UtecBleHistoryRequest(0, 64)
+        request.timeout = 0.2
+        lock.add_request(request)
+        started = time.monotonic()
+        await lock.send_requests()
+        # the whole response takes well over one timeout
+        assert time.monotonic() - started > 0.5
+        assert len(request.history) == 64
+
+    run(main())
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import stat
+
+from utecio.api import UtecClient
+from utecio.inventory import UtecInventoryStore, compact_device
+
+
+def api_device(uuid: str) -> dict:
+    return {
+        "name": "Front Door",
+        "uuid": uuid,
+        "model": "U-Bolt-WiFi",
+        "user": {"uid": 7, "password": 6 << 28 | 123456, "nickname": "x"},
+        "params": {"extend_ble": "", "serialnumber": "SN1", "timezone": "UTC"},
+        "firmware": "1.2.3",
+    }
+
+
+def test_round_trip_is_compact(tmp_path):
+    store = UtecInventoryStore(str(tmp_path / "inventory.json"))
+    store.save([api_device("AA:00:00:00:00:01")])
+    assert store.load() == [compact_device(api_device("AA:00:00:00:00:01"))]
+    assert "firmware" not in store.load()[0]
+    assert store.updated is not None
+
+
+def test_file_is_owner_only(tmp_path):
+    path = tmp_path / "inventory.json"
+    # a stale temp file must not hand its mode to the snapshot
+    (tmp_path / "inventory.json.tmp").write_text("{}")
+    os.chmod(tmp_path / "inventory.json.tmp", 0o644)
+    UtecInventoryStore(str(path)).save([api_device("AA:00:00:00:00:01")])
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_unusable_snapshots_load_empty(tmp_path):
+    path = tmp_path / "inventory.json"
+    store = UtecInventoryStore(str(path))
+    assert store.load() == []
+    path.write_text("{not json")
+    assert store.load() == []
+    path.write_text('{"version": 999, "devices": [{}]}')
+    assert store.load() == []
+    store.clear()
+    assert not path.exists()
+
+
+def test_cached_startup_refreshes_in_background(tmp_path):
+    async def main():
+        store = UtecInventoryStore(str(tmp_path / "inventory.json"))
+        store.save([api_device("AA:00:00:00:00:01")])
+        client = UtecClient("user@example.com", "secret", inventory=store)
+        refreshed = asyncio.Event()
+
+        async def sync_devices():
+            client.devices = [api_device("AA:00:00:00:00:02")]
+            refreshed.set()
+
+        client.sync_devices = sync_devices
+        locks = await client.get_ble_devices_cached()
+        assert [lock.mac_uuid for lock in locks] == ["AA:00:00:00:00:01"]
+        await asyncio.wait_for(refreshed.wait(), 1)
+        assert client.devices[0]["uuid"] == "AA:00:00:00:00:02"
+
+    asyncio.run(main())
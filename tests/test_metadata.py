@@ -0,0 +1,49 @@
+import asyncio
+import os
+import stat
+
+from utecio.bench import emulated_fleet
+from utecio.ble.metadata import UtecBleMetadataStore
+from utecio.enums import BLECommandCode
+
+
+def status(store: UtecBleMetadataStore):
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        lock.metadata = store
+        await lock.async_update_status()
+        return lock, bluetooth.devices[lock.mac_uuid]
+
+    return asyncio.run(main())
+
+
+def test_store_round_trip(tmp_path):
+    path = str(tmp_path / "metadata.json")
+    store = UtecBleMetadataStore(path)
+    assert store.update("aa:bb:cc:dd:ee:ff", sn="SN1", wurx_uuid=None)
+    assert not store.update("AA:BB:CC:DD:EE:FF", sn="SN1")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    reloaded = UtecBleMetadataStore(path)
+    assert reloaded.get("AA:BB:CC:DD:EE:FF")["sn"] == "SN1"
+    assert "wurx_uuid" not in reloaded.get("AA:BB:CC:DD:EE:FF")
+    reloaded.clear()
+    assert not os.path.exists(path)
+    assert UtecBleMetadataStore(path).get("AA:BB:CC:DD:EE:FF") == {}
+
+
+def test_unknown_fields_are_ignored(tmp_path):
+    store = UtecBleMetadataStore(str(tmp_path / "metadata.json"))
+    assert not store.update("AA:BB:CC:DD:EE:FF", model="U-Bolt")
+    assert store.get("AA:BB:CC:DD:EE:FF") == {}
+
+
+def test_serial_is_read_once(tmp_path):
+    path = str(tmp_path / "metadata.json")
+    lock, emulator = status(UtecBleMetadataStore(path))
+    assert BLECommandCode.GET_SN in emulator.commands
+    assert lock.sn == emulator.sn
+
+    lock, emulator = status(UtecBleMetadataStore(path))
+    assert lock.sn == emulator.sn
+    assert BLECommandCode.GET_SN not in emulator.commands
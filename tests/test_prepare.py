@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from utecio.bench import emulated_fleet
+from utecio.ble.device import UtecBleTimeoutError
+from utecio.enums import BLECommandCode
+
+
+def test_prepared_unlock_within_deadline():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1, connect_latency=0.1)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        assert await lock.async_prepare(2.0)
+        sent = len(emulator.commands)
+        await lock.async_unlock(update=False, timeout=0.5)
+        lock.stop_listening()
+        return emulator, sent
+
+    emulator, sent = asyncio.run(main())
+    assert emulator.commands[sent:] == [BLECommandCode.UNLOCK]
+    assert emulator.connections == 1
+
+
+def test_prepared_unlock_past_deadline():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        assert await lock.async_prepare(2.0)
+        emulator.latency = 1.0
+        with pytest.raises(UtecBleTimeoutError):
+            await lock.async_unlock(update=False, timeout=0.2)
+        lock.stop_listening()
+
+    asyncio.run(main())
+
+
+def test_prepared_session_is_released():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        assert await lock.async_prepare(0.1)
+        assert emulator.clients
+        await asyncio.sleep(0.3)
+        expired = not emulator.clients and not lock.listening
+
+        assert await lock.async_prepare(10)
+        lock.stop_listening()
+        await asyncio.sleep(0.1)
+        return expired, emulator, lock
+
+    expired, emulator, lock = asyncio.run(main())
+    assert expired
+    assert not emulator.clients
+    assert not lock.listening and not lock.is_busy
+    assert emulator.connections == 2
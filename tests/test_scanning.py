@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+from utecio.bench import emulated_fleet
+from utecio.ble.scanning import UtecBleScanCoordinator
+
+
+class FlakyScanner:
+    def __init__(self):
+        self.running = True
+
+    async def start(self):
+        self.running = True
+
+    async def stop(self):
+        raise RuntimeError("busy")
+
+
+def test_burst_of_connects_pauses_once():
+    async def main():
+        bluetooth, _ = emulated_fleet(0)
+        scanner = bluetooth.scanner()
+        await scanner.start()
+        coordinator = UtecBleScanCoordinator(resume_delay=0.05)
+        coordinator.add_scanner(scanner)
+
+        await asyncio.gather(coordinator.pause(), coordinator.pause())
+        paused = coordinator.paused() and not scanner.running
+        coordinator.resume()
+        await asyncio.sleep(0.02)
+        # a connect starting within resume_delay keeps the scanner stopped
+        await coordinator.pause()
+        coordinator.resume()
+        coordinator.resume()
+        await asyncio.sleep(0.02)
+        still_paused = not scanner.running
+        await asyncio.sleep(0.1)
+        return paused, still_paused, scanner, coordinator.metrics()[None]
+
+    paused, still_paused, scanner, metrics = asyncio.run(main())
+    assert paused and still_paused
+    assert scanner.running
+    assert (scanner.stops, scanner.starts) == (1, 2)
+    assert metrics["pauses"] == 1
+    assert metrics["paused_time"] > 0.05
+    assert not metrics["paused"] and metrics["connecting"] == 0
+
+
+def test_failed_pause_does_not_block_connects():
+    async def main():
+        coordinator = UtecBleScanCoordinator(resume_delay=0)
+        coordinator.add_scanner(FlakyScanner(), "hci1")
+        await coordinator.pause("hci1")
+        coordinator.resume("hci1")
+        # adapters without a scanner of their own are not arbitrated
+        await coordinator.pause("hci0")
+        return coordinator.metrics()
+
+    metrics = asyncio.run(main())
+    assert list(metrics) == ["hci1"]
+    assert metrics["hci1"]["failures"] == 1
+    assert metrics["hci1"]["pauses"] == 0
+
+
+def test_scanner_is_paused_only_while_connecting():
+    async def main():
+        bluetooth, locks = emulated_fleet(4, scan_latency=0.3)
+        scanner = bluetooth.scanner()
+        await scanner.start()
+        coordinator = UtecBleScanCoordinator(resume_delay=0.05)
+        coordinator.add_scanner(scanner)
+        scanning_at_lookup = []
+
+        async def lookup(address):
+            scanning_at_lookup.append(scanner.running)
+            return await bluetooth.async_bledevice_callback(address)
+
+        for lock in locks:
+            lock.scan_coordinator = coordinator
+            lock.async_bledevice_callback = lookup
+
+        started = time.perf_counter()
+        await asyncio.gather(*(lock.async_update_status() for lock in locks))
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.1)
+        return elapsed, scanning_at_lookup, scanner, locks
+
+    elapsed, scanning_at_lookup, scanner, locks = asyncio.run(main())
+    assert elapsed < 0.3
+    assert scanning_at_lookup[0]
+    assert scanner.running and scanner.stops == 1
+    assert all("scan_pause" in lock.timings for lock in locks)
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from utecio.bench import emulated_fleet
+from utecio.ble.device import UtecBleDeviceError
+from utecio.enums import DeviceKeyUUID
+
+
+def test_services_are_discovered_once():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        for _ in range(3):
+            await lock.async_update_status()
+        return lock, emulator
+
+    lock, emulator = asyncio.run(main())
+    assert emulator.connections == 3
+    assert emulator.discoveries == 1
+    assert lock.services is not None
+
+
+def test_without_cache_every_connect_discovers():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        lock.use_services_cache = False
+        emulator = bluetooth.devices[lock.mac_uuid]
+        for _ in range(2):
+            await lock.async_update_status()
+        return emulator
+
+    assert asyncio.run(main()).discoveries == 2
+
+
+def test_stale_cache_is_cleared():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1, DeviceKeyUUID.MD5)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        await lock.async_update_status()
+        # e.g. a firmware update that changes the lock's services
+        emulator.key_mechanism = DeviceKeyUUID.STATIC
+        with pytest.raises(UtecBleDeviceError):
+            await lock.async_update_status()
+        cleared = lock.services is None and emulator.cached_services is None
+        await lock.async_update_status()
+        return cleared, emulator
+
+    cleared, emulator = asyncio.run(main())
+    assert cleared
+    assert emulator.discoveries == 2
@@ -0,0 +1,23 @@
+import asyncio
+
+from utecio.bench import emulated_fleet
+from utecio.enums import BLECommandCode, DeviceLockWorkMode
+
+
+def test_one_login_per_connection():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        async with lock.batch() as batch:
+            batch.set_autolock(30)
+            batch.set_workmode(DeviceLockWorkMode.PASSAGE)
+            batch.update_status()
+        assert emulator.commands.count(BLECommandCode.ADMIN_LOGIN) == 1
+        assert not lock.authenticated
+
+        # a new connection logs in again
+        await lock.async_set_autolock(10)
+        assert emulator.commands.count(BLECommandCode.ADMIN_LOGIN) == 2
+
+    asyncio.run(main())
+
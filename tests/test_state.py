@@ -0,0 +1,80 @@
+import asyncio
+
+from utecio.bench import emulated_fleet
+from utecio.ble.lock import UtecBleLock
+from utecio.state import UtecFleetState
+
+
+def fleet_state(batteries: list[int], statuses: list[int]):
+    state = UtecFleetState()
+    locks = []
+    for i, (battery, lock_status) in enumerate(zip(batteries, statuses)):
+        lock = UtecBleLock("1", "1", f"AA:00:00:00:00:{i:02X}", f"Lock {i}")
+        lock.battery = battery
+        lock.lock_status = lock_status
+        state.register(lock)
+        locks.append(lock)
+    return state, locks
+
+
+def test_mask_and_select():
+    state, locks = fleet_state([0, 3, 1, 2], [1, 1, 2, 1])
+    assert state.mask(battery=("<=", 1), lock_status=1) == [True, False, False, False]
+    assert state.select(lock_status=1) == [
+        locks[0].mac_uuid,
+        locks[1].mac_uuid,
+        locks[3].mac_uuid,
+    ]
+    assert state.count(battery=(">", 0)) == 3
+    assert state.mask() == [True] * 4
+
+
+def test_register_is_idempotent():
+    state, locks = fleet_state([0], [1])
+    assert state.register(locks[0]) == 0
+    assert len(state) == 1
+    assert state.row(locks[0].mac_uuid)["battery"] == 0
+
+
+def test_aggregate_ignores_unknown():
+    state, _ = fleet_state([0, 3, -1, 3], [1, 2, 1, 2])
+    assert state.aggregate("battery") == {
+        "count": 3,
+        "min": 0,
+        "max": 3,
+        "mean": 2,
+        "values": {0: 1, 3: 2},
+    }
+    assert state.aggregate("battery", lock_status=1)["count"] == 1
+    assert state.aggregate("battery", battery=-1) == {"count": 0}
+
+
+def test_diff_since_snapshot():
+    state, locks = fleet_state([0, 3], [1, 1])
+    snapshot = state.snapshot()
+    locks[1].battery = 2
+    state.write(1, locks[1])
+    late = UtecBleLock("1", "1", "AA:00:00:00:00:FF", "Late")
+    state.register(late)
+
+    changes = state.diff(snapshot)
+    assert changes[locks[1].mac_uuid] == {"battery": (3, 2)}
+    assert locks[0].mac_uuid not in changes
+    assert changes[late.mac_uuid]["battery"] == (None, -1)
+    assert state.diff(state.snapshot()) == {}
+
+
+def test_responses_update_registered_rows():
+    async def main():
+        bluetooth, locks = emulated_fleet(2)
+        state = UtecFleetState()
+        for lock in locks:
+            state.register(lock)
+        snapshot = state.snapshot()
+        await locks[0].async_unlock()
+        return state, snapshot, locks
+
+    state, snapshot, locks = asyncio.run(main())
+    changes = state.diff(snapshot)
+    assert list(changes) == [locks[0].mac_uuid]
+    assert state.row(locks[0].mac_uuid)["lock_status"] == locks[0].lock_status
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from utecio.api import (
+    InvalidResponse,
+    UtecApiConnectionError,
+    UtecApiError,
+    UtecApiThrottledError,
+    UtecClient,
+)
+from utecio.throttle import UtecAdaptiveLimiter, limiter_for
+
+
+def test_limit_grows_by_one_per_round_trip():
+    async def main():
+        limiter = UtecAdaptiveLimiter(initial=4, maximum=8)
+        for _ in range(4):
+            await limiter.acquire()
+        for _ in range(4):
+            limiter.release()
+        return limiter
+
+    limiter = asyncio.run(main())
+    assert limiter.limit == pytest.approx(4.9, abs=0.05)
+    assert limiter.in_flight == 0
+
+
+def test_throttling_halves_and_failures_keep_the_limit():
+    async def main():
+        limiter = UtecAdaptiveLimiter(initial=8, minimum=2)
+        await limiter.acquire()
+        limiter.release(failed=True)
+        failed = limiter.limit
+        for _ in range(3):
+            await limiter.acquire()
+            limiter.release(throttled=True, failed=True)
+        return failed, limiter
+
+    failed, limiter = asyncio.run(main())
+    assert failed == 8
+    assert limiter.limit == 2
+    assert limiter.throttled == 3
+
+
+def test_waiters_are_woken_on_release():
+    async def main():
+        limiter = UtecAdaptiveLimiter(initial=1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        blocked = not waiter.done()
+        limiter.release()
+        await asyncio.wait_for(waiter, 1)
+        return blocked, limiter
+
+    blocked, limiter = asyncio.run(main())
+    assert blocked
+    assert limiter.in_flight == 1
+
+
+async def serve(handler) -> tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_post("/{path}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"127.0.0.1:{port}"
+
+
+def post(handler, path: str = "x", retries: int = 2):
+    async def main():
+        runner, host = await serve(handler)
+        client = UtecClient("user", "password")
+        client.retries = retries
+        try:
+            return await client._post(f"http://{host}/{path}", {}, {}), host
+        finally:
+            await client.session.close()
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr("utecio.api.API_RETRY_BASE_DEF", 0.001)
+
+
+def test_throttled_calls_are_retried():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.path)
+        if len(calls) < 3:
+            return web.Response(status=429, headers={"Retry-After": "0"})
+        return web.json_response({"error": None, "data": []})
+
+    response, host = post(handler)
+    assert response == {"error": None, "data": []}
+    assert len(calls) == 3
+    assert limiter_for(host).throttled == 2
+
+
+def test_retries_give_up_with_the_last_error():
+    async def throttled(request):
+        return web.Response(status=503)
+
+    async def failing(request):
+        return web.Response(status=500)
+
+    with pytest.raises(UtecApiThrottledError):
+        post(throttled, retries=1)
+    with pytest.raises(UtecApiConnectionError):
+        post(failing, retries=1)
+
+
+def test_client_errors_are_not_retried():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.path)
+        return web.Response(status=403)
+
+    with pytest.raises(UtecApiError):
+        post(handler)
+    assert len(calls) == 1
+
+
+def test_undecodable_response():
+    async def handler(request):
+        return web.Response(text="<html>")
+
+    with pytest.raises(InvalidResponse):
+        post(handler)
+
+
+@pytest.mark.parametrize(
+    "response", [{"error": "denied"}, {"error": None}, {"data": {"id": 1}}]
+)
+def test_listing_without_data(response):
+    with pytest.raises(InvalidResponse):
+        UtecClient._data("http://host/x", response)
+    assert UtecClient._data("http://host/x", {"data": [{"id": 1}]}) == [{"id": 1}]
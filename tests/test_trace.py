@@ -0,0 +1,48 @@
+import asyncio
+import os
+import stat
+
+import pytest
+
+from utecio.bench import emulated_fleet
+from utecio.ble.lock import UtecBleLock
+from utecio.ble.trace import UtecBleTraceRecorder, UtecBleTraceReplayer
+from utecio.enums import DeviceKeyUUID
+
+
+@pytest.mark.parametrize("key_mechanism", list(DeviceKeyUUID))
+def test_record_and_replay(tmp_path, key_mechanism):
+    path = str(tmp_path / "lock.trace")
+
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1, key_mechanism)
+        bluetooth.devices[lock.mac_uuid].battery = 1
+        with UtecBleTraceRecorder(path) as recorder:
+            lock.recorder = recorder
+            await lock.async_update_status()
+            await lock.async_unlock()
+        return lock
+
+    lock = asyncio.run(main())
+    replayed = UtecBleLock("", "", "", "Replay", device_model=lock.model)
+    stats = UtecBleTraceReplayer(path).replay(replayed)
+    assert stats["frames"] == stats["recorded_frames"] > 0
+    assert stats["write_mismatches"] == stats["key_mismatches"] == 0
+    assert replayed.mac_uuid == lock.mac_uuid
+    assert (replayed.battery, replayed.lock_status) == (1, lock.lock_status)
+
+
+def test_trace_is_owner_only(tmp_path):
+    path = tmp_path / "lock.trace"
+    path.write_bytes(b"old")
+    os.chmod(path, 0o644)
+    UtecBleTraceRecorder(str(path)).close()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert path.read_bytes() == b"UTECTRC1"
+
+
+def test_not_a_trace(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"nothing")
+    with pytest.raises(ValueError):
+        list(UtecBleTraceReplayer(str(path)).records())
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from utecio.bench import emulated_fleet
+from utecio.ble.device import UtecBleDeviceError, UtecBleError
+from utecio.ble.lock import UtecBleLock
+from utecio.ble.users import USER_TYPE_ADMIN, UtecBleUser, diff_users, provision_fleet
+from utecio.enums import BLECommandCode
+
+
+def test_diff_add_update_delete():
+    current = [
+        UtecBleUser(1, "1111"),
+        UtecBleUser(2, "2222"),
+        UtecBleUser(3, "3333"),
+    ]
+    desired = [UtecBleUser(1, "1111"), UtecBleUser(2, "2020"), UtecBleUser(4, "4444")]
+    diff = diff_users(current, desired)
+    assert diff.add == [UtecBleUser(4, "4444")]
+    assert diff.update == [UtecBleUser(2, "2020")]
+    assert diff.delete == [3]
+
+
+def test_diff_keeps_admin_and_honours_prune():
+    current = [UtecBleUser(0, "123456", USER_TYPE_ADMIN), UtecBleUser(5, "5555")]
+    assert diff_users(current, []).delete == [5]
+    assert diff_users(current, [], prune=False).delete == []
+
+
+def test_diff_in_sync_is_empty():
+    users = [UtecBleUser(1, "1111"), UtecBleUser(2, "2222")]
+    assert not diff_users(users, list(users))
+
+
+def test_desired_codes_are_validated():
+    with pytest.raises(ValueError):
+        UtecBleUser(1, "12ab")
+
+
+def test_records_from_lock_are_not_validated():
+    record = UtecBleUser(7, "", validate=False).pack()
+    assert UtecBleUser.decode_many(record) == [UtecBleUser(7, "", validate=False)]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_sync_writes_only_differences():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        current = [UtecBleUser(i, f"{1000 + i}") for i in range(1, 6)]
+        await lock.async_sync_users(current)
+        desired = current[:4]
+        desired[1] = UtecBleUser(2, "2002")
+        diff = await lock.async_sync_users(desired)
+        assert (len(diff.add), len(diff.update), diff.delete) == (0, 1, [5])
+        writes = [BLECommandCode.DELETE_USER, BLECommandCode.ADD_USER]
+        assert emulator.commands[-2:] == writes
+        assert await lock.async_read_users() == desired
+
+    run(main())
+
+
+def test_refused_read_raises():
+    async def main():
+        bluetooth, [lock] = emulated_fleet(1)
+        emulator = bluetooth.devices[lock.mac_uuid]
+        emulator.refused.add(BLECommandCode.READ_USERS.value)
+        with pytest.raises(UtecBleDeviceError):
+            await lock.async_sync_users([UtecBleUser(1, "1111")])
+        assert BLECommandCode.ADD_USER not in emulator.commands
+
+    run(main())
+
+
+def test_provision_fleet():
+    async def main():
+        bluetooth, locks = emulated_fleet(3)
+        refusing = bluetooth.devices[locks[2].mac_uuid]
+        refusing.refused.add(BLECommandCode.READ_USERS.value)
+        results = await provision_fleet(locks, [UtecBleUser(1, "1111")])
+        assert [len(results[lock.mac_uuid].add) for lock in locks[:2]] == [1, 1]
+        assert isinstance(results[locks[2].mac_uuid], UtecBleDeviceError)
+
+    run(main())
+
+
+def test_unconfirmed_on_real_locks():
+    async def main():
+        lock = UtecBleLock("1", "123456", "AA:00:00:00:00:01", "Front Door")
+        with pytest.raises(UtecBleError):
+            await lock.async_sync_users([UtecBleUser(1, "1111")])
+        with pytest.raises(UtecBleError):
+            await lock.async_read_users()
+        assert not lock._requests
+
+    run(main())
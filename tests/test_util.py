@@ -0,0 +1,47 @@
+import datetime
+
+import pytest
+
+from utecio.util import date_from_4bytes, date_to_4bytes, decode_password
+
+
+def decode_password_reference(password: int) -> str:
+    """decode_password as it was before the nibble rewrite."""
+    byte_array = bytearray(4)
+    for i in range(4):
+        byte_array[i] = (password >> (i * 8)) & 255
+    hex_string = "".join(format(b, "02x") for b in reversed(byte_array))
+    digits = int(hex_string[0])
+    if digits == 0:
+        return str(password)
+    code = str(int(hex_string[1:], 16))
+    return code.zfill(digits)
+
+
+@pytest.mark.parametrize(
+    "code",
+    ["1", "0", "007", "1234", "000000", "123456", "98765432", "099999999"],
+)
+def test_decode_password_matches_reference(code):
+    password = len(code) << 28 | int(code)
+    assert decode_password(password) == decode_password_reference(password) == code
+
+
+@pytest.mark.parametrize("password", [0, 7, 123456, 0x0FFFFFFF])
+def test_decode_password_without_length(password):
+    assert decode_password(password) == decode_password_reference(password)
+
+
+@pytest.mark.parametrize(
+    "date",
+    [
+        datetime.datetime(2000, 1, 1, 0, 0, 0),
+        datetime.datetime(2024, 2, 29, 23, 59, 59),
+        datetime.datetime(2031, 12, 31, 12, 30, 5),
+        datetime.datetime(2063, 6, 15, 7, 8, 9),
+    ],
+)
+def test_date_round_trip(date):
+    packed = date_to_4bytes(date)
+    assert len(packed) == 4
+    assert date_from_4bytes(packed) == date
@@ -392,3 +392,10 @@ known_devices: dict[str, DeviceDefinition] = {
     DeviceLockUL3.model: DeviceLockUL3(),
     DeviceLockUL300.model: DeviceLockUL300(),
 }
+
+generic_device = GenericLock()
+
+
+def get_device_definition(model: str) -> DeviceDefinition:
+    """Return the shared capability definition for a model."""
+    return known_devices.get(model, generic_device)
@@ -2,16 +2,29 @@
 ### Original code courtesy of RobertD502
 from __future__ import annotations
 
+import asyncio
 import json
+import random
 import secrets
 import string
 import time
+from collections.abc import AsyncIterator, Iterable
 from typing import Any
+from urllib.parse import urlsplit
 from . import logger
 
-from aiohttp import ClientResponse, ClientSession
+from aiohttp import ClientError, ClientResponse, ClientSession
 
 from .ble.lock import UtecBleLock
+from .const import API_RETRY_BASE_DEF, API_RETRY_CAP_DEF, API_RETRY_MAX_DEF
+from .inventory import UtecInventoryStore, compact_device
+from .throttle import limiter_for
+
+try:
+    # optional, several times faster on large device lists
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
 ### Headers
 
@@ -34,23 +47,50 @@ TIME_ZONE = "-4"
 VERSION = "V3.2"
 
 
-class InvalidResponse(Exception):
+class UtecApiError(Exception):
+    """Request to the UTEC servers failed."""
+
+
+class UtecApiConnectionError(UtecApiError):
+    """UTEC servers could not be reached."""
+
+
+class UtecApiThrottledError(UtecApiError):
+    """UTEC servers kept rejecting requests as too frequent."""
+
+    retry_after: float = 0.0
+
+
+class InvalidResponse(UtecApiError):
     """Unknown response from UTEC servers."""
 
 
-class InvalidCredentials(Exception):
+class InvalidCredentials(UtecApiError):
     """Could not login to UTEC servers."""
 
 
+# statuses worth retrying, 429 and 503 also lower the concurrency limit
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+THROTTLE_STATUS = {429, 503}
+
+
 class UtecClient:
     """U-Tec Client."""
 
     def __init__(
-        self, email: str, password: str, session: ClientSession = None
+        self,
+        email: str,
+        password: str,
+        session: ClientSession = None,
+        inventory: UtecInventoryStore = None,
     ) -> None:
         """Initialize U-Tec client using the user provided email and password.
 
         session: aiohttp.ClientSession
+        inventory: optional local store used for offline startup
+
+        Device entries are kept compact, with only the fields `from_json`
+        reads, unless `compact` is set to False.
         """
 
         self.mobile_uuid: str | None = None
@@ -62,6 +102,10 @@ class UtecClient:
         self.addresses: list = []
         self.rooms: list = []
         self.devices: list = []
+        self.inventory = inventory
+        self.refresh_task: asyncio.Task | None = None
+        self.retries: int = API_RETRY_MAX_DEF
+        self.compact: bool = True
         self._generate_random_mobile_uuid(32)
 
     def _generate_random_mobile_uuid(self, length: int) -> None:
@@ -84,7 +128,7 @@ class UtecClient:
         }
 
         response = await self._post(url, headers, data)
-        if response["error"]:
+        if response.get("error"):
             raise InvalidResponse("Error fetching token.")
 
         self.token = response["data"]["token"]
@@ -102,7 +146,7 @@ class UtecClient:
         data = {"data": json.dumps(auth_data), "token": self.token}
 
         response = await self._post(url, headers, data)
-        if response["error"]:
+        if response.get("error"):
             logger.debug(response["error"])
             raise InvalidCredentials("Login/password combination not found.")
 
@@ -115,7 +159,7 @@ class UtecClient:
         data = {"data": json.dumps(body_data), "token": self.token}
 
         response = await self._post(url, headers, data)
-        for address in response["data"]:
+        for address in self._data(url, response):
             self.addresses.append(address)
             # self.address_ids.append(address_id["id"])
 
@@ -128,71 +172,188 @@ class UtecClient:
         data = {"data": json.dumps(body_data), "token": self.token}
 
         response = await self._post(url, headers, data)
-        for room in response["data"]:
+        for room in self._data(url, response):
             self.rooms.append(room)
 
     async def _get_devices_in_room(self, room) -> None:
         """Fetches all the devices that are located in a room."""
 
+        self.devices.extend(await self._fetch_devices_in_room(room))
+
+    async def _fetch_devices_in_room(self, room) -> list[dict[str, Any]]:
         url = "https://cloud.u-tec.com/app/device/list"
         headers = HEADERS
         body_data = {"room_id": room["id"], "timestamp": str(time.time())}
         data = {"data": json.dumps(body_data), "token": self.token}
 
-        response = await self._post(url, headers, data)
-        for api_device in response["data"]:
-            self.devices.append(api_device)
+        devices = self._data(url, await self._post(url, headers, data))
+        if not self.compact:
+            return devices
+        return [compact_device(api_device) for api_device in devices]
 
     async def _post(
         self, url: str, headers: dict[str, str], data: dict[str, str]
     ) -> dict[str, Any]:
-        """Make POST API call."""
+        """Make POST API call.
+
+        Transient failures are retried with jittered exponential backoff and
+        concurrency per host is adapted to how the server responds.
+        """
         if not self.session:
             self.session = ClientSession()
 
-        async with self.session.post(
-            url, headers=headers, data=data, timeout=self.timeout
-        ) as resp:
-            return await self._response(resp)
+        limiter = limiter_for(urlsplit(url).netloc)
+        error: UtecApiError | None = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                delay = random.uniform(
+                    0, min(API_RETRY_CAP_DEF, API_RETRY_BASE_DEF * 2**attempt)
+                )
+                if isinstance(error, UtecApiThrottledError) and error.retry_after:
+                    delay = max(delay, error.retry_after)
+                logger.debug("Retrying %s in %.2fs: %s", url, delay, error)
+                await asyncio.sleep(delay)
+
+            await limiter.acquire()
+            throttled = failed = False
+            try:
+                async with self.session.post(
+                    url, headers=headers, data=data, timeout=self.timeout
+                ) as resp:
+                    if resp.status in TRANSIENT_STATUS:
+                        throttled = resp.status in THROTTLE_STATUS
+                        failed = True
+                        error = self._transient_error(resp)
+                        continue
+                    if resp.status >= 400:
+                        raise UtecApiError(f"{url} returned HTTP {resp.status}.")
+                    return await self._response(resp)
+            except (ClientError, asyncio.TimeoutError) as e:
+                failed = True
+                error = UtecApiConnectionError(f"{url} failed: {e or type(e).__name__}")
+            finally:
+                limiter.release(throttled, failed)
+
+        raise error
+
+    @staticmethod
+    def _transient_error(resp: ClientResponse) -> UtecApiError:
+        if resp.status not in THROTTLE_STATUS:
+            return UtecApiConnectionError(f"{resp.url} returned HTTP {resp.status}.")
+        error = UtecApiThrottledError(f"{resp.url} throttled (HTTP {resp.status}).")
+        try:
+            error.retry_after = float(resp.headers.get("Retry-After", 0))
+        except ValueError:
+            error.retry_after = 0.0
+        return error
 
     @staticmethod
     async def _response(resp: ClientResponse) -> dict[str, Any]:
         """Return response from API call."""
 
         try:
-            response: dict[str, Any] = await resp.json()
+            response = json_loads(await resp.read())
         except Exception as e:
-            print(e)
-        else:
-            return response
-        return {}
+            raise InvalidResponse(f"Undecodable response from {resp.url}: {e}") from e
+        if not isinstance(response, dict):
+            raise InvalidResponse(f"Unexpected response from {resp.url}.")
+        return response
+
+    @staticmethod
+    def _data(url: str, response: dict[str, Any]) -> list[dict[str, Any]]:
+        """Return the list of records in a response, or raise what went wrong."""
+
+        if response.get("error"):
+            logger.debug(response["error"])
+            raise InvalidResponse(f"{url} returned an error.")
+        data = response.get("data")
+        if not isinstance(data, list):
+            raise InvalidResponse(f"Unexpected response from {url}.")
+        return data
 
     async def connect(self):
         await self._fetch_token()
         await self._login()
 
     async def sync_devices(self):
+        self.addresses = []
+        self.rooms = []
         await self.connect()
         await self._get_addresses()
         for address in self.addresses:
             await self._get_rooms_at_address(address)
+        # readers keep seeing the previous list until the new one is complete
+        devices = []
         for room in self.rooms:
-            await self._get_devices_in_room(room)
+            devices.extend(await self._fetch_devices_in_room(room))
+        self.devices = devices
+        if self.inventory:
+            self.inventory.save(self.devices)
 
     async def get_ble_devices(self, sync: bool = True) -> list[UtecBleLock]:
         if sync:
             await self.sync_devices()
 
-        devices = []
+        return UtecBleLock.from_json_list(self.devices, capabilities=("bluetooth",))
+
+    async def get_ble_devices_cached(self) -> list[UtecBleLock]:
+        """Return devices from the local inventory and refresh it in the background.
+
+        Falls back to a blocking cloud sync when there is no usable snapshot.
+        """
+        if not self.inventory or not (devices := self.inventory.load()):
+            return await self.get_ble_devices(sync=True)
+
+        self.devices = devices
+        if not self.refresh_task or self.refresh_task.done():
+            self.refresh_task = asyncio.create_task(self._refresh_inventory())
+
+        return UtecBleLock.from_json_list(devices, capabilities=("bluetooth",))
+
+    async def _refresh_inventory(self):
+        try:
+            await self.sync_devices()
+        except Exception as e:
+            logger.warning("Background inventory refresh failed: %s", e)
 
-        for api_device in self.devices:
-            device = UtecBleLock.from_json(api_device)
-            if device.capabilities.bluetooth:
-                devices.append(device)
+    async def stream_ble_devices(self) -> AsyncIterator[UtecBleLock]:
+        """Yield Bluetooth locks as each room's device list arrives.
 
-        return devices
+        Nothing is accumulated on the client, so memory stays flat for
+        large portfolios.
+        """
+        self.addresses = []
+        self.rooms = []
+        await self.connect()
+        await self._get_addresses()
+        for address in self.addresses:
+            await self._get_rooms_at_address(address)
+        for room in self.rooms:
+            for lock in UtecBleLock.from_json_list(
+                await self._fetch_devices_in_room(room), capabilities=("bluetooth",)
+            ):
+                yield lock
 
     async def get_json(self) -> list:
         await self.sync_devices()
 
         return self.devices
+
+
+async def sync_clients(
+    clients: Iterable[UtecClient],
+) -> dict[str, list[dict[str, Any]] | Exception]:
+    """Sync several accounts at once, returning devices or the error per email.
+
+    Requests from all clients share the per-host concurrency limits.
+    """
+    clients = list(clients)
+
+    async def sync(client: UtecClient):
+        await client.sync_devices()
+        return client.devices
+
+    results = await asyncio.gather(
+        *(sync(client) for client in clients), return_exceptions=True
+    )
+    return {client.email: result for client, result in zip(clients, results)}
@@ -0,0 +1,177 @@
+"""Latency and throughput benchmarks for lock operations."""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
+
+from .ble.emulator import EmulatedBluetooth, EmulatedLock
+from .ble.lock import UtecBleLock
+from .enums import DeviceKeyUUID
+
+OPERATIONS: dict[str, Callable[[UtecBleLock], Awaitable[Any]]] = {
+    "status": lambda lock: lock.async_update_status(),
+    "unlock": lambda lock: lock.async_unlock(update=False),
+    "lock": lambda lock: lock.async_lock(update=False),
+}
+
+
+class UtecLoopLagMonitor:
+    """Measure how late the event loop wakes a periodic timer.
+
+    Lag is the overshoot of each `interval` sleep, so work that blocks the
+    loop, like key exchange math run inline, shows up directly.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    async def __aenter__(self) -> "UtecLoopLagMonitor":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    def start(self):
+        self.samples.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(
+                max(0.0, time.perf_counter() - started - self.interval)
+            )
+
+    def summary(self) -> dict[str, float]:
+        return percentiles(self.samples)
+
+
+def percentiles(samples: Iterable[float]) -> dict[str, float]:
+    """Summarise latency samples (seconds) as milliseconds."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def pick(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered) * 1000,
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "max": ordered[-1] * 1000,
+    }
+
+
+async def run_benchmark(
+    locks: list[UtecBleLock],
+    operation: str = "status",
+    iterations: int = 10,
+    concurrency: int = 4,
+) -> dict[str, Any]:
+    """Run `operation` `iterations` times on every lock.
+
+    At most `concurrency` locks are driven at once, operations on a single
+    lock are always sequential.
+    """
+    run = OPERATIONS[operation]
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: list[float] = []
+    phases: dict[str, list[float]] = {}
+    errors = 0
+
+    async def drive(lock: UtecBleLock):
+        nonlocal errors
+        async with semaphore:
+            for _ in range(iterations):
+                started = time.perf_counter()
+                try:
+                    await run(lock)
+                except Exception:
+                    errors += 1
+                else:
+                    samples.append(time.perf_counter() - started)
+                    for phase, elapsed in lock.timings.items():
+                        phases.setdefault(phase, []).append(elapsed)
+
+    coordinators = {
+        id(lock.scan_coordinator): lock.scan_coordinator
+        for lock in locks
+        if lock.scan_coordinator
+    }
+    started = time.perf_counter()
+    async with UtecLoopLagMonitor() as loop_lag:
+        await asyncio.gather(*(drive(lock) for lock in locks))
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "operation": operation,
+        "locks": len(locks),
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed": elapsed,
+        "throughput": len(samples) / elapsed if elapsed else 0.0,
+        "latency_ms": percentiles(samples),
+        "phases_ms": {phase: percentiles(times) for phase, times in phases.items()},
+        "loop_lag_ms": loop_lag.summary(),
+    }
+    if coordinators:
+        result["scan"] = [coordinator.metrics() for coordinator in coordinators.values()]
+    return result
+
+
+def emulated_fleet(
+    count: int,
+    key_mechanism: DeviceKeyUUID = DeviceKeyUUID.STATIC,
+    device_model: str = "U-Bolt-WiFi",
+    scan_latency: float = 0.0,
+    **emulator_options: Any,
+) -> tuple[EmulatedBluetooth, list[UtecBleLock]]:
+    """Build `count` emulated locks, seeded by index so runs are repeatable."""
+    bluetooth = EmulatedBluetooth(scan_latency=scan_latency)
+    locks = [
+        bluetooth.create_device(
+            EmulatedLock(
+                f"EE:00:00:00:{i >> 8 & 0xFF:02X}:{i & 0xFF:02X}",
+                name=f"Emulated Lock {i}",
+                key_mechanism=key_mechanism,
+                seed=i,
+                **emulator_options,
+            ),
+            UtecBleLock,
+            device_model,
+        )
+        for i in range(count)
+    ]
+    return bluetooth, locks
+
+
+def emulated_locks(devices: list[dict[str, Any]]) -> list[UtecBleLock]:
+    """Emulated locks for API style device entries, usable as a fleet factory."""
+    bluetooth = EmulatedBluetooth()
+    return [
+        bluetooth.create_device(
+            EmulatedLock(device["uuid"], name=device["name"], seed=i),
+            UtecBleLock,
+            device.get("model", "U-Bolt-WiFi"),
+        )
+        for i, device in enumerate(devices)
+    ]
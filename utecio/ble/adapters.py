@@ -0,0 +1,97 @@
+"""Spread lock connections over several Bluetooth adapters."""
+from __future__ import annotations
+
+import time
+from collections.abc import Iterable
+
+from bleak.backends.device import BLEDevice
+
+
+class UtecBleAdapterSighting:
+    """Last advertisement of a device seen by one adapter."""
+
+    def __init__(self, adapter: str, rssi: int, device: BLEDevice | None):
+        self.adapter = adapter
+        self.rssi = rssi
+        self.device = device
+        self.seen = time.monotonic()
+
+
+class UtecBleAdapterBalancer:
+    """Pick an adapter per connection from recent RSSI and adapter load.
+
+    Feed it advertisements from a scanner on each adapter with `report`. An
+    adapter is scored as its last RSSI for the lock minus `load_penalty` per
+    connection it already holds. The adapter used last time for a lock is
+    kept unless another scores at least `sticky_margin` better.
+
+    On BlueZ the adapter is implied by the BLEDevice that is connected to,
+    so selecting an adapter means handing out the BLEDevice it reported.
+    Without a recent sighting there is no such BLEDevice and no adapter is
+    chosen, the connection then goes through the default lookup.
+    """
+
+    def __init__(
+        self,
+        adapters: Iterable[str] = (),
+        window: float = 60.0,
+        load_penalty: float = 10.0,
+        sticky_margin: float = 6.0,
+    ):
+        self.window = window
+        self.load_penalty = load_penalty
+        self.sticky_margin = sticky_margin
+        self.load: dict[str, int] = {adapter: 0 for adapter in adapters}
+        self._sightings: dict[str, dict[str, UtecBleAdapterSighting]] = {}
+        self._preferred: dict[str, str] = {}
+
+    def report(
+        self, address: str, adapter: str, rssi: int, device: BLEDevice | None = None
+    ):
+        """Record that `adapter` saw the device at `address`."""
+        self.load.setdefault(adapter, 0)
+        self._sightings.setdefault(address, {})[adapter] = UtecBleAdapterSighting(
+            adapter, rssi, device
+        )
+
+    def _score(self, sighting: UtecBleAdapterSighting) -> float:
+        return sighting.rssi - self.load_penalty * self.load.get(sighting.adapter, 0)
+
+    def select(self, address: str) -> str | None:
+        """Choose the adapter for the next connection to `address`.
+
+        None when no adapter reported its BLEDevice within `window`.
+        """
+        now = time.monotonic()
+        candidates = [
+            sighting
+            for sighting in self._sightings.get(address, {}).values()
+            if sighting.device and now - sighting.seen <= self.window
+        ]
+        if not candidates:
+            return None
+
+        preferred = self._preferred.get(address)
+        best = max(candidates, key=self._score)
+        for sighting in candidates:
+            if (
+                sighting.adapter == preferred
+                and self._score(sighting) + self.sticky_margin >= self._score(best)
+            ):
+                best = sighting
+                break
+        self._preferred[address] = best.adapter
+        return best.adapter
+
+    def device(self, address: str, adapter: str | None) -> BLEDevice | None:
+        """BLEDevice for `address` as last reported by `adapter`."""
+        sighting = self._sightings.get(address, {}).get(adapter)
+        return sighting.device if sighting else None
+
+    def acquire(self, adapter: str | None):
+        if adapter is not None:
+            self.load[adapter] = self.load.get(adapter, 0) + 1
+
+    def release(self, adapter: str | None):
+        if adapter is not None and self.load.get(adapter, 0) > 0:
+            self.load[adapter] -= 1
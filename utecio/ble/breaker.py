@@ -0,0 +1,85 @@
+"""Per-device circuit breaker for BLE connections."""
+from __future__ import annotations
+
+import random
+import time
+
+from ..enums import BleCircuitState
+
+
+class UtecBleCircuitBreaker:
+    """Stop connecting to a lock that keeps failing.
+
+    After `failure_threshold` consecutive connection failures the circuit
+    opens and calls fail immediately. Once the backoff has elapsed (or the
+    lock shows up in a scan) a single probe is let through: success closes
+    the circuit, failure re-opens it with a doubled backoff.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 1,
+        base_backoff: float = 5.0,
+        max_backoff: float = 300.0,
+        jitter: float = 0.1,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.state = BleCircuitState.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self._probing = False
+
+    @property
+    def retry_in(self) -> float:
+        """Seconds until the next probe is allowed."""
+        if self.state != BleCircuitState.OPEN:
+            return 0.0
+        return max(0.0, self.open_until - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == BleCircuitState.CLOSED:
+            return True
+        if self.state == BleCircuitState.OPEN:
+            if time.monotonic() < self.open_until:
+                return False
+            self.state = BleCircuitState.HALF_OPEN
+            self._probing = False
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = BleCircuitState.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if (
+            self.state == BleCircuitState.HALF_OPEN
+            or self.failures >= self.failure_threshold
+        ):
+            self._trip()
+
+    def release(self) -> None:
+        """An attempt ended without telling whether the device is reachable."""
+        self._probing = False
+
+    def record_seen(self) -> None:
+        """The device was seen advertising, probe it at the next call."""
+        if self.state == BleCircuitState.OPEN:
+            self.open_until = time.monotonic()
+
+    def _trip(self) -> None:
+        backoff = min(self.max_backoff, self.base_backoff * 2**self.trips)
+        backoff *= 1 - random.uniform(0, self.jitter)
+        self.trips += 1
+        self.state = BleCircuitState.OPEN
+        self.open_until = time.monotonic() + backoff
@@ -0,0 +1,128 @@
+"""Key exchange and frame crypto, runnable off the event loop.
+
+The ECC exchange uses pure Python `ecdsa` math that can block the loop for
+tens of milliseconds. Everything here is a plain module level function of
+bytes and ints so it can run inline, in a thread or in a worker process.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import struct
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from Crypto.Cipher import AES
+from ecdsa import SECP128r1, SigningKey
+from ecdsa.ellipticcurve import Point
+
+T = TypeVar("T")
+
+
+def ecc_generate() -> tuple[int, bytes, bytes]:
+    """New SECP128r1 key pair as (secret, public x, public y)."""
+    private_key = SigningKey.generate(curve=SECP128r1)
+    point = private_key.get_verifying_key().pubkey.point  # type: ignore # noqa
+    return (
+        private_key.privkey.secret_multiplier,  # type: ignore # noqa
+        point.x().to_bytes(16, "little"),
+        point.y().to_bytes(16, "little"),
+    )
+
+
+def ecc_shared_key(secret: int, peer_x: bytes, peer_y: bytes) -> bytes:
+    peer = Point(
+        SECP128r1.curve,
+        int.from_bytes(peer_x, "little"),
+        int.from_bytes(peer_y, "little"),
+    )
+    return int.to_bytes((secret * peer).x(), 16, "little")
+
+
+def md5_key(secret: bytes) -> bytes:
+    part1 = struct.unpack("<Q", secret[:8])[0]  # Little-endian
+    part2 = struct.unpack("<Q", secret[8:])[0]
+
+    xor_val1 = (
+        part1 ^ 0x716F6C6172744C55
+    )  # this value corresponds to 'ULtraloq' in little-endian
+    xor_val2_part1 = (part2 >> 56) ^ (part1 >> 56) ^ 0x71
+    xor_val2_part2 = ((part2 >> 48) & 0xFF) ^ ((part1 >> 48) & 0xFF) ^ 0x6F
+    xor_val2_part3 = ((part2 >> 40) & 0xFF) ^ ((part1 >> 40) & 0xFF) ^ 0x6C
+    xor_val2_part4 = ((part2 >> 32) & 0xFF) ^ ((part1 >> 32) & 0xFF) ^ 0x61
+    xor_val2_part5 = ((part2 >> 24) & 0xFF) ^ ((part1 >> 24) & 0xFF) ^ 0x72
+    xor_val2_part6 = ((part2 >> 16) & 0xFF) ^ ((part1 >> 16) & 0xFF) ^ 0x74
+    xor_val2_part7 = ((part2 >> 8) & 0xFF) ^ ((part1 >> 8) & 0xFF) ^ 0x4C
+    xor_val2_part8 = (part2 & 0xFF) ^ (part1 & 0xFF) ^ 0x55
+
+    xor_val2 = (
+        (xor_val2_part1 << 56)
+        | (xor_val2_part2 << 48)
+        | (xor_val2_part3 << 40)
+        | (xor_val2_part4 << 32)
+        | (xor_val2_part5 << 24)
+        | (xor_val2_part6 << 16)
+        | (xor_val2_part7 << 8)
+        | xor_val2_part8
+    )
+
+    xor_result = struct.pack("<QQ", xor_val1, xor_val2)
+
+    m = hashlib.md5()
+    m.update(xor_result)
+    result = m.digest()
+
+    bVar2 = (part1 & 0xFF) ^ 0x55
+    if bVar2 & 1:
+        m = hashlib.md5()
+        m.update(result)
+        result = m.digest()
+
+    return result
+
+
+def encrypt_frame(aes_key: bytes, package: bytes) -> bytes:
+    # every 16 byte block is encrypted on its own with a zero IV, which
+    # is the same as ECB over the zero padded frame
+    padded = bytes(package) + bytes(-len(package) % 16)
+    return AES.new(bytes(aes_key), AES.MODE_ECB).encrypt(padded)
+
+
+class UtecBleCryptoExecutor:
+    """Runs crypto functions inline, in a thread pool or in a process pool.
+
+    mode: "inline", "thread" or "process".
+    """
+
+    def __init__(self, mode: str = "thread", max_workers: int | None = None):
+        if mode not in ("inline", "thread", "process"):
+            raise ValueError(f"Unknown crypto executor mode {mode!r}.")
+        self.mode = mode
+        self.max_workers = max_workers
+        self._executor: Executor | None = None
+
+    @property
+    def executor(self) -> Executor | None:
+        if self._executor is None and self.mode != "inline":
+            self._executor = (
+                ThreadPoolExecutor(self.max_workers, thread_name_prefix="utecio-crypto")
+                if self.mode == "thread"
+                else ProcessPoolExecutor(self.max_workers)
+            )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        if self.mode == "inline":
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, func, *args
+        )
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+default_crypto_executor = UtecBleCryptoExecutor()
@@ -1,25 +1,60 @@
 import datetime
 import asyncio
-import hashlib
-import struct
-from collections.abc import Awaitable, Callable
-from typing import Any
-
-from ecdsa import SECP128r1, SigningKey
-from ecdsa.ellipticcurve import Point
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from typing import TYPE_CHECKING, Any
 
 from bleak import BleakClient
 from bleak.backends.device import BLEDevice
 from bleak.exc import BleakError
-from bleak_retry_connector import establish_connection, BleakNotFoundError, get_device
-
-from .. import logger, DeviceDefinition, GenericLock, known_devices
-from ..util import decode_password, bytes_to_int2
-from ..const import LOCK_MODE, BOLT_STATUS, BATTERY_LEVEL, CRC8Table
+from bleak.backends.service import BleakGATTServiceCollection
+from bleak_retry_connector import (
+    BleakClientWithServiceCache,
+    BleakNotFoundError,
+    clear_cache,
+    establish_connection,
+    get_device,
+)
+
+from .. import logger, DeviceDefinition, get_device_definition
+from ..util import decode_password, bytes_to_int2, crc8, date_from_4bytes, date_to_4bytes
+from ..const import (
+    LOCK_MODE,
+    BOLT_STATUS,
+    BATTERY_LEVEL,
+    BLE_COMMAND_TIMEOUT_DEF,
+    BLE_KEY_TIMEOUT_DEF,
+    BLE_DISCONNECT_TIMEOUT_DEF,
+    CLOCK_DRIFT_BASELINE_DEF,
+    CLOCK_DRIFT_MAX_PPM,
+    CLOCK_RESOLUTION,
+    CRYPTO_OFFLOAD_MIN_DEF,
+    FRAME_CACHE_SIZE,
+    TIME_SYNC_INTERVAL_DEF,
+    TIME_SYNC_THRESHOLD_DEF,
+)
+from .adapters import UtecBleAdapterBalancer
+from .breaker import UtecBleCircuitBreaker
+from .crypto import (
+    UtecBleCryptoExecutor,
+    default_crypto_executor,
+    ecc_generate,
+    ecc_shared_key,
+    encrypt_frame,
+    md5_key,
+)
+from .events import UtecBleEvent
+from .frames import UtecBleFrameReader
+from .metadata import UtecBleMetadataStore
+from .scanning import UtecBleScanCoordinator
 from ..enums import BleResponseCode, BLECommandCode, DeviceServiceUUID, DeviceKeyUUID
 from Crypto.Cipher import AES
 from bleak.backends.characteristic import BleakGATTCharacteristic
 
+if TYPE_CHECKING:
+    from ..state import UtecFleetState
+    from .trace import UtecBleTraceRecorder
+
 
 class UtecBleNotFoundError(Exception):
     pass
@@ -37,7 +72,18 @@ class UtecBleDeviceBusyError(Exception):
     pass
 
 
+class UtecBleCircuitOpenError(UtecBleNotFoundError):
+    pass
+
+
+class UtecBleTimeoutError(Exception):
+    pass
+
+
 class UtecBleDevice:
+    # opt-in for UNCONFIRMED_COMMANDS, only the emulator sets it
+    allow_unconfirmed_commands = False
+
     def __init__(
         self,
         uid: str,
@@ -55,9 +101,7 @@ class UtecBleDevice:
         self.password: str = password
         self.name = device_name
         self.model: str = device_model
-        self.capabilities: DeviceDefinition | Any = known_devices.get(
-            device_model, GenericLock
-        )
+        self.capabilities: DeviceDefinition = get_device_definition(device_model)
         self._requests: list[UtecBleRequest] = []
         self.config: dict[str, Any]
         self.async_bledevice_callback = async_bledevice_callback
@@ -69,9 +113,41 @@ class UtecBleDevice:
         self.mute: bool = False
         self.bolt_status: int = -1
         self.sn: str = ""
-        self.calendar: datetime.datetime
+        self.door_status: int = -1
+        self.calendar: datetime.datetime | None = None
         self.is_busy = False
-        self.device_time_offset: datetime.timedelta
+        self.device_time_offset: datetime.timedelta | None = None
+        self.clock_drift: float = 0.0
+        self._drift_baseline: tuple[float, float] | None = None
+        self.time_synced: float | None = None
+        self.time_sync_threshold: float = TIME_SYNC_THRESHOLD_DEF
+        self.time_sync_interval: float = TIME_SYNC_INTERVAL_DEF
+        self.client_class: type[BleakClient] = BleakClientWithServiceCache
+        self.use_services_cache = True
+        self.services: BleakGATTServiceCollection | None = None
+        self.clear_cache_callback: Callable[[str], Awaitable[bool]] = clear_cache
+        self.breaker: UtecBleCircuitBreaker | None = UtecBleCircuitBreaker()
+        self.adapters: UtecBleAdapterBalancer | None = None
+        self.adapter: str | None = None
+        self.scan_coordinator: UtecBleScanCoordinator | None = None
+        self.authenticated = False
+        self.frame_cache = UtecBleFrameCache()
+        self.crypto: UtecBleCryptoExecutor = default_crypto_executor
+        self.recorder: "UtecBleTraceRecorder | None" = None
+        self.state: "UtecFleetState | None" = None
+        self.state_index = -1
+        self.timings: dict[str, float] = {}
+        self._metadata: UtecBleMetadataStore | None = None
+        self._event_callbacks: list[Callable[[UtecBleEvent], None]] = []
+        self._stop_listening: asyncio.Event | None = None
+        self._listen_for: float | None = None
+        self._session_ready: asyncio.Event | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._waiters: list[asyncio.Future] = []
+        self.listening = False
+        self._reader: UtecBleFrameReader | None = None
+        self._session_key: bytes | None = None
+        self._pending: UtecBleRequest | None = None
 
     @classmethod
     def from_json(cls, json_config: dict[str, Any]):
@@ -90,6 +166,35 @@ class UtecBleDevice:
 
         return new_device
 
+    @classmethod
+    def from_json_list(
+        cls,
+        json_configs: Iterable[dict[str, Any]],
+        models: Iterable[str] | None = None,
+        capabilities: Iterable[str] = (),
+    ) -> list["UtecBleDevice"]:
+        """Build devices from an API device list.
+
+        Entries are filtered on the raw json by model and by capability flags
+        before any device object is constructed.
+        """
+        models = set(models) if models is not None else None
+        capabilities = tuple(capabilities)
+        accepted: dict[str, bool] = {}
+        devices = []
+
+        for json_config in json_configs:
+            model = json_config["model"]
+            if (ok := accepted.get(model)) is None:
+                definition = get_device_definition(model)
+                ok = accepted[model] = (models is None or model in models) and all(
+                    getattr(definition, flag, False) for flag in capabilities
+                )
+            if ok:
+                devices.append(cls.from_json(json_config))
+
+        return devices
+
     async def async_update_status(self):
         pass
 
@@ -108,14 +213,52 @@ class UtecBleDevice:
             logger.debug(msg, args)
 
     def add_request(self, request: "UtecBleRequest", priority: bool = False):
+        self._check_command(request.command)
         request.device = self
         if priority:
             self._requests.insert(0, request)
         else:
             self._requests.append(request)
 
-    async def send_requests(self) -> bool:
+    def _check_command(self, command: BLECommandCode):
+        if command in UNCONFIRMED_COMMANDS and not self.allow_unconfirmed_commands:
+            raise self.error(
+                UtecBleError(
+                    f"{command.name} is not supported on {self.name}({self.mac_uuid}).",
+                    "The command is not confirmed against lock firmware yet.",
+                )
+            )
+
+    async def send_requests(self, timeout: float | None = None) -> bool:
+        """Send the queued requests over a single connection.
+
+        timeout: total deadline in seconds for connecting, key exchange and
+        all commands. On expiry the operation is cancelled, the connection
+        released and `UtecBleTimeoutError` raised.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            if self._session_ready and self.is_busy:
+                if await self._send_held(deadline):
+                    return True
+
+            if deadline is None:
+                return await self._send_requests()
+            # time spent waiting on a held session counts against the deadline
+            return await asyncio.wait_for(
+                self._send_requests(), max(0.0, deadline - time.monotonic())
+            )
+        except asyncio.TimeoutError:
+            raise self.error(
+                UtecBleTimeoutError(
+                    f"Operation on {self.name}({self.mac_uuid}) timed out.",
+                    f"Deadline of {timeout}s exceeded.",
+                )
+            ) from None
+
+    async def _send_requests(self) -> bool:
         client: BleakClient = None
+        services_stale = False
         try:
             if len(self._requests) < 1:
                 raise self.error(
@@ -126,45 +269,22 @@ class UtecBleDevice:
                 )
 
             self.is_busy = True
-            try:
-                if not (device := await self._get_bledevice(self.mac_uuid)):
-                    raise BleakNotFoundError()
-                client = await establish_connection(
-                    client_class=BleakClient,
-                    device=device,
-                    name=self.mac_uuid,
-                    max_attempts=1 if self.wurx_uuid else 2,
-                    ble_device_callback=self._brc_get_lock_device,
-                )
-            except (BleakNotFoundError, BleakError):
-                try:
-                    if not self.wurx_uuid:
-                        raise
-
-                    await self.async_wakeup_device()
-                    if not (device := await self._get_bledevice(self.mac_uuid)):
-                        raise BleakNotFoundError("Wakeup device not found.")
-
-                    client = await establish_connection(
-                        client_class=BleakClient,
-                        device=device,
-                        name=self.mac_uuid,
-                        max_attempts=2,
-                        ble_device_callback=self._brc_get_lock_device,
-                    )
-                except (BleakError, BleakNotFoundError):
-                    raise self.error(
-                        UtecBleNotFoundError(
-                            f"Could not connect to device {self.name}({self.mac_uuid}).",
-                            "Device not found after 2 attempts.",
-                        )
-                    ) from None
+            self.timings = {}
+            started = time.perf_counter()
+            client = await self._connect()
+            self.timings["connect"] = time.perf_counter() - started
 
+            started = time.perf_counter()
             try:
                 aes_key = await UtecBleDeviceKey.get_shared_key(
                     client=client, device=self
                 )
+            except UtecBleTimeoutError:
+                raise
             except Exception:
+                # missing or failing key characteristics, possibly a stale
+                # service cache after a firmware update
+                services_stale = True
                 raise self.error(
                     UtecBleDeviceError(
                         f"Error communicating with device {self.name}({self.mac_uuid}).",
@@ -172,34 +292,426 @@ class UtecBleDevice:
                     )
                 ) from None
 
-            for request in self._requests[:]:
-                if not request.sent or not request.response.completed:
-                    # logger.debug("(%s) Sending command - %s (%s)",self.mac_uuid,request.command.name,request.package.hex())
-                    request.aes_key = aes_key
-                    request.device = self
-                    request.sent = True
-                    try:
-                        await request._get_response(client)
-                        self._requests.remove(request)
+            self._session_key = bytes(aes_key)
+            self._reader = UtecBleFrameReader()
+            if self.recorder:
+                self.recorder.key(self._session_key)
+            try:
+                await client.start_notify(
+                    DeviceServiceUUID.DATA.value, self._on_notification
+                )
+            except Exception:
+                services_stale = True
+                raise
+            self.services = client.services
+            self.timings["key_exchange"] = time.perf_counter() - started
+
+            started = time.perf_counter()
 
-                    except Exception:
-                        raise self.error(
-                            UtecBleDeviceError(
-                                f"Error communicating with device {self.name}({self.mac_uuid}).",
-                                f"Command {request.command.name} failed.",
-                            )
-                        ) from None
+            await self._drain(client, aes_key)
+            self.timings["commands"] = time.perf_counter() - started
+            if self.metadata:
+                self._store_metadata()
+
+            if self._stop_listening and not self._stop_listening.is_set():
+                await self._hold(client, aes_key)
 
         except Exception:  # unhandled
             raise
 
         finally:
+            self._stop_listening = None
             self._requests.clear()
-            if client:
-                await client.disconnect()
             self.is_busy = False
+            if self._session_ready:
+                self._session_ready.set()
+                self._session_ready = None
+            for waiter in self._waiters:
+                # the session ended before getting to these requests
+                if not waiter.done():
+                    waiter.set_result(False)
+            self._waiters.clear()
+            if client:
+                await self._disconnect(client)
+                if services_stale:
+                    await self._invalidate_services()
+
+    async def _invalidate_services(self):
+        """Forget the lock's cached GATT services, the next connect rediscovers them."""
+        self.services = None
+        self.debug("(%s) Clearing cached services.", self.mac_uuid)
+        try:
+            await self.clear_cache_callback(self.mac_uuid)
+        except Exception as e:
+            self.debug("(%s) Clearing cached services failed: %s", self.mac_uuid, e)
+
+    async def _drain(self, client: BleakClient, aes_key: bytes):
+        # requests may queue follow-ups while running, e.g. paged reads
+        while self._requests:
+            request = self._requests.pop(0)
+            if request.command == BLECommandCode.ADMIN_LOGIN and self.authenticated:
+                self.debug("(%s) Session already authenticated.", self.mac_uuid)
+                continue
+            if not request.sent or not request.response.completed:
+                # logger.debug("(%s) Sending command - %s (%s)",self.mac_uuid,request.command.name,request.package.hex())
+                request.aes_key = aes_key
+                request.device = self
+                request.sent = True
+                try:
+                    await request._get_response(client)
+
+                except UtecBleTimeoutError:
+                    raise
+                except Exception:
+                    raise self.error(
+                        UtecBleDeviceError(
+                            f"Error communicating with device {self.name}({self.mac_uuid}).",
+                            f"Command {request.command.name} failed.",
+                        )
+                    ) from None
+
+    @property
+    def metadata(self) -> UtecBleMetadataStore | None:
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, store: UtecBleMetadataStore | None):
+        """Attach a metadata cache, filling in what it remembers for this lock."""
+        self._metadata = store
+        if store:
+            self._apply_metadata()
+
+    def _apply_metadata(self):
+        cached = self.metadata.get(self.mac_uuid)
+        if not self.sn and cached.get("sn"):
+            self.sn = cached["sn"]
+        if not self.wurx_uuid and cached.get("wurx_uuid"):
+            self.wurx_uuid = cached["wurx_uuid"]
+
+    def _store_metadata(self):
+        self.metadata.update(self.mac_uuid, sn=self.sn, wurx_uuid=self.wurx_uuid)
+
+    async def _disconnect(self, client: BleakClient):
+        if self.recorder:
+            self.recorder.disconnect()
+        self.authenticated = False
+        self._session_key = None
+        self._reader = None
+        if self.adapters:
+            self.adapters.release(self.adapter)
+        try:
+            await asyncio.wait_for(client.disconnect(), BLE_DISCONNECT_TIMEOUT_DEF)
+        except Exception as e:
+            self.debug("(%s) Disconnect failed: %s", self.mac_uuid, e)
+
+    async def _connect(self) -> BleakClient:
+        if self.breaker and not self.breaker.allow():
+            raise self.error(
+                UtecBleCircuitOpenError(
+                    f"Could not connect to device {self.name}({self.mac_uuid}).",
+                    f"Device unreachable, retry in {self.breaker.retry_in:.1f}s.",
+                )
+            )
+
+        if self.adapters:
+            # count the attempt as load straight away so that concurrent
+            # connects spread out
+            self.adapter = self.adapters.select(self.mac_uuid)
+            self.adapters.acquire(self.adapter)
+
+        client = None
+        unreachable = False
+        try:
+            if not (device := await self._get_bledevice(self.mac_uuid)):
+                raise BleakNotFoundError()
+            client = await self._establish_connection(
+                device, max_attempts=1 if self.wurx_uuid else 2
+            )
+        except (BleakNotFoundError, BleakError):
+            try:
+                if not self.wurx_uuid:
+                    unreachable = True
+                    raise
+
+                await self.async_wakeup_device()
+                if not (device := await self._get_bledevice(self.mac_uuid)):
+                    raise BleakNotFoundError("Wakeup device not found.")
+
+                client = await self._establish_connection(device, max_attempts=2)
+            except (BleakError, BleakNotFoundError):
+                unreachable = True
+                raise self.error(
+                    UtecBleNotFoundError(
+                        f"Could not connect to device {self.name}({self.mac_uuid}).",
+                        "Device not found after 2 attempts.",
+                    )
+                ) from None
+        finally:
+            self.authenticated = False
+            if not client and self.adapters:
+                self.adapters.release(self.adapter)
+            if self.breaker:
+                if client:
+                    self.breaker.record_success()
+                elif unreachable:
+                    self.breaker.record_failure()
+                else:
+                    # cancelled or failed for another reason, no verdict on the lock
+                    self.breaker.release()
+
+        if self.recorder:
+            self.recorder.connect(self.mac_uuid)
+        return client
+
+    async def _establish_connection(
+        self, device: BLEDevice, max_attempts: int
+    ) -> BleakClient:
+        """Connect to `device` with the scanner of its adapter paused."""
+        try:
+            if self.scan_coordinator:
+                # pause() counts the connect before it can be cancelled
+                paused = await self.scan_coordinator.pause(self.adapter)
+                self.timings["scan_pause"] = self.timings.get("scan_pause", 0) + paused
+            # bleak-retry-connector uses cached_services even when told not to
+            return await establish_connection(
+                client_class=self.client_class,
+                device=device,
+                name=self.mac_uuid,
+                disconnected_callback=self._on_disconnected,
+                max_attempts=max_attempts,
+                cached_services=self.services if self.use_services_cache else None,
+                ble_device_callback=self._brc_get_lock_device,
+                use_services_cache=self.use_services_cache,
+            )
+        finally:
+            if self.scan_coordinator:
+                self.scan_coordinator.resume(self.adapter)
+
+    def _on_notification(self, sender: BleakGATTCharacteristic, data: bytearray):
+        try:
+            if self.recorder:
+                self.recorder.notify(DeviceServiceUUID.DATA.value, data)
+            if self._reader is None:
+                return  # late notification of a closed session
+            if self._pending:
+                self._pending.response.last_activity = time.monotonic()
+            cipher = AES.new(self._session_key, AES.MODE_CBC, bytes(16))
+            for frame in self._reader.feed(cipher.decrypt(bytes(data))):
+                if self.recorder:
+                    self.recorder.frame(frame)
+                self._dispatch_frame(frame)
+        except Exception as e:
+            e.add_note(f"({self.mac_uuid}) Error receiving notification.")
+            self.error(e)
+
+    def _dispatch_frame(self, frame: bytes):
+        request = self._pending
+        if request and frame[3] == request.response_code:
+            request.response._add_frame(frame)
+        else:
+            self._handle_unsolicited(frame)
+
+    def _handle_unsolicited(self, frame: bytes):
+        self.debug("(%s) Unsolicited frame: %s", self.mac_uuid, frame.hex())
+        response = UtecBleResponse(None, self)
+        response.buffer = bytearray(frame)
+        if response.is_valid:
+            response._read_response()
+
+        event = UtecBleEvent(self.mac_uuid, frame)
+        for callback in list(self._event_callbacks):
+            try:
+                callback(event)
+            except Exception as e:
+                e.add_note(f"({self.mac_uuid}) Error in event callback.")
+                self.error(e)
+
+    def add_event_callback(
+        self, callback: Callable[[UtecBleEvent], None]
+    ) -> Callable[[], None]:
+        """Call `callback` for every frame the lock pushes while connected.
+
+        Returns a function that removes the callback again.
+        """
+        self._event_callbacks.append(callback)
+        return lambda: self._event_callbacks.remove(callback)
+
+    def stop_listening(self):
+        if self._stop_listening:
+            self._stop_listening.set()
+
+    def _begin_hold(self, duration: float | None):
+        """Keep the next session open for `duration` seconds once its requests are sent."""
+        self._listen_for = duration
+        self._stop_listening = asyncio.Event()
+        self._session_ready = asyncio.Event()
+
+    async def _hold(self, client: BleakClient, aes_key: bytes):
+        """Keep the session open, sending requests queued by other callers."""
+        loop = asyncio.get_running_loop()
+        deadline = None if self._listen_for is None else loop.time() + self._listen_for
+        self._wakeup = asyncio.Event()
+        self.listening = True
+        self._session_ready.set()
+        self.debug("(%s) Holding session.", self.mac_uuid)
+        try:
+            while not self._stop_listening.is_set():
+                if self._requests or self._waiters:
+                    try:
+                        await self._drain(client, aes_key)
+                    except Exception as e:
+                        for waiter in self._waiters:
+                            if not waiter.done():
+                                waiter.set_exception(e)
+                        self._waiters.clear()
+                        raise
+                    # every waiter so far had its requests sent by this drain
+                    for waiter in self._waiters:
+                        if not waiter.done():
+                            waiter.set_result(True)
+                    self._waiters.clear()
+                    continue
+
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._wakeup.clear()
+                wakeup = asyncio.ensure_future(self._wakeup.wait())
+                stop = asyncio.ensure_future(self._stop_listening.wait())
+                try:
+                    await asyncio.wait(
+                        (wakeup, stop),
+                        timeout=remaining,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                finally:
+                    wakeup.cancel()
+                    stop.cancel()
+        finally:
+            self.listening = False
+            self._wakeup = None
+
+    async def _send_held(self, deadline: float | None) -> bool:
+        """Hand the queued requests to the held session, False if it is gone.
+
+        deadline: time.monotonic() by which the requests must be done, raises
+        asyncio.TimeoutError after withdrawing the ones not sent yet.
+        """
+
+        def done(request: UtecBleRequest) -> bool:
+            return request.sent and request.response.completed
+
+        def remaining() -> float | None:
+            return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+        pending = list(self._requests)
+        try:
+            await asyncio.wait_for(self._session_ready.wait(), remaining())
+            # requests queued while connecting go out with the session's first batch
+            if all(done(request) for request in pending):
+                return True
+
+            if self.listening:
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+                self._wakeup.set()
+                if await asyncio.wait_for(waiter, remaining()):
+                    return True
+        except asyncio.TimeoutError:
+            for request in pending:
+                if not request.sent and request in self._requests:
+                    self._requests.remove(request)
+            raise
+
+        # the session is gone, send what is left over a new connection
+        for request in pending:
+            if not done(request) and request not in self._requests:
+                request.sent = False
+                self._requests.append(request)
+        return False
+
+    def _on_disconnected(self, client: BleakClient):
+        if self._pending:
+            # no answer can arrive any more, fail the command now
+            self._pending.response.fail(
+                UtecBleDeviceError(
+                    f"Device {self.name}({self.mac_uuid}) disconnected.",
+                    f"No response to {self._pending.command.name}.",
+                )
+            )
+        if self._stop_listening:
+            self._stop_listening.set()
+
+    def device_time(self) -> datetime.datetime | None:
+        """Estimate the lock's clock from the cached offset, without a round-trip."""
+        if self.device_time_offset is None:
+            return None
+        drift = self.clock_drift * (time.monotonic() - self.time_synced)
+        return (
+            datetime.datetime.now()
+            + self.device_time_offset
+            + datetime.timedelta(seconds=drift)
+        )
+
+    def _time_requests(self, force: bool = False) -> list["UtecBleRequest"]:
+        """READ_TIME when the cached offset is missing or stale."""
+        if (
+            force
+            or self.time_synced is None
+            or time.monotonic() - self.time_synced > self.time_sync_interval
+        ):
+            return [UtecBleRequest(BLECommandCode.READ_TIME)]
+        return []
+
+    def _update_clock(self, lock_time: datetime.datetime):
+        now = time.monotonic()
+        offset = lock_time - datetime.datetime.now()
+        self._update_drift(offset.total_seconds(), now)
+        self.calendar = lock_time
+        self.device_time_offset = offset
+        self.time_synced = now
+        self.debug("(%s) clock offset:%ss", self.mac_uuid, offset.total_seconds())
+
+        if abs(offset.total_seconds()) > self.time_sync_threshold:
+            # correct it while the connection is still open
+            self.add_request(UtecBleRequest(BLECommandCode.ADMIN_LOGIN))
+            self.add_request(
+                UtecBleRequest(
+                    BLECommandCode.WRITE_TIME,
+                    data=date_to_4bytes(datetime.datetime.now()),
+                )
+            )
+
+    def _update_drift(self, offset: float, now: float):
+        """Estimate the drift rate against a baseline reading hours earlier.
+
+        The lock reports whole seconds, so changes within CLOCK_RESOLUTION are
+        rounding and the baseline is kept until the drift is measurable.
+        """
+        if self._drift_baseline is None:
+            self._drift_baseline = (offset, now)
+            return
+
+        base_offset, base_time = self._drift_baseline
+        if now - base_time < CLOCK_DRIFT_BASELINE_DEF:
+            return
+        change = offset - base_offset
+        if abs(change) <= CLOCK_RESOLUTION:
+            self.clock_drift = 0.0
+            return
+
+        limit = CLOCK_DRIFT_MAX_PPM / 1e6
+        self.clock_drift = max(-limit, min(limit, change / (now - base_time)))
+        self._drift_baseline = (offset, now)
+
+    def mark_seen(self):
+        """Report that a scanner saw the lock advertising."""
+        if self.breaker:
+            self.breaker.record_seen()
 
     async def _get_bledevice(self, address: str) -> BLEDevice:
+        if self.adapters and (device := self.adapters.device(address, self.adapter)):
+            return device
         device = (
             await self.async_bledevice_callback(address)
             if self.async_bledevice_callback
@@ -218,7 +730,7 @@ class UtecBleDevice:
             raise BleakNotFoundError()
 
         wclient: BleakClient = await establish_connection(
-            client_class=BleakClient,
+            client_class=self.client_class,
             device=device,
             name=self.wurx_uuid,
             max_attempts=2,
@@ -228,15 +740,87 @@ class UtecBleDevice:
         await wclient.disconnect()
 
 
+# commands without or with a small fixed payload, the only frames worth caching;
+# anything else (history pages, clock writes, user codes) is built every time
+FRAME_CACHE_COMMANDS = frozenset(
+    {
+        BLECommandCode.ADMIN_LOGIN,
+        BLECommandCode.LOCK_STATUS,
+        BLECommandCode.GET_LOCK_STATUS,
+        BLECommandCode.GET_BATTERY,
+        BLECommandCode.GET_MUTE,
+        BLECommandCode.GET_AUTOLOCK,
+        BLECommandCode.GET_SN,
+        BLECommandCode.READ_TIME,
+        BLECommandCode.DOORSENSOR,
+        BLECommandCode.UNLOCK,
+        BLECommandCode.BOLT_LOCK,
+        BLECommandCode.SET_LOCK_STATUS,
+        BLECommandCode.SET_WORK_MODE,
+    }
+)
+
+# opcodes and record layouts not yet confirmed against lock firmware, only
+# the emulator implements them
+UNCONFIRMED_COMMANDS = frozenset(
+    {
+        BLECommandCode.READ_HISTORY,
+        BLECommandCode.READ_USERS,
+        BLECommandCode.ADD_USER,
+        BLECommandCode.DELETE_USER,
+    }
+)
+
+
+class UtecBleFrameCache:
+    """Encrypted frames keyed by their plain frame, valid for one session key."""
+
+    def __init__(self, max_size: int = FRAME_CACHE_SIZE):
+        self.max_size = max_size
+        self.aes_key: bytes | None = None
+        self.frames: dict[bytes, bytes] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, aes_key: bytes, package: bytes) -> bytes | None:
+        if aes_key != self.aes_key:
+            self.invalidate()
+            self.aes_key = bytes(aes_key)
+        if (frame := self.frames.get(package)) is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return frame
+
+    def put(self, package: bytes, frame: bytes):
+        if len(self.frames) >= self.max_size:
+            self.frames.clear()
+        self.frames[package] = frame
+
+    def invalidate(self):
+        self.aes_key = None
+        self.frames.clear()
+
+
 class UtecBleRequest:
+    # responses spanning many notifications, `timeout` applies per notification
+    paged = False
+    # plain frames of FRAME_CACHE_COMMANDS without auth data, they don't
+    # depend on the device
+    _packages: dict[tuple[int, bytes], bytes] = {}
+
     def __init__(
         self,
         command: BLECommandCode,
         device: UtecBleDevice = None,
         data: bytes = bytes(),
         auth_required: bool = False,
+        timeout: float = BLE_COMMAND_TIMEOUT_DEF,
+        response_expected: bool = True,
     ):
         self.command = command
+        self.timeout = timeout
+        self.response_expected = response_expected
         self.device = device
         self.uuid = DeviceServiceUUID.DATA.value
         self.response: UtecBleResponse
@@ -245,7 +829,17 @@ class UtecBleRequest:
         self.data = data
         self.auth_required = auth_required
 
-        self.buffer = bytearray(5120)
+        cache_key = (
+            (command.value, bytes(data))
+            if command in FRAME_CACHE_COMMANDS and not auth_required
+            else None
+        )
+        if cache_key and (package := UtecBleRequest._packages.get(cache_key)):
+            self.buffer = bytearray(package)
+            self._write_pos = len(package)
+            return
+
+        self.buffer = bytearray(4 + (8 if auth_required else 0) + len(data) + 1)
         self.buffer[0] = 0x7F
         byte_array = bytearray(int.to_bytes(2, 2, "little"))
         self.buffer[1] = byte_array[0]
@@ -260,6 +854,9 @@ class UtecBleRequest:
         self._append_length()
         self._append_crc()
 
+        if cache_key:
+            UtecBleRequest._packages[cache_key] = bytes(self.package)
+
     def _append_data(self, data):
         data_len = len(data)
         self.buffer[self._write_pos : self._write_pos + data_len] = data
@@ -282,12 +879,7 @@ class UtecBleRequest:
         self.buffer[2] = byte_array[1]
 
     def _append_crc(self):
-        b = 0
-        for i2 in range(3, self._write_pos):
-            m_index = (b ^ self.buffer[i2]) & 0xFF
-            b = CRC8Table[m_index]
-
-        self.buffer[self._write_pos] = b
+        self.buffer[self._write_pos] = crc8(self.buffer[3 : self._write_pos])
         self._write_pos += 1
 
     @property
@@ -295,75 +887,106 @@ class UtecBleRequest:
         return self.buffer[: self._write_pos]
 
     def encrypted_package(self, aes_key: bytes):
-        bArr2 = bytearray(self._write_pos)
-        bArr2[: self._write_pos] = self.buffer[: self._write_pos]
-        num_chunks = (self._write_pos // 16) + (1 if self._write_pos % 16 > 0 else 0)
-        pkg = bytearray(num_chunks * 16)
-
-        i2 = 0
-        while i2 < num_chunks:
-            i3 = i2 + 1
-            if i3 < num_chunks:
-                bArr = bArr2[i2 * 16 : (i2 + 1) * 16]
-            else:
-                i4 = self._write_pos - ((num_chunks - 1) * 16)
-                bArr = bArr2[i2 * 16 : i2 * 16 + i4]
-
-            initialValue = bytearray(16)
-            encrypt_buffer = bytearray(16)
-            encrypt_buffer[: len(bArr)] = bArr
-            cipher = AES.new(aes_key, AES.MODE_CBC, initialValue)
-            encrypt = cipher.encrypt(encrypt_buffer)
-            if encrypt is None:
-                encrypt = bytearray(16)
-
-            pkg[i2 * 16 : (i2 + 1) * 16] = encrypt
-            i2 = i3
-        return pkg
+        return bytearray(encrypt_frame(aes_key, self.package))
+
+    def cached_encrypted_package(self, aes_key: bytes):
+        cache = self.device.frame_cache if self.device else None
+        if cache is None or self.command not in FRAME_CACHE_COMMANDS:
+            return self.encrypted_package(aes_key)
+
+        package = bytes(self.package)
+        if (frame := cache.get(aes_key, package)) is None:
+            frame = self.encrypted_package(aes_key)
+            cache.put(package, frame)
+        return frame
+
+    async def _encrypt(self) -> bytes:
+        if self._write_pos < CRYPTO_OFFLOAD_MIN_DEF:
+            return self.cached_encrypted_package(self.aes_key)
+        # large frames are not worth caching, keep them off the event loop
+        return await self.device.crypto.run(
+            encrypt_frame, bytes(self.aes_key), bytes(self.package)
+        )
+
+    @property
+    def response_code(self) -> int:
+        return self.command.value ^ 0x80
+
+    def _frame_received(self, response: "UtecBleResponse", frame: bytes) -> bool:
+        """Handle a response frame, return True once the response is complete."""
+        return True
+
+    async def _wait_response(self):
+        completed = self.response.response_completed
+        if not self.paged:
+            await asyncio.wait_for(completed.wait(), self.timeout)
+            return
+
+        # a long response only times out once the lock stops sending
+        while True:
+            idle = time.monotonic() - self.response.last_activity
+            try:
+                await asyncio.wait_for(completed.wait(), self.timeout - idle)
+                return
+            except asyncio.TimeoutError:
+                if time.monotonic() - self.response.last_activity >= self.timeout:
+                    raise
 
     async def _get_response(self, client: BleakClient):
         self.response = UtecBleResponse(self, self.device)
+        self.device._pending = self
         try:
-            await client.start_notify(self.uuid, self.response._receive_write_response)
-            await client.write_gatt_char(
-                self.uuid, self.encrypted_package(self.aes_key)
-            )
-            await self.response.response_completed.wait()
+            frame = await self._encrypt()
+            if recorder := self.device.recorder:
+                recorder.request(self.package)
+                recorder.gatt_write(self.uuid, frame)
+            await client.write_gatt_char(self.uuid, frame)
+            if not self.response_expected:
+                return
+            await self._wait_response()
+            if self.response.error:
+                raise self.response.error
+        except asyncio.TimeoutError:
+            if self.device._reader:
+                self.device._reader.reset()
+            raise self.device.error(
+                UtecBleTimeoutError(
+                    f"No response to {self.command.name} from {self.device.name}({self.device.mac_uuid}).",
+                    f"Timed out after {self.timeout}s.",
+                )
+            ) from None
         except Exception as e:
             raise self.device.error(e)
         finally:
-            await client.stop_notify(self.uuid)
+            self.device._pending = None
 
 
 class UtecBleResponse:
     def __init__(self, request: UtecBleRequest, device: UtecBleDevice):
         self.buffer = bytearray()
+        self.frames: list[bytes] = []
         self.request = request
         self.response_completed = asyncio.Event()
         self.device = device
+        self.last_activity = time.monotonic()
+        self.error: Exception | None = None
 
-    async def _receive_write_response(
-        self, sender: BleakGATTCharacteristic, data: bytearray
-    ):
-        try:
-            self._append(data, bytearray(self.request.aes_key))
-            if self.completed and self.is_valid:
-                await self._read_response()
-                self.response_completed.set()
-        except Exception as e:
-            e.add_note(f"({self.device.mac_uuid}) Error receiving write response.")
-            raise self.device.error(e)
+    def _add_frame(self, frame: bytes):
+        self.frames.append(frame)
+        if len(self.frames) == 1:
+            self.buffer = bytearray(frame)
+        if self.request._frame_received(self, frame):
+            self._read_response()
+            self.response_completed.set()
 
     def reset(self):
         self.buffer = bytearray(0)
+        self.frames.clear()
 
-    def _append(self, barr: bytearray, aes_key: bytearray):
-        f495iv = bytearray(16)
-        cipher = AES.new(aes_key, AES.MODE_CBC, f495iv)
-        output = cipher.decrypt(barr)
-
-        if (self.length > 0 and self.buffer[0] == 0x7F) or output[0] == 0x7F:
-            self.buffer += output
+    def fail(self, error: Exception):
+        """End the wait for a response that will never come."""
+        self.error = error
+        self.response_completed.set()
 
     def _parameter(self, index):
         data_len = self.data_len
@@ -403,15 +1026,17 @@ class UtecBleResponse:
 
     @property
     def package_len(self):
-        return self.data_len + 4 if self.length > 3 else 0
+        return self.data_len + 3 if self.length > 3 else 0
 
     @property
     def package(self):
-        return self.buffer[: self.package_len - 1]
+        return self.buffer[: self.package_len]
 
     @property
     def command(self) -> BleResponseCode | Any:
-        return BleResponseCode(self.buffer[3]) if self.completed else None
+        if not self.completed:
+            return None
+        return BleResponseCode._value2member_map_.get(self.buffer[3])
 
     @property
     def success(self) -> bool:
@@ -420,11 +1045,11 @@ class UtecBleResponse:
     @property
     def data(self) -> bytearray:
         if self.is_valid:
-            return self.buffer[5 : self.data_len + 5]
+            return self.buffer[5 : self.package_len - 1]
         else:
             return bytearray()
 
-    async def _read_response(self):
+    def _read_response(self):
         try:
             self.device.debug(
                 "(%s) Response %s (%s): %s",
@@ -474,6 +1099,19 @@ class UtecBleResponse:
                     f"({self.device.mac_uuid}) power level:{self.device.battery}, {BATTERY_LEVEL[self.device.battery]}"
                 )
 
+            elif self.command == BleResponseCode.READ_TIME:
+                if lock_time := date_from_4bytes(self.data[:4]):
+                    self.device._update_clock(lock_time)
+
+            elif self.command == BleResponseCode.WRITE_TIME:
+                if self.success:
+                    self.device.calendar = datetime.datetime.now()
+                    self.device.device_time_offset = datetime.timedelta()
+                    self.device.clock_drift = 0.0
+                    self.device.time_synced = time.monotonic()
+                    self.device._drift_baseline = (0.0, self.device.time_synced)
+                    self.device.debug(f"({self.device.mac_uuid}) clock set.")
+
             elif self.command == BleResponseCode.GET_SN:
                 self.device.sn = self.data.decode("ISO8859-1")
                 self.device.debug(
@@ -491,6 +1129,12 @@ class UtecBleResponse:
                         f"({self.device.mac_uuid}) workmode:{self.device.lock_mode}"
                     )
 
+            elif self.command == BleResponseCode.ADMIN_LOGIN:
+                self.device.authenticated = self.success
+                self.device.debug(
+                    f"({self.device.mac_uuid}) admin login:{self.success}"
+                )
+
             elif self.command == BleResponseCode.UNLOCK:
                 self.device.debug(
                     f"({self.device.mac_uuid}) {self.device.name} - Unlocked."
@@ -501,6 +1145,13 @@ class UtecBleResponse:
                     f"({self.device.mac_uuid}) {self.device.name} - Bolt Locked"
                 )
 
+            elif self.command == BleResponseCode.DOORSENSOR:
+                if self.data:
+                    self.device.door_status = int(self.data[0])
+                    self.device.debug(
+                        f"({self.device.mac_uuid}) door:{self.device.door_status}"
+                    )
+
             elif self.command == BleResponseCode.LOCK_STATUS:
                 self.device.lock_status = int(self.data[0])
                 self.device.bolt_status = int(self.data[1])
@@ -515,6 +1166,9 @@ class UtecBleResponse:
                         f"({self.device.mac_uuid}) power level:{self.device.battery} | mute:{self.device.mute} | mode:{self.device.lock_mode}"
                     )
 
+            if self.device.state:
+                self.device.state.write(self.device.state_index, self.device)
+
             self.device.debug(
                 f"({self.device.mac_uuid}) Command Completed - {self.command.name}"
             )
@@ -529,9 +1183,10 @@ class UtecBleDeviceKey:
     @staticmethod
     async def get_shared_key(client: BleakClient, device: UtecBleDevice) -> bytes:
         if client.services.get_characteristic(DeviceKeyUUID.STATIC.value):
-            return bytearray(b"Anviz.ut") + await client.read_gatt_char(
-                DeviceKeyUUID.STATIC.value
-            )
+            key = await client.read_gatt_char(DeviceKeyUUID.STATIC.value)
+            if device.recorder:
+                device.recorder.gatt_read(DeviceKeyUUID.STATIC.value, key)
+            return bytearray(b"Anviz.ut") + key
         elif client.services.get_characteristic(DeviceKeyUUID.MD5.value):
             return await UtecBleDeviceKey.get_md5_key(client, device)
         elif client.services.get_characteristic(DeviceKeyUUID.ECC.value):
@@ -542,44 +1197,54 @@ class UtecBleDeviceKey:
     @staticmethod
     async def get_ecc_key(client: BleakClient, device: UtecBleDevice) -> bytes:
         try:
-            private_key = SigningKey.generate(curve=SECP128r1)
+            secret, pub_x, pub_y = await device.crypto.run(ecc_generate)
             received_pubkey = []
-            public_key = private_key.get_verifying_key()  # type: ignore # noqa
-            pub_x = public_key.pubkey.point.x().to_bytes(16, "little")  # type: ignore # noqa
-            pub_y = public_key.pubkey.point.y().to_bytes(16, "little")  # type: ignore # noqa
 
             notification_event = asyncio.Event()
 
             def notification_handler(sender, data):
                 # logger.debug(f"({client._mac_address}) ECC data:{data.hex()}")
+                if device.recorder:
+                    device.recorder.notify(DeviceKeyUUID.ECC.value, data)
                 received_pubkey.append(data)
                 if len(received_pubkey) == 2:
                     notification_event.set()
 
             await client.start_notify(DeviceKeyUUID.ECC.value, notification_handler)
-            await client.write_gatt_char(DeviceKeyUUID.ECC.value, pub_x)
-            await client.write_gatt_char(DeviceKeyUUID.ECC.value, pub_y)
-            await notification_event.wait()
-
-            await client.stop_notify(DeviceKeyUUID.ECC.value)
+            if device.recorder:
+                device.recorder.gatt_write(DeviceKeyUUID.ECC.value, pub_x)
+                device.recorder.gatt_write(DeviceKeyUUID.ECC.value, pub_y)
+            try:
+                await client.write_gatt_char(DeviceKeyUUID.ECC.value, pub_x)
+                await client.write_gatt_char(DeviceKeyUUID.ECC.value, pub_y)
+                await asyncio.wait_for(notification_event.wait(), BLE_KEY_TIMEOUT_DEF)
+            except asyncio.TimeoutError:
+                raise UtecBleTimeoutError(
+                    f"({client.address}) No ECC public key received.",
+                    f"Timed out after {BLE_KEY_TIMEOUT_DEF}s.",
+                ) from None
+            finally:
+                await client.stop_notify(DeviceKeyUUID.ECC.value)
 
-            rec_key_point = Point(
-                SECP128r1.curve,
-                int.from_bytes(received_pubkey[0], "little"),
-                int.from_bytes(received_pubkey[1], "little"),
+            shared_key = await device.crypto.run(
+                ecc_shared_key, secret, bytes(received_pubkey[0]), bytes(received_pubkey[1])
             )
-            shared_point = private_key.privkey.secret_multiplier * rec_key_point  # type: ignore # noqa
-            shared_key = int.to_bytes(shared_point.x(), 16, "little")
             device.debug(f"({client.address}) ECC key updated.")
             return shared_key
         except Exception as e:
             e.add_note(f"({client.address}) Failed to update ECC key: {e}")
             raise device.error(e)
 
+    @staticmethod
+    def derive_md5_key(secret: bytes) -> bytes:
+        return md5_key(secret)
+
     @staticmethod
     async def get_md5_key(client: BleakClient, device: UtecBleDevice) -> bytes:
         try:
             secret = await client.read_gatt_char(DeviceKeyUUID.MD5.value)
+            if device.recorder:
+                device.recorder.gatt_read(DeviceKeyUUID.MD5.value, secret)
 
             device.debug(f"({client.address}) Secret: {secret.hex()}")
 
@@ -588,43 +1253,7 @@ class UtecBleDeviceKey:
                     ValueError(f"({client.address}) Expected secret of length 16.")
                 )
 
-            part1 = struct.unpack("<Q", secret[:8])[0]  # Little-endian
-            part2 = struct.unpack("<Q", secret[8:])[0]
-
-            xor_val1 = (
-                part1 ^ 0x716F6C6172744C55
-            )  # this value corresponds to 'ULtraloq' in little-endian
-            xor_val2_part1 = (part2 >> 56) ^ (part1 >> 56) ^ 0x71
-            xor_val2_part2 = ((part2 >> 48) & 0xFF) ^ ((part1 >> 48) & 0xFF) ^ 0x6F
-            xor_val2_part3 = ((part2 >> 40) & 0xFF) ^ ((part1 >> 40) & 0xFF) ^ 0x6C
-            xor_val2_part4 = ((part2 >> 32) & 0xFF) ^ ((part1 >> 32) & 0xFF) ^ 0x61
-            xor_val2_part5 = ((part2 >> 24) & 0xFF) ^ ((part1 >> 24) & 0xFF) ^ 0x72
-            xor_val2_part6 = ((part2 >> 16) & 0xFF) ^ ((part1 >> 16) & 0xFF) ^ 0x74
-            xor_val2_part7 = ((part2 >> 8) & 0xFF) ^ ((part1 >> 8) & 0xFF) ^ 0x4C
-            xor_val2_part8 = (part2 & 0xFF) ^ (part1 & 0xFF) ^ 0x55
-
-            xor_val2 = (
-                (xor_val2_part1 << 56)
-                | (xor_val2_part2 << 48)
-                | (xor_val2_part3 << 40)
-                | (xor_val2_part4 << 32)
-                | (xor_val2_part5 << 24)
-                | (xor_val2_part6 << 16)
-                | (xor_val2_part7 << 8)
-                | xor_val2_part8
-            )
-
-            xor_result = struct.pack("<QQ", xor_val1, xor_val2)
-
-            m = hashlib.md5()
-            m.update(xor_result)
-            result = m.digest()
-
-            bVar2 = (part1 & 0xFF) ^ 0x55
-            if bVar2 & 1:
-                m = hashlib.md5()
-                m.update(result)
-                result = m.digest()
+            result = await device.crypto.run(md5_key, bytes(secret))
 
             device.debug(f"({client.address}) MD5 key:{result.hex()}")
             return result
@@ -0,0 +1,596 @@
+"""In-process lock emulator and a fake BleakClient that talks to it.
+
+The emulator speaks the same frame format as a real lock (0x7F header,
+little-endian length, CRC8, per-block AES) and supports the STATIC, MD5 and
+ECC key exchanges, so `UtecBleDevice.send_requests` can be exercised end to
+end without hardware.
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import inspect
+import random
+from collections.abc import Callable
+from typing import Any
+
+from bleak.backends.device import BLEDevice
+from bleak.exc import BleakDeviceNotFoundError, BleakError
+from Crypto.Cipher import AES
+from ecdsa import SECP128r1, SigningKey
+from ecdsa.ellipticcurve import Point
+
+from ..enums import BLECommandCode, DeviceKeyUUID, DeviceServiceUUID
+from ..util import crc8, date_from_4bytes, date_to_4bytes, to_byte_array
+from .device import UtecBleDevice, UtecBleDeviceKey
+from .history import HISTORY_RECORD
+from .users import USER_RECORD
+
+ZERO_IV = bytes(16)
+
+
+def encrypt_notification(aes_key: bytes, data: bytes) -> bytes:
+    """Encrypt one notification, CBC chained over all of its blocks."""
+    padded = bytes(data) + bytes(-len(data) % 16)
+    return AES.new(aes_key, AES.MODE_CBC, ZERO_IV).encrypt(padded)
+
+
+def decrypt_blocks(aes_key: bytes, data: bytes) -> bytes:
+    return b"".join(
+        AES.new(aes_key, AES.MODE_CBC, ZERO_IV).decrypt(data[i : i + 16])
+        for i in range(0, len(data), 16)
+    )
+
+
+def build_frame(code: int, payload: bytes = b"") -> bytes:
+    """Build a plain frame: header, length, code, payload and CRC."""
+    body = bytes([code]) + bytes(payload)
+    frame = bytearray([0x7F]) + (len(body) + 1).to_bytes(2, "little") + body
+    frame.append(crc8(body))
+    return bytes(frame)
+
+
+class EmulatedLock:
+    """State machine for a single emulated lock.
+
+    latency: seconds before each response notification is sent.
+    notification_interval: seconds between the notifications of one response.
+    connect_latency: seconds spent in `connect`.
+    discovery_latency: seconds spent discovering services on a connect that
+    cannot use the adapter's service cache.
+    connect_failure_rate: probability that a connection attempt fails.
+    drop_rate: probability that a response is never sent.
+    notification_size: bytes of response data per notification, a multiple
+    of 16; larger values put several frames in one notification.
+    asleep: the lock only accepts connections after its wake-up receiver
+    (`wurx_address`) has been connected to.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        name: str = "Emulated Lock",
+        key_mechanism: DeviceKeyUUID = DeviceKeyUUID.STATIC,
+        uid: str = "1",
+        password: str = "123456",
+        wurx_address: str | None = None,
+        asleep: bool = False,
+        bt264: bool = True,
+        latency: float = 0.0,
+        connect_latency: float = 0.0,
+        discovery_latency: float = 0.0,
+        connect_failure_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        notification_size: int = 16,
+        notification_interval: float = 0.0,
+        seed: int | None = 0,
+    ) -> None:
+        self.address = address
+        self.name = name
+        self.key_mechanism = key_mechanism
+        self.uid = uid
+        self.password = password
+        self.wurx_address = wurx_address
+        self.asleep = asleep
+        self.bt264 = bt264
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.discovery_latency = discovery_latency
+        self.connect_failure_rate = connect_failure_rate
+        self.drop_rate = drop_rate
+        self.notification_size = notification_size
+        self.notification_interval = notification_interval
+        self.random = random.Random(seed)
+
+        self.static_secret = bytes(self.random.getrandbits(8) for _ in range(8))
+        self.md5_secret = bytes(self.random.getrandbits(8) for _ in range(16))
+        self.aes_key: bytes | None = None
+
+        self.lock_status = 2
+        self.bolt_status = 1
+        self.lock_mode = 0
+        self.battery = 3
+        self.mute = False
+        self.autolock_time = 0
+        self.door_status = 0
+        self.sn = f"EMU{address.replace(':', '')[-8:]}"
+        self.clock_offset = datetime.timedelta()
+        self.history: list[tuple[int, int, int, int, int]] = []
+        self.records_per_frame = 16
+        self.users: dict[int, bytes] = {}
+        # command codes answered with an error status
+        self.refused: set[int] = set()
+
+        self.bluetooth: EmulatedBluetooth | None = None
+        self.connections = 0
+        self.discoveries = 0
+        self.cached_services: set[str] | None = None
+        self.clients: set[EmulatedBleakClient] = set()
+        self.commands: list[BLECommandCode] = []
+        self._rx = bytearray()
+        self._ecc_rx: list[bytes] = []
+        self._ecc_private: SigningKey | None = None
+
+    @property
+    def ble_device(self) -> BLEDevice:
+        return BLEDevice(self.address, self.name, {"emulator": self})
+
+    def characteristics(self) -> set[str]:
+        return {
+            DeviceServiceUUID.DATA.value,
+            self.key_mechanism.value,
+        }
+
+    def on_connect(self) -> None:
+        self.connections += 1
+        self.aes_key = (
+            bytes(b"Anviz.ut") + self.static_secret
+            if self.key_mechanism == DeviceKeyUUID.STATIC
+            else None
+        )
+        if self.key_mechanism == DeviceKeyUUID.MD5:
+            self.aes_key = UtecBleDeviceKey.derive_md5_key(self.md5_secret)
+        self._rx.clear()
+        self._ecc_rx.clear()
+
+    def read(self, uuid: str) -> bytes:
+        if uuid == DeviceKeyUUID.STATIC.value:
+            return self.static_secret
+        if uuid == DeviceKeyUUID.MD5.value:
+            return self.md5_secret
+        raise BleakError(f"Characteristic {uuid} is not readable.")
+
+    def write(self, uuid: str, data: bytes) -> list[bytes]:
+        """Handle a GATT write and return the notifications it produces."""
+        if uuid == DeviceKeyUUID.ECC.value:
+            return self._ecc_write(data)
+        if uuid != DeviceServiceUUID.DATA.value or not self.aes_key:
+            raise BleakError(f"Unexpected write to {uuid}.")
+
+        self._rx += decrypt_blocks(self.aes_key, data)
+        responses = bytearray()
+        while self._rx:
+            if self._rx[0] != 0x7F:
+                self._rx.clear()
+                break
+            if len(self._rx) < 3:
+                break
+            frame_len = int.from_bytes(self._rx[1:3], "little") + 3
+            if len(self._rx) < frame_len:
+                break
+            frame = bytes(self._rx[:frame_len])
+            # the rest of the block is zero padding
+            del self._rx[: frame_len + (-frame_len % 16)]
+            if crc8(frame[3:-1]) != frame[-1]:
+                continue
+            for response in self._handle(frame[3], frame[4:-1]):
+                responses += response + bytes(-len(response) % 16)
+        return self.notifications(responses)
+
+    def notifications(self, data: bytes) -> list[bytes]:
+        """Split plain response data into encrypted notifications."""
+        size = self.notification_size
+        return [
+            encrypt_notification(self.aes_key, data[i : i + size])
+            for i in range(0, len(data), size)
+        ]
+
+    def _ecc_write(self, data: bytes) -> list[bytes]:
+        self._ecc_rx.append(bytes(data))
+        if len(self._ecc_rx) < 2:
+            return []
+
+        if not self._ecc_private:
+            self._ecc_private = SigningKey.from_secret_exponent(
+                self.random.randrange(1, SECP128r1.order), curve=SECP128r1
+            )
+        client_point = Point(
+            SECP128r1.curve,
+            int.from_bytes(self._ecc_rx[0], "little"),
+            int.from_bytes(self._ecc_rx[1], "little"),
+        )
+        shared_point = self._ecc_private.privkey.secret_multiplier * client_point
+        self.aes_key = int.to_bytes(shared_point.x(), 16, "little")
+        self._ecc_rx.clear()
+
+        point = self._ecc_private.get_verifying_key().pubkey.point
+        return [point.x().to_bytes(16, "little"), point.y().to_bytes(16, "little")]
+
+    def push(self, code: BLECommandCode, payload: bytes = b""):
+        """Send an unsolicited frame to every connected client."""
+        frame = build_frame(code.value ^ 0x80, bytes([0]) + payload)
+        frame += bytes(-len(frame) % 16)
+        for client in list(self.clients):
+            client.push(DeviceServiceUUID.DATA.value, self.notifications(frame))
+
+    def drop_connections(self):
+        """Drop every connection from the lock's side, e.g. on reboot."""
+        loop = asyncio.get_running_loop()
+        for client in list(self.clients):
+            loop.call_soon(client.drop)
+
+    def set_door(self, status: int):
+        """Open (1) or close (0) the door, as seen by the door sensor."""
+        self.door_status = status
+        self.push(BLECommandCode.DOORSENSOR, bytes([status]))
+
+    def operate_manually(self, locked: bool):
+        """Lock or unlock at the door, e.g. with the thumb turn or keypad."""
+        self.lock_status, self.bolt_status = (2, 1) if locked else (1, 0)
+        self.push(
+            BLECommandCode.LOCK_STATUS, bytes([self.lock_status, self.bolt_status])
+        )
+
+    def add_history(self, count: int, start: datetime.datetime | None = None):
+        """Append `count` generated access log entries."""
+        when = start or datetime.datetime(2024, 1, 1)
+        for _ in range(count):
+            when += datetime.timedelta(minutes=self.random.randint(1, 600))
+            self.history.append(
+                (
+                    len(self.history),
+                    int.from_bytes(date_to_4bytes(when), "big"),
+                    self.random.randint(1, 20),
+                    self.random.randint(0, 3),
+                    self.random.randint(0, 4),
+                )
+            )
+
+    def _handle(self, code: int, data: bytes) -> list[bytes]:
+        if code in self.refused:
+            self.commands.append(BLECommandCode(code))
+            return [build_frame(code ^ 0x80, bytes([1]))]
+        if code == BLECommandCode.READ_HISTORY.value:
+            self.commands.append(BLECommandCode.READ_HISTORY)
+            return self._history_frames(data)
+        if code == BLECommandCode.READ_USERS.value:
+            self.commands.append(BLECommandCode.READ_USERS)
+            return self._user_frames()
+        response = self._handle_command(code, data)
+        return [] if response is None else [response]
+
+    def _history_frames(self, data: bytes) -> list[bytes]:
+        start = int.from_bytes(data[:4], "little")
+        count = int.from_bytes(data[4:6], "little")
+        records = [r for r in self.history if r[0] >= start][:count]
+        return self._paged_frames(
+            BLECommandCode.READ_HISTORY, [HISTORY_RECORD.pack(*r) for r in records]
+        )
+
+    def _user_frames(self) -> list[bytes]:
+        return self._paged_frames(
+            BLECommandCode.READ_USERS,
+            [self.users[user_id] for user_id in sorted(self.users)],
+        )
+
+    def _paged_frames(
+        self, command: BLECommandCode, records: list[bytes]
+    ) -> list[bytes]:
+        """`records_per_frame` packed records per frame, see ble/paged.py."""
+        frames = []
+        step = self.records_per_frame
+        for i in range(0, max(len(records), 1), step):
+            more = int(i + step < len(records))
+            payload = bytes([0, more]) + b"".join(records[i : i + step])
+            frames.append(build_frame(command.value ^ 0x80, payload))
+        return frames
+
+    def _handle_command(self, code: int, data: bytes) -> bytes | None:
+        try:
+            command = BLECommandCode(code)
+        except ValueError:
+            return None
+        self.commands.append(command)
+        status = 0
+        payload = b""
+
+        if command == BLECommandCode.LOCK_STATUS:
+            payload = bytes([self.lock_status, self.bolt_status])
+            if self.bt264:
+                payload += bytes(
+                    [self.battery, self.lock_mode, int(self.mute)]
+                ) + bytes(8)
+        elif command == BLECommandCode.GET_LOCK_STATUS:
+            payload = bytes([self.lock_mode, self.bolt_status])
+        elif command == BLECommandCode.GET_BATTERY:
+            payload = bytes([self.battery])
+        elif command == BLECommandCode.GET_SN:
+            payload = self.sn.encode("ISO8859-1")
+        elif command == BLECommandCode.GET_MUTE:
+            payload = bytes([int(self.mute)])
+        elif command == BLECommandCode.UNLOCK:
+            self.lock_status, self.bolt_status = 1, 0
+        elif command == BLECommandCode.BOLT_LOCK:
+            self.lock_status, self.bolt_status = 2, 1
+        elif command in (BLECommandCode.SET_LOCK_STATUS, BLECommandCode.SET_WORK_MODE):
+            self.lock_mode = data[0] if data else self.lock_mode
+            payload = bytes([self.lock_mode])
+        elif command == BLECommandCode.GET_AUTOLOCK:
+            payload = bytes(to_byte_array(self.autolock_time, 2))
+        elif command == BLECommandCode.SET_AUTOLOCK:
+            if len(data) >= 2:
+                self.autolock_time = int.from_bytes(data[:2], "little")
+            payload = bytes(to_byte_array(self.autolock_time, 2))
+        elif command == BLECommandCode.DOORSENSOR:
+            payload = bytes([self.door_status])
+        elif command == BLECommandCode.ADMIN_LOGIN:
+            if len(data) >= 8 and not self._check_auth(data[:8]):
+                status = 1
+        elif command == BLECommandCode.ADD_USER:
+            if len(data) >= USER_RECORD.size:
+                self.users[int.from_bytes(data[:2], "big")] = bytes(data[: USER_RECORD.size])
+            else:
+                status = 1
+        elif command == BLECommandCode.DELETE_USER:
+            if self.users.pop(int.from_bytes(data[:2], "big"), None) is None:
+                status = 1
+        elif command == BLECommandCode.READ_TIME:
+            payload = date_to_4bytes(datetime.datetime.now() + self.clock_offset)
+        elif command == BLECommandCode.WRITE_TIME:
+            if written := date_from_4bytes(data[:4]):
+                self.clock_offset = written - datetime.datetime.now()
+        elif command == BLECommandCode.REBOOT:
+            # the lock drops the connection without answering
+            self.drop_connections()
+            return None
+        else:
+            # not modelled, left unanswered
+            return None
+
+        return build_frame(code ^ 0x80, bytes([status]) + payload)
+
+    def _check_auth(self, data: bytes) -> bool:
+        uid = int.from_bytes(data[:4], "little")
+        password = int.from_bytes(data[4:7], "little") | (data[7] & 0x0F) << 24
+        return uid == int(self.uid) and password == int(self.password)
+
+
+class EmulatedServices:
+    def __init__(self, characteristics: set[str]) -> None:
+        self._characteristics = characteristics
+
+    def get_characteristic(self, uuid: str) -> str | None:
+        return uuid if uuid in self._characteristics else None
+
+
+class EmulatedBleakClient:
+    """Stand-in for `BleakClient` that routes GATT operations to an emulator."""
+
+    def __init__(
+        self,
+        address_or_ble_device: BLEDevice,
+        disconnected_callback: Callable[[Any], None] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self._device = address_or_ble_device
+        self._lock: EmulatedLock | EmulatedWakeupReceiver = (
+            address_or_ble_device.details["emulator"]
+        )
+        self._disconnected_callback = disconnected_callback
+        self._notify: dict[str, Callable[[Any, bytearray], Any]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.is_connected = False
+        self.services: EmulatedServices | None = None
+
+    @property
+    def address(self) -> str:
+        return self._device.address
+
+    async def connect(self, **kwargs: Any) -> bool:
+        lock = self._lock
+        if lock.connect_latency:
+            await asyncio.sleep(lock.connect_latency)
+        if lock.bluetooth and lock.bluetooth.scanning and lock.bluetooth.scan_latency:
+            await asyncio.sleep(lock.bluetooth.scan_latency)
+        if lock.asleep:
+            raise BleakDeviceNotFoundError(self.address, f"{self.address} not found")
+        if lock.random.random() < lock.connect_failure_rate:
+            raise BleakError("le-connection-abort-by-local")
+
+        lock.on_connect()
+        if not kwargs.get("dangerous_use_bleak_cache") or lock.cached_services is None:
+            # like BlueZ, a cached copy goes stale if the lock's services change
+            if lock.discovery_latency:
+                await asyncio.sleep(lock.discovery_latency)
+            lock.discoveries += 1
+            lock.cached_services = lock.characteristics()
+        self.services = EmulatedServices(lock.cached_services)
+        self.is_connected = True
+        if isinstance(lock, EmulatedLock):
+            lock.clients.add(self)
+        return True
+
+    async def disconnect(self) -> bool:
+        self.drop()
+        return True
+
+    def drop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._notify.clear()
+        self.is_connected = False
+        if isinstance(self._lock, EmulatedLock):
+            self._lock.clients.discard(self)
+        if self._disconnected_callback:
+            self._disconnected_callback(self)
+
+    async def read_gatt_char(self, uuid: str, **kwargs: Any) -> bytearray:
+        self._check_connected(uuid)
+        return bytearray(self._lock.read(uuid))
+
+    async def write_gatt_char(
+        self, uuid: str, data: bytes, response: bool | None = None
+    ) -> None:
+        self._check_connected(uuid)
+        notifications = self._lock.write(uuid, bytes(data))
+        if notifications and self._lock.random.random() >= self._lock.drop_rate:
+            task = asyncio.create_task(self._deliver(uuid, notifications))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def start_notify(
+        self, uuid: str, callback: Callable[[Any, bytearray], Any], **kwargs: Any
+    ) -> None:
+        self._check_connected(uuid)
+        self._notify[uuid] = callback
+
+    async def stop_notify(self, uuid: str) -> None:
+        self._notify.pop(uuid, None)
+
+    def push(self, uuid: str, notifications: list[bytes]) -> None:
+        if not self.is_connected:
+            return
+        task = asyncio.create_task(self._deliver(uuid, notifications))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, uuid: str, notifications: list[bytes]) -> None:
+        if self._lock.latency:
+            await asyncio.sleep(self._lock.latency)
+        for i, data in enumerate(notifications):
+            if i and self._lock.notification_interval:
+                await asyncio.sleep(self._lock.notification_interval)
+            if not (callback := self._notify.get(uuid)):
+                return
+            result = callback(uuid, bytearray(data))
+            if inspect.isawaitable(result):
+                await result
+
+    def _check_connected(self, uuid: str) -> None:
+        if not self.is_connected:
+            raise BleakError(f"{self.address} is not connected.")
+        if uuid not in self._lock.characteristics():
+            raise BleakError(f"{self.address} has no characteristic {uuid}.")
+
+
+class EmulatedWakeupReceiver:
+    """Wake-up receiver, connecting to it wakes the paired lock."""
+
+    def __init__(self, address: str, lock: EmulatedLock) -> None:
+        self.address = address
+        self.lock = lock
+        self.asleep = False
+        self.random = lock.random
+        self.connect_latency = lock.connect_latency
+        self.discovery_latency = lock.discovery_latency
+        self.connect_failure_rate = 0.0
+        self.bluetooth: EmulatedBluetooth | None = None
+        self.discoveries = 0
+        self.cached_services: set[str] | None = None
+
+    @property
+    def ble_device(self) -> BLEDevice:
+        return BLEDevice(self.address, "Wake-up Receiver", {"emulator": self})
+
+    def on_connect(self) -> None:
+        self.lock.asleep = False
+
+    def characteristics(self) -> set[str]:
+        return set()
+
+
+class EmulatedScanner:
+    """Active scan on the emulated adapter, slows down every connect."""
+
+    def __init__(self, bluetooth: EmulatedBluetooth) -> None:
+        self.bluetooth = bluetooth
+        self.running = False
+        self.starts = 0
+        self.stops = 0
+
+    async def start(self) -> None:
+        if not self.running:
+            self.running = True
+            self.starts += 1
+            self.bluetooth.scanners += 1
+
+    async def stop(self) -> None:
+        if self.running:
+            self.running = False
+            self.stops += 1
+            self.bluetooth.scanners -= 1
+
+
+class EmulatedBluetooth:
+    """Registry of emulated locks standing in for the Bluetooth adapter.
+
+    scan_latency: extra seconds each connect takes while a scanner runs.
+    """
+
+    def __init__(self, scan_latency: float = 0.0) -> None:
+        self.devices: dict[str, EmulatedLock | EmulatedWakeupReceiver] = {}
+        self.scan_latency = scan_latency
+        self.scanners = 0
+
+    @property
+    def scanning(self) -> bool:
+        return self.scanners > 0
+
+    def scanner(self) -> EmulatedScanner:
+        return EmulatedScanner(self)
+
+    def add_lock(self, lock: EmulatedLock) -> EmulatedLock:
+        self.devices[lock.address] = lock
+        lock.bluetooth = self
+        if lock.wurx_address:
+            wurx = EmulatedWakeupReceiver(lock.wurx_address, lock)
+            wurx.bluetooth = self
+            self.devices[lock.wurx_address] = wurx
+        return lock
+
+    async def async_bledevice_callback(self, address: str) -> BLEDevice | None:
+        if device := self.devices.get(address):
+            return device.ble_device
+        return None
+
+    async def clear_cache(self, address: str) -> bool:
+        if device := self.devices.get(address):
+            device.cached_services = None
+        return True
+
+    def attach(self, device: UtecBleDevice) -> UtecBleDevice:
+        """Point a device at the emulated adapter."""
+        device.async_bledevice_callback = self.async_bledevice_callback
+        device.clear_cache_callback = self.clear_cache
+        device.client_class = EmulatedBleakClient
+        # the emulator defines the unconfirmed history and user table commands
+        device.allow_unconfirmed_commands = True
+        return device
+
+    def create_device(
+        self,
+        lock: EmulatedLock,
+        device_class: type[UtecBleDevice] = UtecBleDevice,
+        device_model: str = "",
+    ) -> UtecBleDevice:
+        """Register `lock` and build a matching library device for it."""
+        self.add_lock(lock)
+        device = device_class(
+            uid=lock.uid,
+            password=lock.password,
+            mac_uuid=lock.address,
+            device_name=lock.name,
+            wurx_uuid=lock.wurx_address or "",
+            device_model=device_model,
+        )
+        return self.attach(device)
@@ -0,0 +1,49 @@
+"""Events a connected lock pushes without being asked.
+
+Pushed frames share the response layout: header, length, response code,
+status byte, data and CRC. Door sensor changes arrive as DOORSENSOR and
+keypad, fingerprint or manual (thumb turn) operations as LOCK_STATUS; both
+are parsed like the matching response, so the device state is current
+before callbacks run.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from ..enums import BleResponseCode
+
+DOOR_CLOSED = 0
+DOOR_OPEN = 1
+
+
+class UtecBleEvent:
+    def __init__(self, address: str, frame: bytes):
+        self.address = address
+        self.code = frame[3]
+        self.command: BleResponseCode | None = BleResponseCode._value2member_map_.get(
+            self.code
+        )
+        self.data = bytes(frame[5:-1])
+        self.timestamp = time.time()
+
+    def __repr__(self) -> str:
+        name = self.command.name if self.command else hex(self.code)
+        return f"<UtecBleEvent {self.address} {name} {self.data.hex()}>"
+
+    @property
+    def kind(self) -> str:
+        if self.command == BleResponseCode.DOORSENSOR:
+            return "door"
+        if self.command == BleResponseCode.LOCK_STATUS:
+            return "lock"
+        return "unknown"
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "address": self.address,
+            "kind": self.kind,
+            "code": self.code,
+            "data": self.data.hex(),
+            "timestamp": self.timestamp,
+        }
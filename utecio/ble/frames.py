@@ -0,0 +1,92 @@
+"""Reassembly of decrypted notification data into lock frames."""
+from __future__ import annotations
+
+from ..const import FRAME_READER_CAPACITY
+from ..util import crc8
+
+FRAME_HEADER = 0x7F
+# header, 2 byte length, response code and CRC
+FRAME_MIN_LEN = 5
+
+
+class UtecBleFrameReader:
+    """Split a stream of decrypted notification data into frames.
+
+    Data is copied into a preallocated buffer which is compacted as frames
+    are consumed. Frames are returned in arrival order and only when their
+    CRC matches; zero padding, stray bytes and corrupt frames are skipped
+    by resynchronising on the next 0x7F header. Several frames in one
+    notification and frames spread over several notifications are both
+    handled.
+    """
+
+    def __init__(self, capacity: int = FRAME_READER_CAPACITY):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def reset(self):
+        self._start = self._end = 0
+
+    def feed(self, data: bytes) -> list[bytes]:
+        """Add decrypted data and return every frame completed by it."""
+        if len(data) > self.capacity - (self._end - self._start):
+            # a frame can never be this long, start over
+            self.dropped += self._end - self._start
+            self.reset()
+            data = data[-self.capacity :]
+        if self._end + len(data) > self.capacity:
+            self._compact()
+        self._buffer[self._end : self._end + len(data)] = data
+        self._end += len(data)
+
+        frames = []
+        while (frame := self._next_frame()) is not None:
+            frames.append(frame)
+        if self._start == self._end:
+            self.reset()
+        return frames
+
+    def _next_frame(self) -> bytes | None:
+        buffer = self._buffer
+        while self._start < self._end:
+            if buffer[self._start] != FRAME_HEADER:
+                header = buffer.find(FRAME_HEADER, self._start, self._end)
+                skipped = (header if header >= 0 else self._end) - self._start
+                self.dropped += skipped
+                self._start += skipped
+                continue
+            if self._end - self._start < 3:
+                return None
+
+            frame_len = int.from_bytes(buffer[self._start + 1 : self._start + 3], "little") + 3
+            if frame_len < FRAME_MIN_LEN or frame_len > self.capacity:
+                self._skip_header()
+                continue
+            if self._end - self._start < frame_len:
+                return None
+
+            frame_end = self._start + frame_len
+            if crc8(self._view[self._start + 3 : frame_end - 1]) != buffer[frame_end - 1]:
+                self._skip_header()
+                continue
+
+            frame = bytes(self._view[self._start : frame_end])
+            self._start = frame_end
+            return frame
+        return None
+
+    def _skip_header(self):
+        self.dropped += 1
+        self._start += 1
+
+    def _compact(self):
+        remaining = self._end - self._start
+        self._buffer[:remaining] = bytes(self._view[self._start : self._end])
+        self._start, self._end = 0, remaining
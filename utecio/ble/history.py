@@ -0,0 +1,105 @@
+"""Access history records and their bulk decoder.
+
+Request READ_HISTORY, data: start index (uint32 LE), max records (uint16 LE).
+The response is paged, see paged.py. The exchange is not confirmed against
+lock firmware, see UNCONFIRMED_COMMANDS. Every record is 12 bytes, big-endian:
+
+    index      uint32  sequence number of the entry, used as resume cursor
+    timestamp  uint32  packed date, see util.date_from_4bytes
+    user_id    uint16
+    event      uint8
+    method     uint8
+"""
+from __future__ import annotations
+
+import datetime
+import struct
+from array import array
+from collections.abc import Callable
+
+from ..enums import BLECommandCode
+from ..util import date_from_4bytes
+from .paged import UtecBlePagedRequest
+
+HISTORY_RECORD = struct.Struct(">IIHBB")
+
+
+class UtecBleHistory:
+    """History records stored column-wise."""
+
+    def __init__(self):
+        self.index = array("I")
+        self.timestamp = array("I")
+        self.user_id = array("H")
+        self.event = array("B")
+        self.method = array("B")
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def cursor(self) -> int | None:
+        """Index to resume from on the next sync."""
+        return self.index[-1] + 1 if self.index else None
+
+    @property
+    def datetimes(self) -> list[datetime.datetime | None]:
+        return [date_from_4bytes(ts.to_bytes(4, "big")) for ts in self.timestamp]
+
+    @classmethod
+    def decode(cls, data: bytes) -> "UtecBleHistory":
+        """Decode packed records, any trailing partial record is ignored."""
+        history = cls()
+        usable = len(data) - len(data) % HISTORY_RECORD.size
+        if usable:
+            columns = zip(*HISTORY_RECORD.iter_unpack(memoryview(data)[:usable]))
+            index, timestamp, user_id, event, method = columns
+            history.index.extend(index)
+            history.timestamp.extend(timestamp)
+            history.user_id.extend(user_id)
+            history.event.extend(event)
+            history.method.extend(method)
+        return history
+
+    def extend(self, other: "UtecBleHistory"):
+        self.index.extend(other.index)
+        self.timestamp.extend(other.timestamp)
+        self.user_id.extend(other.user_id)
+        self.event.extend(other.event)
+        self.method.extend(other.method)
+
+    def records(self):
+        """Iterate rows as (index, datetime, user_id, event, method)."""
+        return zip(self.index, self.datetimes, self.user_id, self.event, self.method)
+
+
+class UtecBleHistoryRequest(UtecBlePagedRequest):
+    """READ_HISTORY request that decodes each response frame as it arrives."""
+
+    def __init__(
+        self,
+        start: int,
+        count: int,
+        on_records: Callable[[UtecBleHistory], None] | None = None,
+    ):
+        super().__init__(
+            BLECommandCode.READ_HISTORY,
+            data=start.to_bytes(4, "little") + count.to_bytes(2, "little"),
+        )
+        self.start = start
+        self.count = count
+        self.history = UtecBleHistory()
+        self.on_records = on_records
+
+    def _records_received(self, data: bytes):
+        chunk = UtecBleHistory.decode(data)
+        self.history.extend(chunk)
+        if self.on_records and len(chunk):
+            self.on_records(chunk)
+
+    def _last_frame_received(self):
+        if len(self.history) >= self.count and self.device:
+            # a full page, more may be waiting: read on over the same connection
+            self.device.add_request(
+                UtecBleHistoryRequest(self.history.cursor, self.count, self.on_records)
+            )
@@ -1,8 +1,13 @@
+import asyncio
 import datetime
+from collections.abc import AsyncIterator
 
+from ..const import HISTORY_BATCH_DEF, PREPARE_WINDOW_DEF
 from ..enums import BLECommandCode, DeviceLockWorkMode
 from ..util import to_byte_array
-from .device import UtecBleDevice, UtecBleRequest
+from .device import UtecBleDevice, UtecBleDeviceError, UtecBleError, UtecBleRequest
+from .history import UtecBleHistory, UtecBleHistoryRequest
+from .users import USER_COMMANDS, UtecBleUser, UtecBleUserDiff, UtecBleUsersRequest
 
 
 class UtecBleLock(UtecBleDevice):
@@ -23,61 +28,304 @@ class UtecBleLock(UtecBleDevice):
             device_name=device_name,
             device_model=device_model,
         )
+        self.history_cursor = 0
 
-    async def async_unlock(self, update: bool = True):
+    def batch(self, timeout: float | None = None) -> "UtecBleLockBatch":
+        """Collect several operations and send them over one connection.
+
+        async with lock.batch() as batch:
+            batch.set_autolock(30)
+            batch.set_workmode(DeviceLockWorkMode.NORMAL)
+        results = batch.results
+        """
+        return UtecBleLockBatch(self, timeout=timeout)
+
+    async def async_unlock(self, update: bool = True, timeout: float | None = None):
         if update:
             self.add_request(UtecBleRequest(BLECommandCode.LOCK_STATUS))
         self.add_request(UtecBleRequest(BLECommandCode.UNLOCK), priority=True)
 
-        await self.send_requests()
+        await self.send_requests(timeout=timeout)
 
-    async def async_lock(self, update: bool = True):
+    async def async_lock(self, update: bool = True, timeout: float | None = None):
         if update:
             self.add_request(UtecBleRequest(BLECommandCode.LOCK_STATUS))
         self.add_request(UtecBleRequest(BLECommandCode.BOLT_LOCK), priority=True)
 
-        await self.send_requests()
+        await self.send_requests(timeout=timeout)
 
     async def async_reboot(self) -> bool:
-        self.add_request(UtecBleRequest(BLECommandCode.REBOOT))
+        # the lock restarts without answering
+        self.add_request(UtecBleRequest(BLECommandCode.REBOOT, response_expected=False))
         return await self.send_requests()
 
     async def async_set_workmode(self, mode: DeviceLockWorkMode):
-        self.add_request(UtecBleRequest(BLECommandCode.ADMIN_LOGIN))
-        if self.capabilities.bt264:
-            self.add_request(
-                UtecBleRequest(BLECommandCode.SET_LOCK_STATUS, data=bytes([mode.value]))
-            )
-        else:
-            self.add_request(
-                UtecBleRequest(BLECommandCode.SET_WORK_MODE, data=bytes([mode.value]))
-            )
+        for request in self._workmode_requests(mode):
+            self.add_request(request)
 
         await self.send_requests()
 
     async def async_set_autolock(self, seconds: int):
-        if self.capabilities.autolock:
-            self.add_request(UtecBleRequest(BLECommandCode.ADMIN_LOGIN))
-            self.add_request(
-                UtecBleRequest(
-                    BLECommandCode.SET_AUTOLOCK,
-                    data=to_byte_array(seconds, 2) + bytes([0]),
-                )
-            )
+        for request in self._autolock_requests(seconds):
+            self.add_request(request)
+
         await self.send_requests()
 
     async def async_update_status(self):
         self.debug("(%s) %s - Updating lock data...", self.mac_uuid, self.name)
-        self.add_request(UtecBleRequest(BLECommandCode.ADMIN_LOGIN))
+        for request in self._status_requests():
+            self.add_request(request)
+
+        await self.send_requests()
+        self.debug("(%s) %s - Update Successful.", self.mac_uuid, self.name)
+
+    async def async_listen(self, duration: float | None = None):
+        """Stay connected and report events the lock pushes.
+
+        Events go to callbacks registered with `add_event_callback`. Returns
+        after `duration` seconds, on `stop_listening()` or when the lock
+        disconnects; without a duration it listens until one of the latter.
+        """
         self.add_request(UtecBleRequest(BLECommandCode.LOCK_STATUS))
+        if self.capabilities.doorsensor:
+            self.add_request(UtecBleRequest(BLECommandCode.DOORSENSOR))
+        self._begin_hold(duration)
+
+        await self.send_requests()
+
+    async def async_prepare(self, window: float = PREPARE_WINDOW_DEF) -> bool:
+        """Connect, exchange keys and log in ahead of an expected command.
+
+        The session is held for `window` seconds; operations issued meanwhile,
+        e.g. `async_unlock(update=False)`, go out over it as a single write.
+        Returns once the session is ready, True on success. Call
+        `stop_listening()` to release it early.
+        """
+        if self.listening:
+            return True
+        if self.is_busy:
+            return False
+
+        self.add_request(UtecBleRequest(BLECommandCode.ADMIN_LOGIN))
+        self._begin_hold(window)
+        ready = self._session_ready
+        session = asyncio.create_task(self.send_requests())
+        # failures surface as a False return, not as an unretrieved exception
+        session.add_done_callback(lambda task: task.cancelled() or task.exception())
+        await ready.wait()
+        return self.listening
+
+    async def async_sync_time(self):
+        """Measure the lock's clock offset and correct it if past the threshold."""
+        for request in self._time_requests(force=True):
+            self.add_request(request)
+
+        await self.send_requests()
+
+    async def async_history(
+        self, since: int | None = None, count: int = HISTORY_BATCH_DEF
+    ) -> AsyncIterator[UtecBleHistory]:
+        """Stream access history over one connection.
+
+        Yields a columnar UtecBleHistory per received frame, starting at
+        `since` or at `history_cursor`, which is advanced as records arrive
+        so the next call only fetches new entries. Raises UtecBleDeviceError
+        when the lock refuses the read.
+
+        READ_HISTORY is not confirmed against lock firmware yet, so this
+        raises UtecBleError unless `allow_unconfirmed_commands` is set.
+        """
+        self._check_command(BLECommandCode.READ_HISTORY)
+        chunks: asyncio.Queue[UtecBleHistory | None] = asyncio.Queue()
+        start = self.history_cursor if since is None else since
+        self.add_request(UtecBleRequest(BLECommandCode.ADMIN_LOGIN))
+        self.add_request(
+            UtecBleHistoryRequest(start, count, on_records=chunks.put_nowait)
+        )
+
+        task = asyncio.create_task(self.send_requests())
+        task.add_done_callback(lambda _: chunks.put_nowait(None))
+        try:
+            while (chunk := await chunks.get()) is not None:
+                self.history_cursor = chunk.cursor
+                yield chunk
+            await task
+        finally:
+            if not task.done():
+                task.cancel()
+
+    async def async_read_history(
+        self, since: int | None = None, count: int = HISTORY_BATCH_DEF
+    ) -> UtecBleHistory:
+        """Download history into a single columnar result."""
+        history = UtecBleHistory()
+        async for chunk in self.async_history(since, count):
+            history.extend(chunk)
+        return history
+
+    async def async_read_users(self) -> list[UtecBleUser]:
+        """Read the lock's user table, see async_sync_users on availability."""
+        self._check_command(BLECommandCode.READ_USERS)
+        request = UtecBleUsersRequest()
+        self.add_request(UtecBleRequest(BLECommandCode.ADMIN_LOGIN))
+        self.add_request(request)
+
+        await self.send_requests()
+        return request.users
+
+    async def async_sync_users(
+        self, desired: list[UtecBleUser], prune: bool = True
+    ) -> UtecBleUserDiff:
+        """Bring the lock's user table to `desired` over one connection.
+
+        The table is read, diffed and only the differences are written.
+        Raises UtecBleDeviceError when the table could not be read.
+
+        The user table commands are not confirmed against lock firmware yet,
+        so this raises UtecBleError unless `allow_unconfirmed_commands` is set.
+        """
+        for command in USER_COMMANDS:
+            self._check_command(command)
+        request = UtecBleUsersRequest(desired, prune)
+        self.add_request(UtecBleRequest(BLECommandCode.ADMIN_LOGIN))
+        self.add_request(request)
+
+        await self.send_requests()
+        if request.diff is None:
+            raise self.error(
+                UtecBleDeviceError(
+                    f"User sync on {self.name}({self.mac_uuid}) failed.",
+                    "The user table was not read.",
+                )
+            )
+        if request.diff.failed:
+            raise self.error(
+                UtecBleError(
+                    f"User sync on {self.name}({self.mac_uuid}) incomplete.",
+                    f"{len(request.diff.failed)} writes not confirmed.",
+                )
+            )
+        return request.diff
+
+    def _workmode_requests(self, mode: DeviceLockWorkMode) -> list[UtecBleRequest]:
+        requests = [UtecBleRequest(BLECommandCode.ADMIN_LOGIN)]
+        if self.capabilities.bt264:
+            requests.append(
+                UtecBleRequest(BLECommandCode.SET_LOCK_STATUS, data=bytes([mode.value]))
+            )
+        else:
+            requests.append(
+                UtecBleRequest(BLECommandCode.SET_WORK_MODE, data=bytes([mode.value]))
+            )
+        return requests
+
+    def _autolock_requests(self, seconds: int) -> list[UtecBleRequest]:
+        if not self.capabilities.autolock:
+            return []
+        return [
+            UtecBleRequest(BLECommandCode.ADMIN_LOGIN),
+            UtecBleRequest(
+                BLECommandCode.SET_AUTOLOCK,
+                data=to_byte_array(seconds, 2) + bytes([0]),
+            ),
+        ]
+
+    def _status_requests(self) -> list[UtecBleRequest]:
+        requests = [
+            UtecBleRequest(BLECommandCode.ADMIN_LOGIN),
+            UtecBleRequest(BLECommandCode.LOCK_STATUS),
+        ]
         if not self.capabilities.bt264:
-            self.add_request(UtecBleRequest(BLECommandCode.GET_LOCK_STATUS))
-            self.add_request(UtecBleRequest(BLECommandCode.GET_BATTERY))
-            self.add_request(UtecBleRequest(BLECommandCode.GET_MUTE))
+            requests.append(UtecBleRequest(BLECommandCode.GET_LOCK_STATUS))
+            requests.append(UtecBleRequest(BLECommandCode.GET_BATTERY))
+            requests.append(UtecBleRequest(BLECommandCode.GET_MUTE))
 
         if self.capabilities.autolock:
-            self.add_request(UtecBleRequest(BLECommandCode.GET_AUTOLOCK))
+            requests.append(UtecBleRequest(BLECommandCode.GET_AUTOLOCK))
 
-        # self.add_request(BleRequest(device=self, command=BLECommandCode.READ_TIME))
-        await self.send_requests()
-        self.debug("(%s) %s - Update Successful.", self.mac_uuid, self.name)
+        if self.capabilities.havesn and not self.sn:
+            # static, remembered by the metadata cache once read
+            requests.append(UtecBleRequest(BLECommandCode.GET_SN))
+
+        requests.extend(self._time_requests())
+        return requests
+
+
+class UtecBleBatchResult:
+    def __init__(self, operation: str, requests: list[UtecBleRequest]):
+        self.operation = operation
+        self.requests = requests
+        self.error: Exception | None = None
+
+    @property
+    def success(self) -> bool:
+        if self.error or not self.requests:
+            return False
+        return all(
+            request.sent and request.response.completed and request.response.success
+            for request in self.requests
+            if request.command != BLECommandCode.ADMIN_LOGIN
+        )
+
+    def __repr__(self) -> str:
+        return f"<UtecBleBatchResult {self.operation} success={self.success}>"
+
+
+class UtecBleLockBatch:
+    """Operations queued on a lock and sent together on commit."""
+
+    def __init__(self, device: UtecBleLock, timeout: float | None = None):
+        self.device = device
+        self.timeout = timeout
+        self.results: list[UtecBleBatchResult] = []
+        self.committed = False
+
+    async def __aenter__(self) -> "UtecBleLockBatch":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None and not self.committed:
+            await self.commit()
+
+    def _add(self, operation: str, requests: list[UtecBleRequest]):
+        self.results.append(UtecBleBatchResult(operation, requests))
+        return self
+
+    def unlock(self):
+        return self._add("unlock", [UtecBleRequest(BLECommandCode.UNLOCK)])
+
+    def lock(self):
+        return self._add("lock", [UtecBleRequest(BLECommandCode.BOLT_LOCK)])
+
+    def set_workmode(self, mode: DeviceLockWorkMode):
+        return self._add("set_workmode", self.device._workmode_requests(mode))
+
+    def set_autolock(self, seconds: int):
+        return self._add("set_autolock", self.device._autolock_requests(seconds))
+
+    def update_status(self):
+        return self._add("update_status", self.device._status_requests())
+
+    async def commit(self) -> list[UtecBleBatchResult]:
+        """Send every queued operation over a single connection.
+
+        Never raises for device errors, failures are reported per operation.
+        """
+        self.committed = True
+        for result in self.results:
+            if not result.requests:
+                result.error = UtecBleError(
+                    f"{result.operation} is not supported by {self.device.name}."
+                )
+            for request in result.requests:
+                self.device.add_request(request)
+
+        if any(result.requests for result in self.results):
+            try:
+                await self.device.send_requests(timeout=self.timeout)
+            except Exception as e:
+                for result in self.results:
+                    if not result.error and not result.success:
+                        result.error = e
+
+        return self.results
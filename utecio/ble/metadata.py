@@ -0,0 +1,54 @@
+"""On-disk cache of per-lock attributes that never or rarely change."""
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from ..snapshot import load_snapshot, remove_snapshot, save_snapshot
+
+METADATA_VERSION = 1
+METADATA_FIELDS = ("sn", "wurx_uuid")
+
+
+class UtecBleMetadataStore:
+    """Serial number and wake-up receiver address per lock.
+
+    One json snapshot for all locks, keyed by address, see snapshot.py. It
+    is read once and only rewritten when a value actually changes.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._locks: dict[str, dict[str, Any]] | None = None
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if self._locks is None:
+            snapshot = load_snapshot(self.path, METADATA_VERSION, "lock metadata")
+            self._locks = snapshot.get("locks", {}) if snapshot else {}
+        return self._locks
+
+    def get(self, address: str) -> dict[str, Any]:
+        return self._load().get(address.upper(), {})
+
+    def update(self, address: str, **fields: Any) -> bool:
+        """Merge non-empty `fields` for `address`, return True if anything changed."""
+        entry = self._load().setdefault(address.upper(), {})
+        changed = {
+            key: value
+            for key, value in fields.items()
+            if key in METADATA_FIELDS and value and entry.get(key) != value
+        }
+        if not changed:
+            return False
+
+        entry.update(changed)
+        entry["updated"] = time.time()
+        self._save()
+        return True
+
+    def _save(self) -> None:
+        save_snapshot(self.path, {"version": METADATA_VERSION, "locks": self._locks})
+
+    def clear(self) -> None:
+        remove_snapshot(self.path)
+        self._locks = {}
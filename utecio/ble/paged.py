@@ -0,0 +1,39 @@
+"""Requests answered with a run of frames of packed records.
+
+History and the user table are read this way. Neither exchange is
+documented in this library yet; the layouts in history.py and users.py are
+their working definitions and are what the emulator implements.
+
+Every response frame: header(3) code(1) status(1) more(1) records... crc(1).
+The response ends with the first frame whose more flag is clear, or with a
+frame carrying an error status, which fails the request.
+"""
+from __future__ import annotations
+
+from .device import UtecBleDeviceError, UtecBleRequest, UtecBleResponse
+
+
+class UtecBlePagedRequest(UtecBleRequest):
+    """Request decoding each frame's records as they arrive."""
+
+    paged = True
+
+    def _frame_received(self, response: UtecBleResponse, frame: bytes) -> bool:
+        if len(frame) < 7 or frame[4] != 0:
+            device = self.device
+            response.error = UtecBleDeviceError(
+                f"{self.command.name} refused by {device.name}({device.mac_uuid}).",
+                f"Response frame {frame.hex()}.",
+            )
+            return True
+        self._records_received(frame[6:-1])
+        if frame[5]:
+            return False
+        self._last_frame_received()
+        return True
+
+    def _records_received(self, data: bytes):
+        raise NotImplementedError
+
+    def _last_frame_received(self):
+        """All records are in, e.g. queue follow-up requests."""
@@ -0,0 +1,171 @@
+"""Keep scanning and connecting on one Bluetooth adapter out of each other's way."""
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from .. import logger
+from ..const import SCAN_RESUME_DELAY_DEF
+
+
+class UtecBleScanArbitration:
+    """Scanner and connection bookkeeping of one adapter."""
+
+    def __init__(self, scanner: Any):
+        self.scanner = scanner
+        self.connecting = 0
+        self.paused_since: float | None = None
+        self.paused_time = 0.0
+        self.pauses = 0
+        self.failures = 0
+        self.released = 0.0
+        self.guard = asyncio.Lock()
+        self.resume_task: asyncio.Task | None = None
+
+
+class UtecBleScanCoordinator:
+    """Pause an adapter's scanner while locks connect through it.
+
+    BlueZ connects slowly and drops connection attempts while the same
+    adapter runs an active scan. Register each scanner with `add_scanner`
+    and give the coordinator to the locks (`device.scan_coordinator`): the
+    first connect on an adapter stops its scanner, which is restarted
+    `resume_delay` seconds after the last connect finished, so a burst of
+    connects costs a single pause.
+
+    Scanners are anything with async `start` and `stop`, e.g. BleakScanner.
+    `adapter` is the name the locks use (see UtecBleAdapterBalancer); a
+    scanner added without one serves every adapter that has none of its own.
+    """
+
+    def __init__(self, resume_delay: float = SCAN_RESUME_DELAY_DEF):
+        self.resume_delay = resume_delay
+        self._adapters: dict[str | None, UtecBleScanArbitration] = {}
+
+    def add_scanner(self, scanner: Any, adapter: str | None = None):
+        """Arbitrate `scanner`, which must already be running."""
+        self._adapters[adapter] = UtecBleScanArbitration(scanner)
+
+    def remove_scanner(self, adapter: str | None = None) -> Any:
+        """Stop arbitrating the scanner of `adapter`, return it as it is."""
+        if arbitration := self._adapters.pop(adapter, None):
+            if arbitration.resume_task:
+                arbitration.resume_task.cancel()
+            self._count_pause(arbitration)
+            return arbitration.scanner
+        return None
+
+    def _arbitration(self, adapter: str | None) -> UtecBleScanArbitration | None:
+        return self._adapters.get(adapter) or self._adapters.get(None)
+
+    def paused(self, adapter: str | None = None) -> bool:
+        arbitration = self._arbitration(adapter)
+        return bool(arbitration and arbitration.paused_since is not None)
+
+    async def pause(self, adapter: str | None = None) -> float:
+        """Announce a connect on `adapter`, stopping its scanner if running.
+
+        Returns the seconds spent waiting for the scanner to stop.
+        """
+        if not (arbitration := self._arbitration(adapter)):
+            return 0.0
+
+        arbitration.connecting += 1
+        started = time.monotonic()
+        # a resume in progress holds the guard until the scanner is back
+        async with arbitration.guard:
+            if arbitration.paused_since is None:
+                try:
+                    await arbitration.scanner.stop()
+                except Exception as e:
+                    # connecting with the scanner running beats not connecting
+                    arbitration.failures += 1
+                    logger.debug("Failed to pause scanner (%s): %s", adapter, e)
+                else:
+                    arbitration.paused_since = time.monotonic()
+                    arbitration.pauses += 1
+        return time.monotonic() - started
+
+    def resume(self, adapter: str | None = None):
+        """The connect on `adapter` is done, scanning resumes once all are."""
+        if not (arbitration := self._arbitration(adapter)):
+            return
+
+        arbitration.connecting = max(0, arbitration.connecting - 1)
+        arbitration.released = time.monotonic()
+        if (
+            not arbitration.connecting
+            and arbitration.paused_since is not None
+            and not arbitration.resume_task
+        ):
+            arbitration.resume_task = asyncio.create_task(
+                self._resume(arbitration, adapter)
+            )
+
+    async def _resume(self, arbitration: UtecBleScanArbitration, adapter: str | None):
+        try:
+            # restart the wait whenever another connect finished meanwhile
+            while (
+                wait := arbitration.released + self.resume_delay - time.monotonic()
+            ) > 0:
+                await asyncio.sleep(wait)
+            async with arbitration.guard:
+                if arbitration.connecting or arbitration.paused_since is None:
+                    return
+                try:
+                    await arbitration.scanner.start()
+                except Exception as e:
+                    arbitration.failures += 1
+                    logger.debug("Failed to resume scanner (%s): %s", adapter, e)
+                    return
+                self._count_pause(arbitration)
+        finally:
+            if arbitration.resume_task is asyncio.current_task():
+                arbitration.resume_task = None
+
+    @staticmethod
+    def _count_pause(arbitration: UtecBleScanArbitration):
+        if arbitration.paused_since is not None:
+            arbitration.paused_time += time.monotonic() - arbitration.paused_since
+            arbitration.paused_since = None
+
+    @asynccontextmanager
+    async def connecting(self, adapter: str | None = None) -> AsyncIterator[None]:
+        await self.pause(adapter)
+        try:
+            yield
+        finally:
+            self.resume(adapter)
+
+    def metrics(self) -> dict[str | None, dict[str, Any]]:
+        """Pauses and seconds spent paused per adapter, including a current pause."""
+        now = time.monotonic()
+        return {
+            adapter: {
+                "pauses": arbitration.pauses,
+                "paused_time": arbitration.paused_time
+                + (
+                    now - arbitration.paused_since
+                    if arbitration.paused_since is not None
+                    else 0.0
+                ),
+                "paused": arbitration.paused_since is not None,
+                "connecting": arbitration.connecting,
+                "failures": arbitration.failures,
+            }
+            for adapter, arbitration in self._adapters.items()
+        }
+
+    async def close(self):
+        """Stop arbitrating and restart every paused scanner."""
+        for adapter in list(self._adapters):
+            arbitration = self._adapters[adapter]
+            paused = arbitration.paused_since is not None
+            scanner = self.remove_scanner(adapter)
+            if paused:
+                try:
+                    await scanner.start()
+                except Exception as e:
+                    logger.debug("Failed to resume scanner (%s): %s", adapter, e)
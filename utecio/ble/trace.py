@@ -0,0 +1,221 @@
+"""Record BLE sessions to a compact binary trace and replay them offline.
+
+A trace starts with TRACE_MAGIC followed by records, each a 12 byte
+header (see TRACE_RECORD) and its payload:
+
+    timestamp       float64  seconds since the trace was opened
+    kind            uint8    one of the TRACE_* kinds below
+    characteristic  uint8    index into TRACE_CHARACTERISTICS, 0 for none
+    length          uint16   payload length
+
+The ECC private key never leaves the process, only the session key it
+produced is recorded. A trace holds keys and user credentials, treat it
+like a password file.
+"""
+from __future__ import annotations
+
+import os
+import struct
+import time
+from collections.abc import Iterator
+from typing import BinaryIO
+
+from Crypto.Cipher import AES
+
+from ..enums import BLECommandCode, DeviceKeyUUID, DeviceServiceUUID
+from .crypto import md5_key
+from .device import UtecBleDevice, UtecBleRequest, UtecBleResponse
+from .frames import UtecBleFrameReader
+
+TRACE_MAGIC = b"UTECTRC1"
+TRACE_RECORD = struct.Struct("<dBBH")
+
+TRACE_CONNECT = 1  # payload: device address
+TRACE_DISCONNECT = 2
+TRACE_GATT_READ = 3  # payload: value read
+TRACE_GATT_WRITE = 4  # payload: value written, encrypted for DATA
+TRACE_NOTIFY = 5  # payload: raw notification, encrypted for DATA
+TRACE_KEY = 6  # payload: session key
+TRACE_REQUEST = 7  # payload: plain request frame
+TRACE_FRAME = 8  # payload: decrypted and CRC checked response frame
+
+TRACE_CHARACTERISTICS = [
+    None,
+    DeviceServiceUUID.DATA.value,
+    DeviceKeyUUID.STATIC.value,
+    DeviceKeyUUID.MD5.value,
+    DeviceKeyUUID.ECC.value,
+]
+_CHARACTERISTIC_INDEX = {uuid: i for i, uuid in enumerate(TRACE_CHARACTERISTICS)}
+
+
+class UtecBleTraceRecorder:
+    """Writes trace records for a single device.
+
+    Opt in per device: device.recorder = UtecBleTraceRecorder("lock.trace")
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records = 0
+        # readable by the owner only, also when overwriting an older trace
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.chmod(path, 0o600)
+        self._file: BinaryIO = open(fd, "wb")
+        self._file.write(TRACE_MAGIC)
+        self._started = time.monotonic()
+
+    def __enter__(self) -> "UtecBleTraceRecorder":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def record(self, kind: int, data: bytes = b"", characteristic: str | None = None):
+        if self._file.closed:
+            return
+        data = bytes(data)[:0xFFFF]
+        self._file.write(
+            TRACE_RECORD.pack(
+                time.monotonic() - self._started,
+                kind,
+                _CHARACTERISTIC_INDEX.get(characteristic, 0),
+                len(data),
+            )
+        )
+        self._file.write(data)
+        self.records += 1
+
+    def connect(self, address: str):
+        self.record(TRACE_CONNECT, address.encode())
+
+    def disconnect(self):
+        self.record(TRACE_DISCONNECT)
+
+    def gatt_read(self, characteristic: str, data: bytes):
+        self.record(TRACE_GATT_READ, data, characteristic)
+
+    def gatt_write(self, characteristic: str, data: bytes):
+        self.record(TRACE_GATT_WRITE, data, characteristic)
+
+    def notify(self, characteristic: str, data: bytes):
+        self.record(TRACE_NOTIFY, data, characteristic)
+
+    def key(self, key: bytes):
+        self.record(TRACE_KEY, key)
+
+    def request(self, package: bytes):
+        self.record(TRACE_REQUEST, package)
+
+    def frame(self, frame: bytes):
+        self.record(TRACE_FRAME, frame)
+
+    def close(self):
+        self._file.close()
+
+
+class UtecBleTraceReplayer:
+    """Reads a trace and feeds it back through the decoding stack."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def records(self) -> Iterator[tuple[float, int, str | None, bytes]]:
+        """Iterate (timestamp, kind, characteristic, payload)."""
+        with open(self.path, "rb") as f:
+            data = f.read()
+        if not data.startswith(TRACE_MAGIC):
+            raise ValueError(f"{self.path} is not a utecio trace.")
+
+        view = memoryview(data)
+        pos = len(TRACE_MAGIC)
+        while pos + TRACE_RECORD.size <= len(data):
+            timestamp, kind, characteristic, length = TRACE_RECORD.unpack_from(
+                data, pos
+            )
+            pos += TRACE_RECORD.size
+            yield timestamp, kind, TRACE_CHARACTERISTICS[characteristic], bytes(
+                view[pos : pos + length]
+            )
+            pos += length
+
+    def replay(self, device: UtecBleDevice | None = None) -> dict[str, float]:
+        """Decode every recorded session at full speed.
+
+        Requests are rebuilt from their plain frames and re-encrypted,
+        notifications are decrypted, reassembled and parsed into `device`
+        (a throwaway device by default), so its state ends up as it was
+        on the recorded device. Returns counters and the elapsed time;
+        any mismatch against the recorded output points at a decoding or
+        crypto regression.
+        """
+        device = device or UtecBleDevice("", "", "", "Replay")
+        stats = {
+            "records": 0,
+            "requests": 0,
+            "notifications": 0,
+            "frames": 0,
+            "recorded_frames": 0,
+            "write_mismatches": 0,
+            "key_mismatches": 0,
+        }
+        derived_key = None
+        request: UtecBleRequest | None = None
+
+        started = time.perf_counter()
+        for _, kind, characteristic, data in self.records():
+            stats["records"] += 1
+            if kind == TRACE_CONNECT:
+                device.mac_uuid = data.decode(errors="replace")
+            elif kind == TRACE_GATT_READ:
+                if characteristic == DeviceKeyUUID.MD5.value:
+                    derived_key = md5_key(data)
+                elif characteristic == DeviceKeyUUID.STATIC.value:
+                    derived_key = b"Anviz.ut" + data
+            elif kind == TRACE_KEY:
+                if derived_key is not None and derived_key != data:
+                    stats["key_mismatches"] += 1
+                derived_key = None
+                device._session_key = data
+                device._reader = UtecBleFrameReader()
+            elif kind == TRACE_REQUEST:
+                stats["requests"] += 1
+                request = self._request(device, data)
+            elif kind == TRACE_GATT_WRITE and characteristic == DeviceServiceUUID.DATA.value:
+                if request and request.encrypted_package(device._session_key) != data:
+                    stats["write_mismatches"] += 1
+            elif kind == TRACE_NOTIFY and characteristic == DeviceServiceUUID.DATA.value:
+                stats["notifications"] += 1
+                cipher = AES.new(device._session_key, AES.MODE_CBC, bytes(16))
+                for frame in device._reader.feed(cipher.decrypt(data)):
+                    stats["frames"] += 1
+                    device._dispatch_frame(frame)
+            elif kind == TRACE_FRAME:
+                stats["recorded_frames"] += 1
+            elif kind == TRACE_DISCONNECT:
+                device._pending = request = None
+                device._reader = None
+        stats["elapsed"] = time.perf_counter() - started
+
+        # replies may have queued follow-ups, nothing is sent during replay
+        device._requests.clear()
+        device._pending = None
+        device._reader = None
+        return stats
+
+    @staticmethod
+    def _request(device: UtecBleDevice, package: bytes) -> UtecBleRequest | None:
+        try:
+            command = BLECommandCode(package[3])
+        except (IndexError, ValueError):
+            device._pending = None
+            return None
+
+        # the frame body (auth and data) goes back in as data, which
+        # rebuilds the same frame
+        request = UtecBleRequest(command, device, data=package[4:-1])
+        request.aes_key = device._session_key
+        request.sent = True
+        request.response = UtecBleResponse(request, device)
+        device._pending = request
+        return request
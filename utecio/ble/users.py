@@ -0,0 +1,209 @@
+"""User code management and diff-based provisioning.
+
+None of these exchanges is confirmed against lock firmware yet, devices
+refuse them unless `allow_unconfirmed_commands` is set, see
+UNCONFIRMED_COMMANDS. The diff engine itself does not touch the wire.
+
+READ_USERS, no data. The response is paged, see paged.py.
+ADD_USER, data: one record, adds the user or overwrites the same id.
+DELETE_USER, data: user id (uint16 BE).
+
+Every record is 12 bytes, big-endian: user id (uint16), user type
+(uint8), code length (uint8), code digits (8 bytes ASCII, zero padded).
+"""
+from __future__ import annotations
+
+import asyncio
+import struct
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+from ..enums import BLECommandCode
+from .device import UtecBleRequest
+from .paged import UtecBlePagedRequest
+
+if TYPE_CHECKING:
+    from .lock import UtecBleLock
+
+USER_RECORD = struct.Struct(">HBB8s")
+USER_TYPE_ADMIN = 0
+USER_TYPE_NORMAL = 1
+USER_COMMANDS = (
+    BLECommandCode.READ_USERS,
+    BLECommandCode.ADD_USER,
+    BLECommandCode.DELETE_USER,
+)
+
+
+class UtecBleUser:
+    """A user slot of a lock.
+
+    Codes are checked for being writable unless `validate` is off, which is
+    how records read back from a lock are built as they may hold slots
+    without a PIN.
+    """
+
+    def __init__(
+        self,
+        user_id: int,
+        code: str,
+        user_type: int = USER_TYPE_NORMAL,
+        validate: bool = True,
+    ):
+        if validate and (not code.isdigit() or len(code) > 8):
+            raise ValueError(f"User code must be up to 8 digits, got {code!r}.")
+        self.user_id = user_id
+        self.code = code
+        self.user_type = user_type
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, UtecBleUser) and (
+            self.user_id,
+            self.code,
+            self.user_type,
+        ) == (other.user_id, other.code, other.user_type)
+
+    def __repr__(self) -> str:
+        return f"<UtecBleUser {self.user_id} type={self.user_type}>"
+
+    def pack(self) -> bytes:
+        return USER_RECORD.pack(
+            self.user_id, self.user_type, len(self.code), self.code.encode("ascii")
+        )
+
+    @classmethod
+    def decode_many(cls, data: bytes) -> list["UtecBleUser"]:
+        usable = len(data) - len(data) % USER_RECORD.size
+        return [
+            cls(
+                user_id,
+                code[:length].decode("ascii", "replace"),
+                user_type,
+                validate=False,
+            )
+            for user_id, user_type, length, code in USER_RECORD.iter_unpack(
+                memoryview(data)[:usable]
+            )
+        ]
+
+
+class UtecBleUserDiff:
+    """Changes needed to bring a lock's user table to the desired state."""
+
+    def __init__(
+        self,
+        add: list[UtecBleUser],
+        update: list[UtecBleUser],
+        delete: list[int],
+    ):
+        self.add = add
+        self.update = update
+        self.delete = delete
+        self.requests: list[UtecBleRequest] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.add or self.update or self.delete)
+
+    def __repr__(self) -> str:
+        return (
+            f"<UtecBleUserDiff add={len(self.add)} update={len(self.update)} "
+            f"delete={len(self.delete)}>"
+        )
+
+    @property
+    def failed(self) -> list[UtecBleRequest]:
+        """Write requests the lock did not confirm."""
+        return [
+            request
+            for request in self.requests
+            if not (request.sent and request.response.success)
+        ]
+
+    def write_requests(self) -> list[UtecBleRequest]:
+        self.requests = [
+            UtecBleRequest(BLECommandCode.DELETE_USER, data=user_id.to_bytes(2, "big"))
+            for user_id in self.delete
+        ] + [
+            UtecBleRequest(BLECommandCode.ADD_USER, data=user.pack())
+            for user in self.add + self.update
+        ]
+        return self.requests
+
+
+def diff_users(
+    current: Iterable[UtecBleUser],
+    desired: Iterable[UtecBleUser],
+    prune: bool = True,
+) -> UtecBleUserDiff:
+    """Minimal set of writes turning `current` into `desired`.
+
+    Admin users are never deleted. With `prune` off, users missing from
+    `desired` are left alone.
+    """
+    existing = {user.user_id: user for user in current}
+    wanted = {user.user_id: user for user in desired}
+
+    add = [user for user_id, user in wanted.items() if user_id not in existing]
+    update = [
+        user
+        for user_id, user in wanted.items()
+        if user_id in existing and existing[user_id] != user
+    ]
+    delete = (
+        [
+            user_id
+            for user_id, user in existing.items()
+            if user_id not in wanted and user.user_type != USER_TYPE_ADMIN
+        ]
+        if prune
+        else []
+    )
+    return UtecBleUserDiff(add, update, delete)
+
+
+class UtecBleUsersRequest(UtecBlePagedRequest):
+    """READ_USERS request, optionally queueing a sync once the table is read."""
+
+    def __init__(
+        self, desired: list[UtecBleUser] | None = None, prune: bool = True
+    ):
+        super().__init__(BLECommandCode.READ_USERS)
+        self.users: list[UtecBleUser] = []
+        self.desired = desired
+        self.prune = prune
+        self.diff: UtecBleUserDiff | None = None
+
+    def _records_received(self, data: bytes):
+        self.users.extend(UtecBleUser.decode_many(data))
+
+    def _last_frame_received(self):
+        if self.desired is not None and self.device:
+            self.diff = diff_users(self.users, self.desired, self.prune)
+            if self.diff:
+                self.device.add_request(UtecBleRequest(BLECommandCode.ADMIN_LOGIN))
+                for request in self.diff.write_requests():
+                    self.device.add_request(request)
+
+
+async def provision_fleet(
+    locks: Iterable["UtecBleLock"],
+    desired: list[UtecBleUser],
+    prune: bool = True,
+    concurrency: int = 4,
+) -> dict[str, UtecBleUserDiff | Exception]:
+    """Sync every lock to `desired`, at most `concurrency` locks at a time.
+
+    Returns the applied diff, or the error, per lock address.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results: dict[str, UtecBleUserDiff | Exception] = {}
+
+    async def provision(lock: "UtecBleLock"):
+        async with semaphore:
+            try:
+                results[lock.mac_uuid] = await lock.async_sync_users(desired, prune)
+            except Exception as e:
+                results[lock.mac_uuid] = e
+
+    await asyncio.gather(*(provision(lock) for lock in locks))
+    return results
@@ -0,0 +1,300 @@
+"""Command line interface, run as `python -m utecio`.
+
+Credentials come from --email/--password, then the UTECIO_EMAIL and
+UTECIO_PASSWORD environment variables, then a json config file
+(--config, default ~/.config/utecio.json) with "email", "password" and
+optionally "inventory" and "metadata" paths. Every command prints json to stdout.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import Any
+
+from . import logger
+from .enums import DeviceKeyUUID
+from .fleet import lock_state
+
+CONFIG_PATH_DEF = os.path.join("~", ".config", "utecio.json")
+INVENTORY_PATH_DEF = os.path.join("~", ".cache", "utecio", "inventory.json")
+METADATA_PATH_DEF = os.path.join("~", ".cache", "utecio", "metadata.json")
+
+
+class UtecCliError(Exception):
+    """Invalid command line usage or configuration."""
+
+
+def load_config(args: argparse.Namespace) -> dict[str, Any]:
+    config: dict[str, Any] = {}
+    path = os.path.expanduser(args.config or CONFIG_PATH_DEF)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        if args.config:
+            raise UtecCliError(f"Config file {path} not found.") from None
+    except ValueError as e:
+        raise UtecCliError(f"Config file {path} is not valid json: {e}") from None
+
+    config["email"] = args.email or os.environ.get("UTECIO_EMAIL") or config.get("email")
+    config["password"] = (
+        args.password or os.environ.get("UTECIO_PASSWORD") or config.get("password")
+    )
+    config["inventory"] = os.path.expanduser(
+        args.inventory
+        or os.environ.get("UTECIO_INVENTORY")
+        or config.get("inventory")
+        or INVENTORY_PATH_DEF
+    )
+    config["metadata"] = os.path.expanduser(config.get("metadata") or METADATA_PATH_DEF)
+    return config
+
+
+def _client(config: dict[str, Any]):
+    from .api import UtecClient
+    from .inventory import UtecInventoryStore
+
+    if not config["email"] or not config["password"]:
+        raise UtecCliError(
+            "No credentials, use --email/--password, UTECIO_EMAIL/UTECIO_PASSWORD "
+            "or a config file."
+        )
+    os.makedirs(os.path.dirname(config["inventory"]) or ".", exist_ok=True)
+    return UtecClient(
+        config["email"],
+        config["password"],
+        inventory=UtecInventoryStore(config["inventory"]),
+    )
+
+
+async def _locks(args: argparse.Namespace, config: dict[str, Any]) -> list:
+    """Locks selected by --name, from the inventory unless --sync is given."""
+    from bleak import BleakScanner
+
+    from .inventory import UtecInventoryStore
+    from .ble.lock import UtecBleLock
+    from .ble.metadata import UtecBleMetadataStore
+
+    devices = [] if args.sync else UtecInventoryStore(config["inventory"]).load()
+    if devices:
+        locks = UtecBleLock.from_json_list(devices, capabilities=("bluetooth",))
+    else:
+        client = _client(config)
+        try:
+            locks = await client.get_ble_devices(sync=True)
+        finally:
+            if client.session:
+                await client.session.close()
+
+    if args.name:
+        locks = [lock for lock in locks if lock.name in args.name]
+        missing = set(args.name) - {lock.name for lock in locks}
+        if missing:
+            raise UtecCliError(f"Unknown lock(s): {', '.join(sorted(missing))}.")
+
+    os.makedirs(os.path.dirname(config["metadata"]) or ".", exist_ok=True)
+    metadata = UtecBleMetadataStore(config["metadata"])
+    for lock in locks:
+        lock.async_bledevice_callback = BleakScanner.find_device_by_address
+        lock.metadata = metadata
+    return locks
+
+
+async def _run_all(locks: list, operation, concurrency: int) -> list[dict[str, Any]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(lock):
+        async with semaphore:
+            try:
+                await operation(lock)
+            except Exception as e:
+                return lock_state(lock, e)
+            return lock_state(lock)
+
+    return await asyncio.gather(*(run(lock) for lock in locks))
+
+
+async def cmd_sync(args: argparse.Namespace, config: dict[str, Any]) -> Any:
+    from .inventory import compact_device
+
+    client = _client(config)
+    try:
+        await client.sync_devices()
+    finally:
+        if client.session:
+            await client.session.close()
+    # the inventory file keeps the credentials, stdout does not
+    return [
+        {key: value for key, value in compact_device(device).items() if key != "user"}
+        for device in client.devices
+    ]
+
+
+async def cmd_status(args: argparse.Namespace, config: dict[str, Any]) -> Any:
+    locks = await _locks(args, config)
+    return await _run_all(
+        locks, lambda lock: lock.async_update_status(), args.concurrency
+    )
+
+
+async def cmd_lock(args: argparse.Namespace, config: dict[str, Any]) -> Any:
+    if not args.name and not args.all:
+        raise UtecCliError("Select locks with --name or pass --all.")
+    locks = await _locks(args, config)
+
+    async def operate(lock):
+        async with lock.batch(timeout=args.timeout) as batch:
+            if args.command == "unlock":
+                batch.unlock()
+            else:
+                batch.lock()
+            batch.update_status()
+        for result in batch.results:
+            if not result.success:
+                raise result.error or RuntimeError(f"{result.operation} failed.")
+
+    return await _run_all(locks, operate, args.concurrency)
+
+
+async def cmd_bench(args: argparse.Namespace, config: dict[str, Any]) -> Any:
+    from .bench import emulated_fleet, run_benchmark
+    from .ble.scanning import UtecBleScanCoordinator
+
+    if not args.emulated:
+        locks = await _locks(args, config)
+        return await run_benchmark(
+            locks, args.operation, iterations=args.iterations, concurrency=args.concurrency
+        )
+
+    bluetooth, locks = emulated_fleet(
+        args.emulated,
+        DeviceKeyUUID[args.key_mechanism],
+        scan_latency=args.scan_latency,
+        latency=args.latency,
+        connect_latency=args.connect_latency,
+        discovery_latency=args.discovery_latency,
+    )
+    if not args.scan:
+        return await run_benchmark(
+            locks, args.operation, iterations=args.iterations, concurrency=args.concurrency
+        )
+
+    scanner = bluetooth.scanner()
+    await scanner.start()
+    coordinator = None
+    if args.scan == "arbitrated":
+        coordinator = UtecBleScanCoordinator()
+        coordinator.add_scanner(scanner)
+        for lock in locks:
+            lock.scan_coordinator = coordinator
+    try:
+        return await run_benchmark(
+            locks, args.operation, iterations=args.iterations, concurrency=args.concurrency
+        )
+    finally:
+        if coordinator:
+            await coordinator.close()
+        await scanner.stop()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m utecio", description="Ultraloq fleet operations."
+    )
+    parser.add_argument("--config", help=f"json config file (default {CONFIG_PATH_DEF})")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--inventory", help=f"inventory file (default {INVENTORY_PATH_DEF})")
+    parser.add_argument("--debug", action="store_true", help="log debug output to stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("sync", help="sync the device inventory from the cloud")
+
+    def lock_selection(command: argparse.ArgumentParser):
+        command.add_argument(
+            "--name", action="append", help="lock name, may be repeated (default all)"
+        )
+        command.add_argument(
+            "--sync", action="store_true", help="sync from the cloud first"
+        )
+        command.add_argument("--concurrency", type=int, default=4)
+
+    status = commands.add_parser("status", help="read the status of locks")
+    lock_selection(status)
+
+    for name in ("lock", "unlock"):
+        command = commands.add_parser(name, help=f"{name} locks and read their status")
+        lock_selection(command)
+        command.add_argument("--all", action="store_true", help="operate every lock")
+        command.add_argument("--timeout", type=float, help="deadline per lock in seconds")
+
+    bench = commands.add_parser("bench", help="measure operation latency")
+    lock_selection(bench)
+    bench.add_argument(
+        "--emulated", type=int, metavar="COUNT", help="use COUNT emulated locks"
+    )
+    bench.add_argument(
+        "--key-mechanism",
+        choices=[key.name for key in DeviceKeyUUID],
+        default=DeviceKeyUUID.STATIC.name,
+        help="key exchange of emulated locks",
+    )
+    bench.add_argument("--latency", type=float, default=0.0, help="emulated GATT latency")
+    bench.add_argument(
+        "--connect-latency", type=float, default=0.0, help="emulated connect latency"
+    )
+    bench.add_argument(
+        "--discovery-latency",
+        type=float,
+        default=0.0,
+        help="emulated service discovery latency, paid on uncached connects",
+    )
+    bench.add_argument(
+        "--scan",
+        choices=["free", "arbitrated"],
+        help="run an emulated scanner during the benchmark, paused on connects "
+        "when arbitrated",
+    )
+    bench.add_argument(
+        "--scan-latency",
+        type=float,
+        default=0.0,
+        help="extra emulated connect latency while scanning",
+    )
+    bench.add_argument("--operation", choices=["status", "unlock", "lock"], default="status")
+    bench.add_argument("--iterations", type=int, default=10)
+    return parser
+
+
+COMMANDS = {
+    "sync": cmd_sync,
+    "status": cmd_status,
+    "lock": cmd_lock,
+    "unlock": cmd_lock,
+    "bench": cmd_bench,
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.debug:
+        logger.setLevel(10)
+
+    try:
+        config = load_config(args)
+        result = asyncio.run(COMMANDS[args.command](args, config))
+    except UtecCliError as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        return 2
+    except Exception as e:
+        print(json.dumps({"error": str(e) or type(e).__name__}), file=sys.stderr)
+        return 1
+
+    json.dump(result, sys.stdout, indent=2, default=str)
+    sys.stdout.write("\n")
+    if isinstance(result, list) and any("error" in item for item in result):
+        return 1
+    return 0
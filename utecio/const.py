@@ -6,4 +6,23 @@ CRC8Table = [0, 94, 188, 226, 97, 63, 221, 131, 194, 156, 126, 32, 163, 253, 31,
 UL1_BT = "Ultraloq UL-1"
 Latch5_NFC = "Latch-5-NFC"
 BLE_RETRY_DELAY_DEF = 1.5
-BLE_RETRY_MAX_DEF = 4
\ No newline at end of file
+BLE_RETRY_MAX_DEF = 4
+BLE_COMMAND_TIMEOUT_DEF = 5.0
+BLE_KEY_TIMEOUT_DEF = 10.0
+BLE_DISCONNECT_TIMEOUT_DEF = 5.0
+FRAME_CACHE_SIZE = 64
+FRAME_READER_CAPACITY = 4096
+HISTORY_BATCH_DEF = 500
+TIME_SYNC_THRESHOLD_DEF = 30.0
+TIME_SYNC_INTERVAL_DEF = 24 * 60 * 60.0
+CLOCK_DRIFT_BASELINE_DEF = 6 * 60 * 60.0
+CLOCK_DRIFT_MAX_PPM = 100
+CLOCK_RESOLUTION = 1.0
+CRYPTO_OFFLOAD_MIN_DEF = 1024
+API_CONCURRENCY_DEF = 4
+API_CONCURRENCY_MAX_DEF = 32
+API_RETRY_MAX_DEF = 4
+API_RETRY_BASE_DEF = 0.5
+API_RETRY_CAP_DEF = 30.0
+PREPARE_WINDOW_DEF = 10.0
+SCAN_RESUME_DELAY_DEF = 0.5
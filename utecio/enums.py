@@ -56,6 +56,10 @@ class BLECommandCode(Enum):
     ADMIN_LOGIN = 32
     READ_TIME = 65
     WRITE_TIME = 66
+    READ_HISTORY = 72  # provisional, see ble/history.py
+    READ_USERS = 73  # provisional, see ble/users.py
+    ADD_USER = 74  # provisional, see ble/users.py
+    DELETE_USER = 75  # provisional, see ble/users.py
 
 
 class BleResponseCode(Enum):
@@ -74,6 +78,10 @@ class BleResponseCode(Enum):
     ADMIN_LOGIN = 160
     READ_TIME = 193
     WRITE_TIME = 194
+    READ_HISTORY = 200
+    READ_USERS = 201
+    ADD_USER = 202
+    DELETE_USER = 203
 
 
 class DeviceServiceUUID(Enum):
@@ -90,3 +98,9 @@ class DeviceKeyUUID(Enum):
 class BleRequestSchedule(Enum):
     IMMEDIATE = 0
     NEXT_RUN = 1
+
+
+class BleCircuitState(Enum):
+    CLOSED = 0
+    OPEN = 1
+    HALF_OPEN = 2
@@ -0,0 +1,375 @@
+"""Run a large fleet of locks across several worker processes.
+
+Each worker owns a shard of the locks and its own event loop, so key
+exchange math and frame crypto for different shards run on different
+cores. The supervisor routes commands to the owning shard over
+multiprocessing queues and merges everything the workers report into one
+event stream.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import zlib
+from collections.abc import AsyncIterator, Callable, Iterable
+from typing import Any
+
+from . import logger
+from .ble.lock import UtecBleLock
+
+FLEET_OPERATIONS = {
+    "status": "async_update_status",
+    "unlock": "async_unlock",
+    "lock": "async_lock",
+    "reboot": "async_reboot",
+    "set_workmode": "async_set_workmode",
+    "set_autolock": "async_set_autolock",
+    "sync_time": "async_sync_time",
+}
+
+
+class UtecFleetError(Exception):
+    """A fleet command could not be routed or failed in its worker."""
+
+
+def lock_state(lock: UtecBleLock, error: Exception | None = None) -> dict[str, Any]:
+    """Json friendly snapshot of a lock's last known state."""
+    state = {
+        "name": lock.name,
+        "address": lock.mac_uuid,
+        "model": lock.model,
+    }
+    if error:
+        state["error"] = str(error) or type(error).__name__
+        return state
+
+    state.update(
+        {
+            "lock_status": lock.lock_status,
+            "bolt_status": lock.bolt_status,
+            "lock_mode": lock.lock_mode,
+            "battery": lock.battery,
+            "autolock_time": lock.autolock_time,
+            "mute": lock.mute,
+        }
+    )
+    return state
+
+
+def shard_by_hash(device: dict[str, Any], shards: int) -> int:
+    """Stable shard for an API device entry, from its address."""
+    return zlib.crc32(device["uuid"].upper().encode()) % shards
+
+
+def bluetooth_locks(devices: list[dict[str, Any]]) -> list[UtecBleLock]:
+    """Default worker factory: Bluetooth locks found with a BleakScanner."""
+    from bleak import BleakScanner
+
+    locks = UtecBleLock.from_json_list(devices, capabilities=("bluetooth",))
+    for lock in locks:
+        lock.async_bledevice_callback = BleakScanner.find_device_by_address
+    return locks
+
+
+def _worker(
+    shard: int,
+    devices: list[dict[str, Any]],
+    factory: Callable[[list[dict[str, Any]]], list[UtecBleLock]],
+    commands: multiprocessing.Queue,
+    events: multiprocessing.Queue,
+    poll_interval: float | None,
+):
+    try:
+        asyncio.run(_serve(shard, devices, factory, commands, events, poll_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _serve(shard, devices, factory, commands, events, poll_interval):
+    loop = asyncio.get_running_loop()
+    locks = {lock.mac_uuid.upper(): lock for lock in factory(devices)}
+    guards = {address: asyncio.Lock() for address in locks}
+    tasks: set[asyncio.Task] = set()
+
+    def emit(kind: str, address: str, state: dict[str, Any], command_id=None):
+        events.put(
+            {
+                "type": kind,
+                "shard": shard,
+                "id": command_id,
+                "address": address,
+                "state": state,
+            }
+        )
+
+    async def run(command_id, address: str, operation: str, args: tuple):
+        lock = locks.get(address)
+        if lock is None or operation not in FLEET_OPERATIONS:
+            emit(
+                "error",
+                address,
+                {"error": f"Unknown lock or operation {address} {operation}."},
+                command_id,
+            )
+            return
+        async with guards[address]:
+            try:
+                await getattr(lock, FLEET_OPERATIONS[operation])(*args)
+            except Exception as e:
+                emit("error", address, lock_state(lock, e), command_id)
+            else:
+                emit("result", address, lock_state(lock), command_id)
+
+    async def poll():
+        while True:
+            await asyncio.sleep(poll_interval)
+            for address, lock in locks.items():
+                if guards[address].locked():
+                    continue
+                async with guards[address]:
+                    try:
+                        await lock.async_update_status()
+                    except Exception as e:
+                        emit("status", address, lock_state(lock, e))
+                    else:
+                        emit("status", address, lock_state(lock))
+
+    if poll_interval:
+        tasks.add(asyncio.create_task(poll()))
+    events.put({"type": "ready", "shard": shard, "locks": list(locks)})
+
+    while (command := await loop.run_in_executor(None, commands.get)) is not None:
+        task = asyncio.create_task(run(*command))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class UtecFleetRunner:
+    """Supervisor for locks sharded over worker processes.
+
+    devices: API device entries (see inventory.compact_device), sent to the
+    workers as they are.
+    shard_key: maps a device entry to a shard, e.g. by the adapter that
+    serves it; by default a stable hash of the address.
+    factory: builds the locks of a shard inside its worker. It must be a
+    module level function as workers are spawned, not forked.
+    poll_interval: when set, workers refresh every lock's status this often
+    and report it as "status" events.
+
+    If a worker dies, its pending and later commands fail with
+    UtecFleetError and an "exit" event is emitted.
+
+    async with UtecFleetRunner(devices) as fleet:
+        state = await fleet.command(address, "unlock")
+        async for event in fleet.events():
+            ...
+    """
+
+    def __init__(
+        self,
+        devices: Iterable[dict[str, Any]],
+        shards: int | None = None,
+        shard_key: Callable[[dict[str, Any], int], int] = shard_by_hash,
+        factory: Callable[[list[dict[str, Any]]], list[UtecBleLock]] = bluetooth_locks,
+        poll_interval: float | None = None,
+    ):
+        self.shards = shards or os.cpu_count() or 1
+        self.factory = factory
+        self.poll_interval = poll_interval
+        self.assignment: dict[str, int] = {}
+        self._devices: list[list[dict[str, Any]]] = [[] for _ in range(self.shards)]
+        for device in devices:
+            shard = shard_key(device, self.shards) % self.shards
+            self._devices[shard].append(device)
+            self.assignment[device["uuid"].upper()] = shard
+
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: list[multiprocessing.Process] = []
+        self._commands: list[multiprocessing.Queue] = []
+        self._events: multiprocessing.Queue | None = None
+        self._reader: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._stream: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
+        self._pending: dict[int, asyncio.Future] = {}
+        self._pending_shard: dict[int, int] = {}
+        self._dead: dict[int, int | None] = {}
+        self._watcher: threading.Thread | None = None
+        self._stopping = False
+        self._ids = itertools.count()
+        self._ready: asyncio.Event = asyncio.Event()
+        self._ready_shards = 0
+        self._listeners = 0
+
+    async def __aenter__(self) -> "UtecFleetRunner":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def start(self, timeout: float = 60.0):
+        """Spawn the workers and wait until every shard has built its locks."""
+        self._loop = asyncio.get_running_loop()
+        self._events = self._context.Queue()
+        for shard in range(self.shards):
+            commands = self._context.Queue()
+            process = self._context.Process(
+                target=_worker,
+                args=(
+                    shard,
+                    self._devices[shard],
+                    self.factory,
+                    commands,
+                    self._events,
+                    self.poll_interval,
+                ),
+                name=f"utecio-shard-{shard}",
+                daemon=True,
+            )
+            process.start()
+            self._commands.append(commands)
+            self._processes.append(process)
+
+        self._reader = threading.Thread(
+            target=self._read_events, name="utecio-fleet-events", daemon=True
+        )
+        self._reader.start()
+        self._watcher = threading.Thread(
+            target=self._watch_workers,
+            args=(list(self._processes),),
+            name="utecio-fleet-watchdog",
+            daemon=True,
+        )
+        self._watcher.start()
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        if self._ready_shards < self.shards:
+            await self.stop()
+            raise UtecFleetError(
+                f"Only {self._ready_shards} of {self.shards} shards started."
+            )
+
+    async def stop(self):
+        self._stopping = True
+        for commands in self._commands:
+            commands.put(None)
+        for process in self._processes:
+            await self._loop.run_in_executor(None, process.join, 5)
+            if process.is_alive():
+                process.terminate()
+        if self._events:
+            self._events.put(None)
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(UtecFleetError("Fleet stopped."))
+        self._pending.clear()
+        self._pending_shard.clear()
+        self._processes.clear()
+        self._commands.clear()
+        self._stream.put_nowait(None)
+
+    async def command(
+        self, address: str, operation: str, *args: Any, timeout: float | None = None
+    ) -> dict[str, Any]:
+        """Run `operation` on a lock in its shard and return its new state."""
+        address = address.upper()
+        if (shard := self.assignment.get(address)) is None:
+            raise UtecFleetError(f"Lock {address} is not part of this fleet.")
+        if shard in self._dead:
+            raise UtecFleetError(
+                f"Shard {shard} of lock {address} exited ({self._dead[shard]})."
+            )
+        if operation not in FLEET_OPERATIONS:
+            raise UtecFleetError(f"Unknown fleet operation {operation}.")
+
+        command_id = next(self._ids)
+        future = self._loop.create_future()
+        self._pending[command_id] = future
+        self._pending_shard[command_id] = shard
+        self._commands[shard].put((command_id, address, operation, args))
+        try:
+            event = await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(command_id, None)
+            self._pending_shard.pop(command_id, None)
+
+        if event["type"] == "error":
+            raise UtecFleetError(event["state"].get("error"))
+        return event["state"]
+
+    async def events(self) -> AsyncIterator[dict[str, Any]]:
+        """Merged event stream of every shard, ends when the fleet stops.
+
+        Events are only buffered while at least one consumer is iterating.
+        """
+        self._listeners += 1
+        try:
+            while (event := await self._stream.get()) is not None:
+                yield event
+        finally:
+            self._listeners -= 1
+
+    def _read_events(self):
+        while (event := self._events.get()) is not None:
+            self._loop.call_soon_threadsafe(self._on_event, event)
+
+    def _watch_workers(self, processes: list[multiprocessing.Process]):
+        sentinels = {process.sentinel: shard for shard, process in enumerate(processes)}
+        while sentinels:
+            for sentinel in multiprocessing.connection.wait(list(sentinels)):
+                shard = sentinels.pop(sentinel)
+                processes[shard].join(1)  # reap it so exitcode is set
+                try:
+                    self._loop.call_soon_threadsafe(
+                        self._on_worker_exit, shard, processes[shard].exitcode
+                    )
+                except RuntimeError:  # loop already closed
+                    return
+
+    def _on_worker_exit(self, shard: int, exitcode: int | None):
+        if self._stopping:
+            return
+        logger.warning("Fleet shard %s exited with code %s.", shard, exitcode)
+        self._dead[shard] = exitcode
+        error = UtecFleetError(f"Shard {shard} exited ({exitcode}).")
+        for command_id, owner in list(self._pending_shard.items()):
+            future = self._pending.get(command_id)
+            if owner == shard and future and not future.done():
+                future.set_exception(error)
+        if not self._ready.is_set():
+            # fail start() now rather than at its timeout
+            self._ready.set()
+        if self._listeners:
+            self._stream.put_nowait(
+                {
+                    "type": "exit",
+                    "shard": shard,
+                    "id": None,
+                    "address": None,
+                    "state": {"error": str(error)},
+                }
+            )
+
+    def _on_event(self, event: dict[str, Any]):
+        if event["type"] == "ready":
+            self._ready_shards += 1
+            logger.debug("Fleet shard %s ready.", event["shard"])
+            if self._ready_shards == self.shards:
+                self._ready.set()
+            return
+
+        future = self._pending.get(event.get("id"))
+        if future and not future.done():
+            future.set_result(event)
+        if self._listeners:
+            self._stream.put_nowait(event)
@@ -0,0 +1,55 @@
+"""Local snapshot of the cloud device inventory."""
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from .snapshot import load_snapshot, remove_snapshot, save_snapshot
+
+INVENTORY_VERSION = 1
+
+
+def compact_device(api_device: dict[str, Any]) -> dict[str, Any]:
+    """Strip an API device entry down to the fields `from_json` reads."""
+
+    params = api_device.get("params") or {}
+    user = api_device.get("user") or {}
+    return {
+        "name": api_device["name"],
+        "uuid": api_device["uuid"],
+        "model": api_device["model"],
+        "user": {"uid": user.get("uid"), "password": user.get("password")},
+        "params": {
+            "extend_ble": params.get("extend_ble", ""),
+            "serialnumber": params.get("serialnumber", ""),
+        },
+    }
+
+
+class UtecInventoryStore:
+    """Persist the device list to a compact json snapshot, see snapshot.py."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.updated: float | None = None
+
+    def load(self) -> list[dict[str, Any]]:
+        if not (snapshot := load_snapshot(self.path, INVENTORY_VERSION, "inventory")):
+            return []
+        self.updated = snapshot.get("updated")
+        return snapshot.get("devices", [])
+
+    def save(self, api_devices: list[dict[str, Any]]) -> None:
+        self.updated = time.time()
+        save_snapshot(
+            self.path,
+            {
+                "version": INVENTORY_VERSION,
+                "updated": self.updated,
+                "devices": [compact_device(d) for d in api_devices],
+            },
+        )
+
+    def clear(self) -> None:
+        remove_snapshot(self.path)
+        self.updated = None
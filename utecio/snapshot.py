@@ -0,0 +1,46 @@
+"""Versioned json snapshot files shared by the local caches.
+
+Writes go to a temporary file, created readable by its owner only, that is
+renamed over the snapshot, so a crash mid-write never leaves a truncated
+file behind and cached credentials are not exposed to other users.
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+
+from . import logger
+
+
+def load_snapshot(path: str, version: int, name: str) -> dict[str, Any] | None:
+    """The snapshot at `path`, None if missing, unreadable or of another version."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable %s %s: %s", name, path, e)
+        return None
+
+    if not isinstance(snapshot, dict) or snapshot.get("version") != version:
+        return None
+    return snapshot
+
+
+def save_snapshot(path: str, snapshot: dict[str, Any]) -> None:
+    tmp_path = f"{path}.tmp"
+    # a leftover temp file would keep its old mode, so start from scratch
+    remove_snapshot(tmp_path)
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with open(fd, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def remove_snapshot(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,150 @@
+"""Column-wise state of a whole fleet of locks.
+
+Every registered device writes its state into typed arrays, one per
+attribute, at its own row. Filters and aggregates run over whole columns
+with C level iteration (map/operator/itertools) rather than a Python loop
+over device objects.
+"""
+from __future__ import annotations
+
+import operator
+import time
+from array import array
+from collections import Counter
+from itertools import compress, repeat
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .ble.device import UtecBleDevice
+
+STATE_FIELDS = {
+    "lock_status": "h",
+    "bolt_status": "h",
+    "lock_mode": "h",
+    "battery": "h",
+    "mute": "b",
+    "autolock_time": "i",
+    "door_status": "h",
+}
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class UtecFleetSnapshot:
+    """Copy of every column at one point in time."""
+
+    def __init__(self, state: "UtecFleetState"):
+        self.taken = time.time()
+        self.addresses = list(state.addresses)
+        self.columns = {name: column[:] for name, column in state.columns.items()}
+
+
+class UtecFleetState:
+    """Array backed state of many locks, indexed by registration order.
+
+    state = UtecFleetState()
+    for lock in locks:
+        state.register(lock)
+    state.select(battery=("<=", 1), lock_status=1)  # low battery and unlocked
+    """
+
+    def __init__(self):
+        self.addresses: list[str] = []
+        self.index: dict[str, int] = {}
+        self.columns: dict[str, array] = {
+            name: array(typecode) for name, typecode in STATE_FIELDS.items()
+        }
+        self.updated = array("d")
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def register(self, device: "UtecBleDevice") -> int:
+        """Give `device` a row; from now on it writes its state there."""
+        if (row := self.index.get(device.mac_uuid)) is None:
+            row = self.index[device.mac_uuid] = len(self.addresses)
+            self.addresses.append(device.mac_uuid)
+            for column in self.columns.values():
+                column.append(-1)
+            self.updated.append(0.0)
+        device.state = self
+        device.state_index = row
+        self.write(row, device)
+        return row
+
+    def write(self, row: int, device: "UtecBleDevice"):
+        for name, column in self.columns.items():
+            column[row] = int(getattr(device, name))
+        self.updated[row] = time.time()
+
+    def row(self, address: str) -> dict[str, Any]:
+        row = self.index[address]
+        state = {name: column[row] for name, column in self.columns.items()}
+        state["updated"] = self.updated[row]
+        return state
+
+    def mask(self, **conditions: Any) -> list[bool]:
+        """Rows matching every condition.
+
+        A condition is a value to compare for equality or an (operator,
+        value) pair, e.g. battery=("<=", 1).
+        """
+        result: Any = repeat(True, len(self))
+        for name, condition in conditions.items():
+            op, value = condition if isinstance(condition, tuple) else ("==", condition)
+            matches = map(OPERATORS[op], self.columns[name], repeat(value))
+            result = map(operator.and_, result, matches)
+        return list(result)
+
+    def select(self, **conditions: Any) -> list[str]:
+        """Addresses of the locks matching every condition."""
+        return list(compress(self.addresses, self.mask(**conditions)))
+
+    def count(self, **conditions: Any) -> int:
+        return sum(self.mask(**conditions))
+
+    def aggregate(self, name: str, **conditions: Any) -> dict[str, Any]:
+        """min, max, mean and value counts of a column, ignoring unknown (-1)."""
+        values: Any = self.columns[name]
+        if conditions:
+            values = compress(values, self.mask(**conditions))
+        values = [value for value in values if value != -1]
+        if not values:
+            return {"count": 0}
+        return {
+            "count": len(values),
+            "min": min(values),
+            "max": max(values),
+            "mean": sum(values) / len(values),
+            "values": dict(Counter(values)),
+        }
+
+    def snapshot(self) -> UtecFleetSnapshot:
+        return UtecFleetSnapshot(self)
+
+    def diff(self, since: UtecFleetSnapshot) -> dict[str, dict[str, tuple]]:
+        """Changes per address since `since`, as {field: (old, new)}.
+
+        Locks registered after the snapshot report every field with old None.
+        """
+        changes: dict[str, dict[str, tuple]] = {}
+        known = len(since.addresses)
+        for name, column in self.columns.items():
+            old = since.columns[name]
+            current = column[:known]
+            if current != old:
+                for row in compress(range(known), map(operator.ne, current, old)):
+                    changes.setdefault(self.addresses[row], {})[name] = (
+                        old[row],
+                        column[row],
+                    )
+            for row in range(known, len(self)):
+                changes.setdefault(self.addresses[row], {})[name] = (None, column[row])
+        return changes
@@ -3,12 +3,15 @@ import asyncio
 from bleak import BleakScanner
 from bleak.backends.device import BLEDevice
 from .ble.lock import UtecBleLock
+from .ble.scanning import UtecBleScanCoordinator
 from .api import UtecClient, logger as liblogger
 
 EMAIL = "your@email.com" # Your Utec app username/email
 PASSWORD = "your_password" # Your Utec App Password
 
 bleak_scanner = BleakScanner()
+# pauses bleak_scanner while a lock connects on the same adapter
+scan_coordinator = UtecBleScanCoordinator()
 
 async def async_bledevice_callback(address:str) -> BLEDevice:
     # we need to provide a valid BLEDevice for the mac address when asked, or return None
@@ -29,9 +32,11 @@ async def unlock_lock(lockname: str):
     l5: UtecBleLock = list(filter(lambda lock: lock.name == lockname, ble_devices))[0]
     # register a callback to provide bleak BLEDevice objects
     l5.async_bledevice_callback = async_bledevice_callback
+    l5.scan_coordinator = scan_coordinator
     try:
         # start the scanner for the BLEDevice callback
         await bleak_scanner.start()
+        scan_coordinator.add_scanner(bleak_scanner)
         # unlock the lock and retrieve a status update
         await l5.async_unlock(update=True)
     except Exception as e:
@@ -40,6 +45,7 @@ async def unlock_lock(lockname: str):
         print("Unlock successfull.")
     finally:
         # cleanup
+        scan_coordinator.remove_scanner()
         await bleak_scanner.stop()
 
 asyncio.run(unlock_lock("Office Door"))
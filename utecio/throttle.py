@@ -0,0 +1,81 @@
+"""Adaptive concurrency limits for the cloud API."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+
+from .const import API_CONCURRENCY_DEF, API_CONCURRENCY_MAX_DEF
+
+
+class UtecAdaptiveLimiter:
+    """AIMD concurrency limit for one host.
+
+    Every successful call raises the limit by `increase` / limit, so it grows
+    by about `increase` per round trip at full concurrency. A throttled call
+    multiplies it by `decrease`, any other failed call leaves it unchanged.
+    Callers beyond the current limit wait.
+    """
+
+    def __init__(
+        self,
+        initial: int = API_CONCURRENCY_DEF,
+        minimum: int = 1,
+        maximum: int = API_CONCURRENCY_MAX_DEF,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+        self.throttled = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    def __repr__(self) -> str:
+        return (
+            f"<UtecAdaptiveLimiter limit={self.limit:.1f} in_flight={self.in_flight}>"
+        )
+
+    async def acquire(self):
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # pass on a wake-up this waiter may already have received
+                self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+
+    def release(self, throttled: bool = False, failed: bool = False):
+        self.in_flight -= 1
+        if throttled:
+            self.throttled += 1
+            self.limit = max(self.minimum, self.limit * self.decrease)
+        elif not failed:
+            self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+        self._wake()
+
+    def _wake(self):
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+
+_limiters: dict[str, UtecAdaptiveLimiter] = {}
+
+
+def limiter_for(host: str) -> UtecAdaptiveLimiter:
+    """Limiter shared by every client talking to `host`."""
+    if (limiter := _limiters.get(host)) is None:
+        limiter = _limiters[host] = UtecAdaptiveLimiter()
+    return limiter
@@ -1,6 +1,8 @@
 import datetime
 import struct
 
+from .const import CRC8Table
+
 
 def date_from_4bytes(byte_array:bytes):
     if byte_array is None or len(byte_array) < 4:
@@ -16,6 +18,24 @@ def date_from_4bytes(byte_array:bytes):
 
     return datetime.datetime(year, month, day, hour, minute, seconds)
 
+def date_to_4bytes(date: datetime.datetime) -> bytes:
+    """Pack a datetime into the lock's 4 byte timestamp format."""
+    value = (
+        ((date.year - 2000) & 63) << 26
+        | ((date.month + 1) & 15) << 22
+        | (date.day & 31) << 17
+        | (date.hour & 31) << 12
+        | (date.minute & 63) << 6
+        | (date.second & 63)
+    )
+    return struct.pack('>I', value)
+
+def crc8(data: bytes) -> int:
+    crc = 0
+    for b in data:
+        crc = CRC8Table[(crc ^ b) & 0xFF]
+    return crc
+
 def bytes_to_int2(byte_array:bytes) -> int:
     result = 0
     for i in range(1, -1, -1):
@@ -52,35 +72,20 @@ def to_byte_array(value, size):
     return byte_array
 
 def decode_password(password: int) -> str:
-    """Decode the password that the API returns to the Admin Password."""
+    """Decode the password that the API returns to the Admin Password.
+
+    The top nibble of the 32 bit value holds the number of digits, the
+    remaining 28 bits hold the numeric password.
+    """
 
     try:
-        byte_array = bytearray(4)
-        i3 = 0
-        while i3 < 4:
-            byte_array[i3] = (password >> (i3 * 8)) & 255
-            i3 += 1
-
-        str2 = ""
-        length = len(byte_array) - 1
-        while length >= 0:
-            hex_string = format(byte_array[length] & 0xFF, '02x')
-            length -= 1
-            if len(hex_string) == 1:
-                hex_string = "0" + hex_string
-            str2 = str2 + hex_string
-        parse_int = int(str2[0])
-        if parse_int == 0:
+        value = int(password) & 0xFFFFFFFF
+        digits = value >> 28
+        if digits == 0:
             return str(password)
-        str3 = str(int(str2[1:], 16))
-        if parse_int != len(str3):
-            str4 = str3
-            count = 0
-            while count < (parse_int - len(str3)):
-                str4 = "0" + str4
-                count += 1
-            return str4
-        return str3
+        if digits > 9:
+            raise ValueError(f"invalid password length nibble: {digits:x}")
+        return str(value & 0x0FFFFFFF).zfill(digits)
     except Exception as e:
         print(e)
 